@@ -0,0 +1,58 @@
+import threading
+from typing import Optional
+
+from api.service import ChatService
+from app.db.jobs import JobQueue
+
+_service: Optional[ChatService] = None
+_queue: Optional[JobQueue] = None
+_lock = threading.Lock()
+
+
+def get_service() -> ChatService:
+    """
+    The shared ChatService, built by the first request that needs it rather
+    than at import: the database engine, the LLM client and its provider SDK
+    load on demand, so uvicorn (and every --reload) starts without them.
+    Sync on purpose: FastAPI runs it in a worker thread, off the event loop.
+    """
+    global _service
+    if _service is None:
+        with _lock:
+            if _service is None:
+                _service = ChatService(top_k=6)
+    return _service
+
+
+def peek_service() -> Optional[ChatService]:
+    """The service if a request already built it; never builds one (GET /metrics)."""
+    return _service
+
+
+async def close_service() -> None:
+    """Shutdown: release the service's connections, if it was ever built."""
+    global _service
+    with _lock:
+        service, _service = _service, None
+    if service is not None:
+        await service.aclose()
+
+
+def get_queue() -> JobQueue:
+    """The ingestion job queue (POST /videos), built and its table created on first use."""
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                queue = JobQueue()
+                queue.create_schema()
+                _queue = queue
+    return _queue
+
+
+def close_queue() -> None:
+    global _queue
+    with _lock:
+        queue, _queue = _queue, None
+    if queue is not None:
+        queue.close()
@@ -0,0 +1,156 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+
+def normalize_question(question: str) -> str:
+    """'  What  happened to the RED car?' → 'what happened to the red car'."""
+    return re.sub(r"\W+", " ", question.lower()).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU of normalized question → embedding, entries expiring after
+    ``ttl_sec``. Concurrent misses for the same question share one embed
+    call (singleflight): the first caller embeds, the others wait for its
+    result, or its error, which is not cached.
+    get() serves threads, aget() coroutines on one event loop.
+    get_many() / aget_many() embed all missing questions in one batched
+    call (without coalescing with in-flight single embeds).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_sec: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses served by another caller's in-flight embed
+        self.evictions = 0
+        self._now = time.monotonic
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[float, list[float]]]" = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def _lookup(self, key: str) -> Optional[list[float]]:
+        """Cached vector (counted as a hit) or None; call with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._now() > entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, key: str, emb: list[float]) -> None:
+        with self._lock:
+            self._entries[key] = (self._now() + self.ttl_sec, emb)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, question: str, embed: Callable[[str], list[float]]) -> list[float]:
+        key = normalize_question(question)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            pending = self._inflight.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = self._inflight[key] = Future()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            return pending.result()
+        try:
+            emb = embed(question)
+            self._store(key, emb)
+            pending.set_result(emb)
+            return emb
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def aget(self, question: str, aembed: Callable[[str], Awaitable[list[float]]]) -> list[float]:
+        key = normalize_question(question)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            task = self._tasks.get(key)
+            if task is None:
+                self.misses += 1
+                task = self._tasks[key] = asyncio.ensure_future(self._fill(key, question, aembed))
+            else:
+                self.coalesced += 1
+        # shield: a cancelled waiter (client gone) must not cancel the embed the others wait for
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, question: str, aembed) -> list[float]:
+        try:
+            emb = await aembed(question)
+            self._store(key, emb)
+            return emb
+        finally:
+            with self._lock:
+                del self._tasks[key]
+
+    def _split(self, questions: list[str]) -> tuple[list[str], dict, dict]:
+        """Keys, key → cached vector, and key → question for the misses (embedded once each)."""
+        keys = [normalize_question(q) for q in questions]
+        found, todo = {}, {}
+        with self._lock:
+            for key, question in zip(keys, questions):
+                if key in found or key in todo:
+                    continue
+                cached = self._lookup(key)
+                if cached is not None:
+                    found[key] = cached
+                else:
+                    self.misses += 1
+                    todo[key] = question
+        return keys, found, todo
+
+    def _merge(self, keys: list[str], found: dict, todo: dict, embs: list[list[float]]) -> list[list[float]]:
+        for key, emb in zip(todo, embs):
+            self._store(key, emb)
+            found[key] = emb
+        return [found[k] for k in keys]
+
+    def get_many(
+        self, questions: list[str], embed_many: Callable[[list[str]], list[list[float]]]
+    ) -> list[list[float]]:
+        keys, found, todo = self._split(questions)
+        return self._merge(keys, found, todo, embed_many(list(todo.values())) if todo else [])
+
+    async def aget_many(
+        self, questions: list[str], aembed_many: Callable[[list[str]], Awaitable[list[list[float]]]]
+    ) -> list[list[float]]:
+        keys, found, todo = self._split(questions)
+        return self._merge(keys, found, todo, await aembed_many(list(todo.values())) if todo else [])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
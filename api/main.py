@@ -1,8 +1,23 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from api import metrics
+from api.dependencies import close_queue, close_service, peek_service
 from api.routers import chat as chat_router
+from api.routers import health as health_router
+from api.routers import videos as videos_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing is opened at startup: the chat service and job queue are built on first use (api/dependencies.py)
+    yield
+    await close_service()
+    close_queue()
 
-app = FastAPI(title="Video Highlights Chat API", version="1.0")
+
+app = FastAPI(title="Video Highlights Chat API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,3 +28,11 @@ app.add_middleware(
 )
 
 app.include_router(chat_router.router)
+app.include_router(health_router.router)
+app.include_router(videos_router.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition (api/metrics.py). Cache and pool metrics appear once the service is built."""
+    return Response(metrics.render(peek_service()), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,190 @@
+"""
+Prometheus metrics for the chat API, served by GET /metrics (api/main.py).
+
+Request paths only touch the cheap instruments: a Histogram observation is
+a bisect over the bucket bounds plus three additions under a lock, a
+Counter increment one addition. Everything that already keeps its own
+counters (the question-embedding and result caches, the SQLAlchemy pools,
+the LLM retry engine and router) is read when /metrics is scraped instead.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.llm.retry import retry_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: sub-millisecond cache hits up to multi-second provider calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_labels(self.label_names, k)} {_num(v)}" for k, v in values]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # labels → [per-bucket counts (last = +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        """Observe the wall time of the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _num(bound)
+                out.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return out
+
+
+def gauge(name: str, help: str, label_names: tuple, samples: dict) -> list[str]:
+    """A gauge family from values read at scrape time: labels tuple → value (None values skipped)."""
+    out = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    out += [f"{name}{_labels(label_names, k)} {_num(v)}" for k, v in sorted(samples.items()) if v is not None]
+    return out
+
+
+def counter(name: str, help: str, label_names: tuple, samples: dict) -> list[str]:
+    """A counter family kept elsewhere (cache, pool, retry stats), read at scrape time."""
+    out = [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+    out += [f"{name}{_labels(label_names, k)} {_num(v)}" for k, v in sorted(samples.items()) if v is not None]
+    return out
+
+
+# ----- instruments updated on the request path -----
+
+REQUEST_SECONDS = Histogram("chat_request_seconds", "Chat request latency by endpoint.", ("endpoint",))
+PHASE_SECONDS = Histogram(
+    "chat_phase_seconds",
+    "Time spent per phase of a chat request: embed, vector_search (hybrid vector + full-text), "
+    "keyword_search (first /chat/stream stage), keyword_fallback, compose.",
+    ("phase",),
+)
+FALLBACKS = Counter(
+    "chat_fallbacks_total",
+    "Questions answered by keyword search instead of hybrid search, by reason "
+    "(no_embedder, search_error, zero_embedding).",
+    ("reason",),
+)
+
+
+# ----- read at scrape time -----
+
+def _cache_metrics(stats: dict) -> list[str]:
+    caches = {name: s for name, s in stats.items() if s}
+    out = counter("chat_cache_hits_total", "Cache hits.", ("cache",),
+                  {(n,): s["hits"] for n, s in caches.items()})
+    out += counter("chat_cache_misses_total", "Cache misses.", ("cache",),
+                   {(n,): s["misses"] for n, s in caches.items()})
+    out += gauge("chat_cache_hit_ratio", "Hits / lookups since start.", ("cache",),
+                 {(n,): s["hit_rate"] for n, s in caches.items()})
+    out += gauge("chat_cache_entries", "Entries held.", ("cache",), {(n,): s["entries"] for n, s in caches.items()})
+    return out
+
+
+def _pool_metrics(pools: dict) -> list[str]:
+    """pools: name → SQLAlchemy QueuePool (sync or the async engine's); other pool classes are skipped."""
+    size, used, idle, overflow = {}, {}, {}, {}
+    for name, pool in pools.items():
+        if pool is None or not hasattr(pool, "checkedout"):
+            continue
+        size[(name,)] = pool.size()
+        used[(name,)] = pool.checkedout()
+        idle[(name,)] = pool.checkedin()
+        overflow[(name,)] = max(pool.overflow(), 0)
+    out = gauge("db_pool_size", "Configured pool size (persistent connections).", ("pool",), size)
+    out += gauge("db_pool_checked_out", "Connections in use.", ("pool",), used)
+    out += gauge("db_pool_idle", "Open connections waiting in the pool.", ("pool",), idle)
+    out += gauge("db_pool_overflow", "Connections open beyond the pool size.", ("pool",), overflow)
+    return out
+
+
+def _provider_metrics(embedder) -> list[str]:
+    stats = retry_stats()
+    out = counter("llm_provider_calls_total", "LLM provider calls (each may retry).", ("provider",),
+                  {(p,): s["calls"] for p, s in stats.items()})
+    out += counter("llm_provider_failures_total", "LLM provider calls that failed after retries.", ("provider",),
+                   {(p,): s["failures"] for p, s in stats.items()})
+    out += counter("llm_provider_retries_total", "LLM provider attempts retried.", ("provider",),
+                   {(p,): s["retries"] for p, s in stats.items()})
+    out += counter("llm_provider_rate_limited_total", "LLM provider rate-limit responses.", ("provider",),
+                   {(p,): s["rate_limited"] for p, s in stats.items()})
+    router = getattr(getattr(embedder, "client", None), "stats", None)
+    if callable(router):  # ProviderRouter (LLM_ROUTING=balanced): circuit breakers
+        states = router()
+        out += gauge("llm_provider_breaker_open", "1 while the provider's circuit breaker is open.", ("provider",),
+                     {(p,): int(s["state"] == "open") for p, s in states.items()})
+    return out
+
+
+def render(service: Optional[object] = None) -> str:
+    """The exposition text; `service` (ChatService, if built yet) adds cache and pool metrics."""
+    lines = REQUEST_SECONDS.render() + PHASE_SECONDS.render() + FALLBACKS.render()
+    if service is not None:
+        lines += _cache_metrics(service.stats())
+        repo_engine = getattr(service.repo, "engine", None)
+        arepo = getattr(service, "arepo", None)
+        lines += _pool_metrics({
+            "sync": getattr(repo_engine, "pool", None),
+            "async": arepo.engine.pool if arepo is not None else None,
+        })
+        lines += _provider_metrics(service.embedder)
+    return "\n".join(lines) + "\n"
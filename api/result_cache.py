@@ -0,0 +1,96 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from api.embedding_cache import normalize_question
+from app.types import SearchScope
+
+
+def result_key(question: str, scope: SearchScope | None, top_k: int) -> tuple:
+    return normalize_question(question), scope.model_dump_json() if scope else "", top_k
+
+
+class ResultCache:
+    """
+    Chat results (answer, matches) by normalized question, scope and top_k,
+    valid for one highlights version (StorageBackend.highlights_version()).
+    A lookup under a newer version drops every entry; one under an older
+    version (read before a write, by a slower thread) is a miss and changes
+    nothing. None, an unknown version, bypasses the cache. Callers read the
+    version before searching and store under it, so a result computed while
+    a write committed is never served. LRU eviction keeps the JSON size of
+    the entries under ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0  # version changes that emptied the cache
+        self.evictions = 0
+        self.bytes = 0
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple[int, Any]]" = OrderedDict()
+
+    def _sync(self, version: int) -> bool:
+        """
+        Move to `version` if it is newer, dropping the older entries; False
+        when it is older than the current one. Call with the lock held.
+        Both backends' versions only increase.
+        """
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self._version = version
+        return True
+
+    def get(self, key: tuple, version: Optional[int]) -> Optional[Any]:
+        if version is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key) if self._sync(version) else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, version: Optional[int], value: Any) -> None:
+        if version is None:
+            return
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                return  # computed under a version that is already gone (or not yet looked up)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[0]
+            self._entries[key] = (size, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self.bytes,
+        }
@@ -1,27 +1,82 @@
-from fastapi import APIRouter, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from . import __init__  # noqa: F401
-from api.schemas import ChatQuery, ChatAnswer, Match
+from api.schemas import ChatBatchAnswer, ChatBatchQuery, ChatQuery, ChatAnswer, Match, MatchesEvent
+from api.dependencies import get_service
+from api.metrics import REQUEST_SECONDS
 from api.service import ChatService
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-service = ChatService(top_k=6)
 
 @router.post("/query", response_model=ChatAnswer)
-def query(body: ChatQuery):
+async def query(body: ChatQuery, service: ChatService = Depends(get_service)):
+    q = body.question.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Empty question")
+    with REQUEST_SECONDS.time("query"):
+        answer, rows = await service.aanswer(q, body.scope())
+    return ChatAnswer(answer=answer, matches=[_match(r) for r in rows])
+
+
+@router.post("/batch", response_model=ChatBatchAnswer)
+async def batch(body: ChatBatchQuery, service: ChatService = Depends(get_service)):
+    """Answers for many questions (in order): one embedding call and one search statement for all of them."""
+    with REQUEST_SECONDS.time("batch"):
+        results = await service.abatch(body.questions, body.scope())
+    return ChatBatchAnswer(
+        results=[ChatAnswer(answer=answer, matches=[_match(r) for r in rows]) for answer, rows in results]
+    )
+
+
+def _match(r: dict) -> Match:
+    return Match(
+        id=r["id"],
+        video_id=r["video_id"],
+        ts_start_sec=r["ts_start_sec"],
+        ts_end_sec=r["ts_end_sec"],
+        description=r["description"],
+        llm_summary=r.get("llm_summary"),
+        score=float(r.get("score", 0.0)),
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.post("/stream")
+async def stream(body: ChatQuery, service: ChatService = Depends(get_service)):
+    """
+    Server-sent events: `matches` (MatchesEvent) each time results improve, cached or
+    keyword hits first, then hybrid ones; then `answer` (ChatAnswer), or `error`.
+    """
     q = body.question.strip()
     if not q:
         raise HTTPException(status_code=400, detail="Empty question")
-    answer, rows = service.answer(q)
-    matches = [
-        Match(
-            id=r["id"],
-            video_id=r["video_id"],
-            ts_start_sec=r["ts_start_sec"],
-            ts_end_sec=r["ts_end_sec"],
-            description=r["description"],
-            llm_summary=r.get("llm_summary"),
-            score=float(r.get("score", 0.0)),
-        )
-        for r in rows
-    ]
-    return ChatAnswer(answer=answer, matches=matches)
+
+    async def events():
+        # Timed until the last event is written, including the time the client takes to read the earlier ones
+        with REQUEST_SECONDS.time("stream"):
+            try:
+                async for stage, payload in service.astream(q, body.scope()):
+                    if stage == "answer":
+                        answer, rows = payload
+                        yield _sse("answer", ChatAnswer(answer=answer, matches=[_match(r) for r in rows]).model_dump_json())
+                    else:
+                        yield _sse("matches", MatchesEvent(stage=stage, matches=[_match(r) for r in payload]).model_dump_json())
+            except Exception as e:
+                print(f"⚠️ Chat stream failed: {e}")
+                yield _sse("error", json.dumps({"detail": str(e)}))
+
+    # X-Accel-Buffering: nginx would otherwise hold the events back until the end
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stats")
+def stats(service: ChatService = Depends(get_service)):
+    """Embedding and result cache counters (hits, misses, hit_rate, ...)."""
+    return service.stats()
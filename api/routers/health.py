@@ -0,0 +1,30 @@
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api.dependencies import get_service
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/healthz")
+def healthz():
+    """Liveness: the process serves requests; touches neither the database nor the LLM provider."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    """
+    Readiness: builds the chat service on first call, warms the DB pool and the
+    embedder (ChatService.warm). 503 until the database answers; an embedder
+    error is reported but not fatal (keyword search still answers).
+    """
+    try:
+        service = await asyncio.to_thread(get_service)
+        checks = await service.warm()
+    except Exception as e:
+        print(f"⚠️ Not ready: {e}")
+        return JSONResponse({"status": "unavailable", "detail": str(e)}, status_code=503)
+    return {"status": "ready", "checks": checks}
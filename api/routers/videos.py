@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from api.dependencies import get_queue
+from api.schemas import VideoSubmission
+from app.db.jobs import JobQueue
+from app.types import JobRecord
+
+router = APIRouter(prefix="/videos", tags=["videos"])
+
+
+@router.post("", response_model=JobRecord, status_code=202)
+def submit(body: VideoSubmission, response: Response, queue: JobQueue = Depends(get_queue)):
+    """
+    Queue a video for the ingestion workers (python -m app.worker). A source
+    already queued or running returns that job. Poll the Location for its status.
+    """
+    job = queue.enqueue(body.source)
+    response.headers["Location"] = f"/videos/jobs/{job.id}"
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobRecord)
+def job_status(job_id: int, queue: JobQueue = Depends(get_queue)):
+    """queued | running | succeeded (video_id, highlights) | failed (last_error); attempts so far."""
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
@@ -1,9 +1,33 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
+from app.config import Config
+from app.types import SearchScope
 
-class ChatQuery(BaseModel):
+class ChatQuery(SearchScope):
+    """A question, optionally scoped: video_ids, ts_from / ts_to (seconds), min_confidence."""
     question: str = Field(min_length=2)
 
+    def scope(self) -> Optional[SearchScope]:
+        scope = SearchScope(**self.model_dump(exclude={"question"}))
+        return None if scope.is_empty() else scope
+
+class ChatBatchQuery(SearchScope):
+    """Many questions sharing one optional scope (see ChatQuery)."""
+    questions: List[str] = Field(min_length=1)
+
+    @field_validator("questions")
+    @classmethod
+    def _bounded(cls, v: List[str]) -> List[str]:
+        if len(v) > Config.chat_batch_max_questions:
+            raise ValueError(f"At most {Config.chat_batch_max_questions} questions per batch (CHAT_BATCH_MAX_QUESTIONS)")
+        if any(len(q.strip()) < 2 for q in v):
+            raise ValueError("Every question needs at least 2 characters")
+        return [q.strip() for q in v]
+
+    def scope(self) -> Optional[SearchScope]:
+        scope = SearchScope(**self.model_dump(exclude={"questions"}))
+        return None if scope.is_empty() else scope
+
 class Match(BaseModel):
     id: int
     video_id: int
@@ -16,3 +40,22 @@ class Match(BaseModel):
 class ChatAnswer(BaseModel):
     answer: str
     matches: List[Match]
+
+class ChatBatchAnswer(BaseModel):
+    results: List[ChatAnswer]  # in question order
+
+class MatchesEvent(BaseModel):
+    """/chat/stream progress: the best matches so far and where they came from."""
+    stage: str  # cached | keyword | hybrid
+    matches: List[Match]
+
+class VideoSubmission(BaseModel):
+    """A video for the ingestion workers: a YouTube URL or a path the workers can read."""
+    source: str = Field(min_length=1, max_length=1024)
+
+    @field_validator("source")
+    @classmethod
+    def _not_blank(cls, v: str) -> str:
+        if not v.strip():
+            raise ValueError("source must not be blank")
+        return v.strip()
@@ -1,18 +1,48 @@
+import asyncio
 import os
-from typing import List
+from typing import AsyncIterator, List
+from api.embedding_cache import QueryEmbeddingCache
+from api.metrics import FALLBACKS, PHASE_SECONDS
+from api.result_cache import ResultCache, result_key
+from app.config import Config
+from app.db.backend import open_repository
 from app.db.repository import Repository
+from app.types import SearchScope
 from app.llm.llm_client import UnifiedLLMClient
 
+
+def has_direction(embedding: List[float]) -> bool:
+    """
+    False for an all-zero embedding (text without n-grams, e.g. "??", under
+    the local embedder): its cosine distance to every row is NaN, so the
+    vector leg would rank arbitrary highlights. Such questions get keyword search.
+    """
+    return any(x != 0.0 for x in embedding)
+
+
 class ChatService:
     """
     DB-only answering:
-    1) If any LLM API key available (GOOGLE_API_KEY, OPENAI_API_KEY, CLAUDE_API_KEY): embed question → vector search in pgvector
-    2) Else: keyword ILIKE search on description/llm_summary
+    1) If any LLM API key available (GOOGLE_API_KEY, OPENAI_API_KEY, CLAUDE_API_KEY), or EMBEDDING_BACKEND=local:
+       embed question → hybrid search: pgvector + full-text, merged by reciprocal rank fusion
+    2) Else: ranked full-text keyword search on description/llm_summary/objects
     3) compose answer from DB rows (no LLM generation)
+    aanswer does the same without blocking the event loop: async embedder,
+    and the asyncpg repository when the backend is Postgres.
+    Question embeddings are cached (CHAT_EMBEDDING_CACHE_SIZE); concurrent
+    identical questions share one embed call. Whole results are cached too
+    (CHAT_RESULT_CACHE_MB), for as long as the highlights version holds.
     """
     def __init__(self, top_k: int = 5):
-        self.repo = Repository()
+        self.repo = open_repository()
         self.top_k = top_k
+        self.arepo = None
+        if isinstance(self.repo, Repository):
+            try:
+                from app.db.async_repository import AsyncRepository
+                self.arepo = AsyncRepository(self.repo.engine.url)
+            except ImportError as e:
+                print(f"⚠️ asyncpg unavailable, async chat queries run in worker threads: {e}")
         # Try to initialize embedder with any available LLM client
         self.embedder = None
         if os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY") or os.getenv("CLAUDE_API_KEY"):
@@ -21,24 +51,306 @@ class ChatService:
             except Exception as e:
                 print(f"⚠️ Failed to initialize LLM client: {e}")
                 self.embedder = None
+        if self.embedder is None and Config.embedding_backend == "local":
+            # No keys / no network: vector search still works with offline embeddings
+            from app.llm.local_embedder import LocalEmbedder
+            self.embedder = LocalEmbedder()
+        self.embedding_cache = None
+        if Config.chat_embedding_cache_size > 0:
+            self.embedding_cache = QueryEmbeddingCache(
+                Config.chat_embedding_cache_size, Config.chat_embedding_cache_ttl_sec
+            )
 
-    def answer(self, question: str) -> tuple[str, List[dict]]:
-        # Try vector search if embedder is available
+        self._embedder_warm = False
+        self.result_cache = None
+        if Config.chat_result_cache_mb > 0:
+            self.result_cache = ResultCache(Config.chat_result_cache_mb * 1024 * 1024)
+
+    def _embed(self, question: str) -> list[float]:
+        with PHASE_SECONDS.time("embed"):
+            if self.embedding_cache is None:
+                return self.embedder.embed(question)
+            return self.embedding_cache.get(question, self.embedder.embed)
+
+    async def _aembed(self, question: str) -> list[float]:
+        with PHASE_SECONDS.time("embed"):
+            if self.embedding_cache is None:
+                return await self.embedder.aembed(question)
+            return await self.embedding_cache.aget(question, self.embedder.aembed)
+
+    def _embed_many(self, questions: list[str]) -> list[list[float]]:
+        with PHASE_SECONDS.time("embed"):
+            if self.embedding_cache is None:
+                return self.embedder.embed_many(questions)
+            return self.embedding_cache.get_many(questions, self.embedder.embed_many)
+
+    async def _aembed_many(self, questions: list[str]) -> list[list[float]]:
+        with PHASE_SECONDS.time("embed"):
+            if self.embedding_cache is None:
+                return await self.embedder.aembed_many(questions)
+            return await self.embedding_cache.aget_many(questions, self.embedder.aembed_many)
+
+    async def warm(self) -> dict:
+        """
+        Readiness: a round trip to the store (raises if it is down), the asyncpg
+        pool opened to DB_ASYNC_POOL_SIZE connections, the highlights change
+        listener started, and one embedding call until one succeeds (later
+        checks skip it). Returns check → status; a failing embedder is
+        reported but not fatal, answers fall back to keyword search.
+        """
+        await asyncio.to_thread(self.repo.ping)
+        if self.arepo is not None:
+            await self.arepo.warm(Config.db_async_pool_size)
+        if self.result_cache is not None:
+            await asyncio.to_thread(self.repo.highlights_version)
+        checks = {"database": "ok", "embedder": "ok"}
+        if self.embedder is None:
+            checks["embedder"] = "none: keyword search only"
+        elif not self._embedder_warm:
+            try:
+                await self._aembed("readiness check")
+                self._embedder_warm = True
+            except Exception as e:
+                checks["embedder"] = f"error: {e}"
+        return checks
+
+    async def aclose(self) -> None:
+        if self.arepo is not None:
+            await self.arepo.close()  # pooled asyncpg connections
+        self.repo.close()  # and the highlights change listener
+
+    def stats(self) -> dict:
+        return {
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+            "result_cache": self.result_cache.stats() if self.result_cache else None,
+        }
+
+    def _cached(self, question: str, scope: SearchScope | None) -> tuple[tuple, object, tuple | None]:
+        """Cache key, highlights version (read before searching) and the cached result, if any."""
+        if self.result_cache is None:
+            return (), None, None
+        key, version = result_key(question, scope, self.top_k), self.repo.highlights_version()
+        return key, version, self.result_cache.get(key, version)
+
+    def _remember(self, key: tuple, version, result: tuple[str, List[dict]]) -> tuple[str, List[dict]]:
+        if self.result_cache is not None:
+            self.result_cache.put(key, version, result)
+        return result
+
+    def answer(self, question: str, scope: SearchScope | None = None) -> tuple[str, List[dict]]:
+        key, version, cached = self._cached(question, scope)
+        if cached is not None:
+            return cached
+        # Hybrid (vector + full-text, rank-fused in one query) if an embedder is available
         if self.embedder:
+            rows = None
             try:
-                q_emb = self.embedder.embed(question)
-                rows = self.repo.vector_search(q_emb, top_k=self.top_k)
-                # If vector search returns no results, fall back to keyword search
-                if not rows:
-                    print("⚠️ Vector search returned no results, falling back to keyword search")
-                    rows = self.repo.keyword_search(question, top_k=self.top_k)
+                q_emb = self._embed(question)
+                if has_direction(q_emb):
+                    with PHASE_SECONDS.time("vector_search"):
+                        rows = self.repo.hybrid_search(question, q_emb, top_k=self.top_k, scope=scope)
             except Exception as e:
-                print(f"⚠️ Vector search failed: {e}, falling back to keyword search")
-                rows = self.repo.keyword_search(question, top_k=self.top_k)
+                print(f"⚠️ Hybrid search failed: {e}, falling back to keyword search")
+                # Not cached: the next call retries the hybrid search
+                return self._compose(self._keyword_fallback("search_error", question, scope))
+            if rows is None:
+                rows = self._keyword_fallback("zero_embedding", question, scope)
         else:
             # Fallback to keyword search
-            rows = self.repo.keyword_search(question, top_k=self.top_k)
-        
+            rows = self._keyword_fallback("no_embedder", question, scope)
+        return self._remember(key, version, self._compose(rows))
+
+    def _keyword_fallback(self, reason: str, question: str, scope: SearchScope | None) -> List[dict]:
+        FALLBACKS.inc(reason)
+        with PHASE_SECONDS.time("keyword_fallback"):
+            return self.repo.keyword_search(question, top_k=self.top_k, scope=scope)
+
+    async def _akeyword_fallback(self, reason: str, question: str, scope: SearchScope | None) -> List[dict]:
+        FALLBACKS.inc(reason)
+        with PHASE_SECONDS.time("keyword_fallback"):
+            return await self.arepo.keyword_search(question, top_k=self.top_k, scope=scope)
+
+    async def aanswer(self, question: str, scope: SearchScope | None = None) -> tuple[str, List[dict]]:
+        if self.arepo is None:
+            # Embedded (SQLite) backend: its searches are in-process NumPy work
+            return await asyncio.to_thread(self.answer, question, scope)
+        key, version, cached = self._cached(question, scope)
+        if cached is not None:
+            return cached
+        if self.embedder:
+            rows = None
+            try:
+                q_emb = await self._aembed(question)
+                if has_direction(q_emb):
+                    with PHASE_SECONDS.time("vector_search"):
+                        rows = await self.arepo.hybrid_search(question, q_emb, top_k=self.top_k, scope=scope)
+            except Exception as e:
+                print(f"⚠️ Hybrid search failed: {e}, falling back to keyword search")
+                return self._compose(await self._akeyword_fallback("search_error", question, scope))
+            if rows is None:
+                rows = await self._akeyword_fallback("zero_embedding", question, scope)
+        else:
+            rows = await self._akeyword_fallback("no_embedder", question, scope)
+        return self._remember(key, version, self._compose(rows))
+
+    async def astream(self, question: str, scope: SearchScope | None = None) -> AsyncIterator[tuple[str, object]]:
+        """
+        (stage, rows) as results improve, then ("answer", (answer, rows)) as from aanswer.
+        Cached: "cached" then the answer. Otherwise "keyword" hits while the question is
+        being embedded, then the "hybrid" hits the answer is composed from.
+        """
+        if self.arepo is None:
+            # Embedded (SQLite) backend: the version read waits for its lock, held by writes (IVF training)
+            key, version, cached = await asyncio.to_thread(self._cached, question, scope)
+        else:
+            key, version, cached = self._cached(question, scope)
+        if cached is not None:
+            yield "cached", cached[1]
+            yield "answer", cached
+            return
+        embedding = asyncio.ensure_future(self._aembed(question)) if self.embedder else None
+        try:
+            with PHASE_SECONDS.time("keyword_search"):
+                rows = await self._search("keyword_search", question, top_k=self.top_k, scope=scope)
+            yield "keyword", rows
+            if embedding is None:
+                FALLBACKS.inc("no_embedder")
+                yield "answer", self._remember(key, version, self._compose(rows))
+                return
+            try:
+                q_emb = await embedding
+                if not has_direction(q_emb):
+                    FALLBACKS.inc("zero_embedding")
+                    yield "answer", self._remember(key, version, self._compose(rows))
+                    return
+                with PHASE_SECONDS.time("vector_search"):
+                    rows = await self._search("hybrid_search", question, q_emb, top_k=self.top_k, scope=scope)
+            except Exception as e:
+                print(f"⚠️ Hybrid search failed: {e}, answering from keyword hits")
+                FALLBACKS.inc("search_error")
+                yield "answer", self._compose(rows)
+                return
+            yield "hybrid", rows
+            yield "answer", self._remember(key, version, self._compose(rows))
+        finally:
+            if embedding is not None and not embedding.done():
+                embedding.cancel()  # client went away
+
+    def batch(self, questions: List[str], scope: SearchScope | None = None) -> List[tuple[str, List[dict]]]:
+        """answer() for each question, in order; see abatch."""
+        version, results, todo = self._plan(questions, scope)
+        texts = [q for q, _ in todo.values()]
+        if not texts:
+            return results
+        if self.embedder:
+            try:
+                embs = self._embed_many(texts)
+                live = [i for i, emb in enumerate(embs) if has_direction(emb)]
+                rows = [None] * len(texts)
+                if live:
+                    with PHASE_SECONDS.time("vector_search"):
+                        found = self.repo.hybrid_search_many(
+                            [texts[i] for i in live], [embs[i] for i in live], top_k=self.top_k, scope=scope
+                        )
+                    for i, hits in zip(live, found):
+                        rows[i] = hits
+            except Exception as e:
+                print(f"⚠️ Batch hybrid search failed: {e}, falling back to keyword search")
+                rows = [self._keyword_fallback("search_error", q, scope) for q in texts]
+                return self._fill(results, todo, rows, None)
+            rows = [r if r is not None else self._keyword_fallback("zero_embedding", q, scope)
+                    for q, r in zip(texts, rows)]
+            return self._fill(results, todo, rows, version)
+        rows = [self._keyword_fallback("no_embedder", q, scope) for q in texts]
+        return self._fill(results, todo, rows, version)
+
+    async def abatch(self, questions: List[str], scope: SearchScope | None = None) -> List[tuple[str, List[dict]]]:
+        """
+        aanswer() for each question, in order. Cached results are served as is;
+        the other distinct questions are embedded in one batched provider call
+        and searched in one statement (Repository.hybrid_search_many).
+        """
+        if self.arepo is None:
+            return await asyncio.to_thread(self.batch, questions, scope)
+        version, results, todo = self._plan(questions, scope)
+        texts = [q for q, _ in todo.values()]
+        if not texts:
+            return results
+        if self.embedder:
+            try:
+                embs = await self._aembed_many(texts)
+                live = [i for i, emb in enumerate(embs) if has_direction(emb)]
+                rows = [None] * len(texts)
+                if live:
+                    with PHASE_SECONDS.time("vector_search"):
+                        found = await self.arepo.hybrid_search_many(
+                            [texts[i] for i in live], [embs[i] for i in live], top_k=self.top_k, scope=scope
+                        )
+                    for i, hits in zip(live, found):
+                        rows[i] = hits
+            except Exception as e:
+                print(f"⚠️ Batch hybrid search failed: {e}, falling back to keyword search")
+                return self._fill(results, todo, await self._akeyword_many("search_error", texts, scope), None)
+            blank = [i for i, r in enumerate(rows) if r is None]
+            if blank:
+                keyword = await self._akeyword_many("zero_embedding", [texts[i] for i in blank], scope)
+                for i, hits in zip(blank, keyword):
+                    rows[i] = hits
+            return self._fill(results, todo, rows, version)
+        return self._fill(results, todo, await self._akeyword_many("no_embedder", texts, scope), version)
+
+    def _plan(self, questions: List[str], scope: SearchScope | None) -> tuple[object, list, dict]:
+        """
+        Highlights version (read before searching), results with cache hits
+        filled in, and the distinct other questions: key → (question, positions).
+        """
+        version = self.repo.highlights_version() if self.result_cache is not None else None
+        results: list = [None] * len(questions)
+        todo: dict[tuple, tuple[str, list[int]]] = {}
+        for i, question in enumerate(questions):
+            key = result_key(question, scope, self.top_k)
+            if key not in todo:
+                cached = self.result_cache.get(key, version) if self.result_cache is not None else None
+                if cached is not None:
+                    results[i] = cached
+                    continue
+                todo[key] = (question, [])
+            todo[key][1].append(i)
+        return version, results, todo
+
+    def _fill(self, results: list, todo: dict, rows: List[List[dict]], version) -> list:
+        """Compose each searched question's answer into its positions; cached under version unless None."""
+        for (key, (_, positions)), found in zip(todo.items(), rows):
+            result = self._compose(found)
+            if version is not None:
+                self._remember(key, version, result)
+            for i in positions:
+                results[i] = result
+        return results
+
+    async def _akeyword_many(self, reason: str, questions: List[str], scope: SearchScope | None) -> List[List[dict]]:
+        # At most a pool's worth at once: the rest would queue for a connection and could time out
+        gate = asyncio.Semaphore(Config.db_async_pool_size)
+
+        async def one(question: str) -> List[dict]:
+            async with gate:
+                return await self._akeyword_fallback(reason, question, scope)
+
+        return list(await asyncio.gather(*(one(q) for q in questions)))
+
+    async def _search(self, method: str, *args, **kwargs) -> List[dict]:
+        """A search on the asyncpg repository, or on the embedded one in a worker thread."""
+        if self.arepo is not None:
+            return await getattr(self.arepo, method)(*args, **kwargs)
+        return await asyncio.to_thread(getattr(self.repo, method), *args, **kwargs)
+
+    @staticmethod
+    def _compose(rows: List[dict]) -> tuple[str, List[dict]]:
+        with PHASE_SECONDS.time("compose"):
+            return ChatService._compose_rows(rows)
+
+    @staticmethod
+    def _compose_rows(rows: List[dict]) -> tuple[str, List[dict]]:
         if not rows:
             return "I couldn't find relevant highlights for that question.", []
 
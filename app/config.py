@@ -7,6 +7,10 @@ class Settings(BaseSettings):
     google_api_key: str = Field(default="", alias="GOOGLE_API_KEY")
     openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
     claude_api_key: str = Field(default="", alias="CLAUDE_API_KEY")
+    # Optional endpoint overrides (proxies, local stand-in servers)
+    openai_base_url: str = Field(default="", alias="OPENAI_BASE_URL")
+    claude_base_url: str = Field(default="", alias="CLAUDE_BASE_URL")
+    gemini_base_url: str = Field(default="", alias="GEMINI_BASE_URL")  # switches Gemini to the REST transport
 
     # DB
     postgres_user: str = Field(default="appuser", alias="POSTGRES_USER")
@@ -14,6 +18,41 @@ class Settings(BaseSettings):
     postgres_db: str = Field(default="highlights_db", alias="POSTGRES_DB")
     postgres_host: str = Field(default="localhost", alias="POSTGRES_HOST")
     postgres_port: int = Field(default=5432, alias="POSTGRES_PORT")
+    # add_highlights switches from multi-row INSERT to binary COPY at this many rows
+    db_copy_threshold: int = Field(default=50, alias="DB_COPY_THRESHOLD")
+    # Async (asyncpg) engine of the chat API: pooled connections, prepared statements cached per connection
+    db_async_pool_size: int = Field(default=20, alias="DB_ASYNC_POOL_SIZE")
+    db_async_max_overflow: int = Field(default=10, alias="DB_ASYNC_MAX_OVERFLOW")
+    db_statement_cache_size: int = Field(default=500, alias="DB_STATEMENT_CACHE_SIZE")
+    # Vector index on highlights.embedding (app/db/indexing.py)
+    vector_index_method: str = Field(default="auto", alias="VECTOR_INDEX_METHOD")  # auto | hnsw | ivfflat
+    vector_index_hnsw_max_rows: int = Field(default=1_000_000, alias="VECTOR_INDEX_HNSW_MAX_ROWS")
+    vector_index_auto_rebuild: bool = Field(default=True, alias="VECTOR_INDEX_AUTO_REBUILD")
+    # Loads of at least this many rows that also double the table build the index afterwards
+    vector_index_defer_rows: int = Field(default=10_000, alias="VECTOR_INDEX_DEFER_ROWS")
+    vector_index_build_mem: str = Field(default="512MB", alias="VECTOR_INDEX_BUILD_MEM")
+    # Query-time recall/latency knobs (per query overridable)
+    vector_ef_search: int = Field(default=40, alias="VECTOR_EF_SEARCH")
+    vector_probes: int = Field(default=0, alias="VECTOR_PROBES")  # 0 = sqrt(lists)
+    # Index compact codes instead of float32 vectors (pgvector >= 0.7): none | halfvec | binary
+    vector_quantization: str = Field(default="none", alias="VECTOR_QUANTIZATION")
+    # Quantized first passes fetch top_k * this many rows, then rescore them with the float32 vectors
+    vector_rescore_factor: int = Field(default=4, alias="VECTOR_RESCORE_FACTOR")
+    # Keyword search ranks at most this many full-text matches per query
+    fts_max_candidates: int = Field(default=10_000, alias="FTS_MAX_CANDIDATES")
+    # Hybrid search: candidates taken from each of vector and full-text search, and the RRF constant
+    hybrid_candidates: int = Field(default=50, alias="HYBRID_CANDIDATES")
+    hybrid_rrf_k: int = Field(default=60, alias="HYBRID_RRF_K")
+    # Object- or scope-filtered vector search computes exact distances when at most this many highlights match
+    object_filter_exact_max: int = Field(default=20_000, alias="OBJECT_FILTER_EXACT_MAX")
+    # Storage backend (app/db/backend.py): "postgres" (pgvector) or "sqlite" (embedded, SQLite + NumPy)
+    storage_backend: str = Field(default="postgres", alias="STORAGE_BACKEND")
+    sqlite_path: str = Field(default="data/highlights_db", alias="SQLITE_PATH")  # directory
+    sqlite_embedding_dtype: str = Field(default="float32", alias="SQLITE_EMBEDDING_DTYPE")  # float32 | float16
+    # The SQLite backend searches exactly up to this many embeddings, then through an IVF partition; 0 = always exact
+    sqlite_ivf_min_rows: int = Field(default=100_000, alias="SQLITE_IVF_MIN_ROWS")
+    # SQLite backend: scan int8 / sign-bit codes first, rescore with the embedding matrix: none | int8 | binary
+    sqlite_quantization: str = Field(default="none", alias="SQLITE_QUANTIZATION")
 
     # App
     whisper_model: str = Field(default="base", alias="WHISPER_MODEL")
@@ -21,8 +60,58 @@ class Settings(BaseSettings):
     yolo_model: str = Field(default="yolov8n.pt", alias="YOLO_MODEL")
 
     embedding_model: str = Field(default="text-embedding-004", alias="EMBEDDING_MODEL")
+    # "provider" embeds with the active LLM provider; "local" uses the offline hashed n-gram embedder
+    embedding_backend: str = Field(default="provider", alias="EMBEDDING_BACKEND")
     generation_model: str = Field(default="gemini-1.5-flash", alias="GENERATION_MODEL")
 
+    # Multi-scene prompts: how many scenes may share one generate() call
+    llm_batch_max_scenes: int = Field(default=8, alias="LLM_BATCH_MAX_SCENES")
+    llm_batch_token_budget: int = Field(default=6000, alias="LLM_BATCH_TOKEN_BUDGET")
+    # Per-scene prompt budget: objects + transcript excerpt (estimated tokens)
+    llm_prompt_token_budget: int = Field(default=400, alias="LLM_PROMPT_TOKEN_BUDGET")
+    llm_max_objects: int = Field(default=15, alias="LLM_MAX_OBJECTS")
+    # Persistent generate/embed cache (SQLite file); empty disables it
+    llm_cache_path: str = Field(default="", alias="LLM_CACHE_PATH")
+    llm_cache_ttl_sec: float = Field(default=30 * 24 * 3600, alias="LLM_CACHE_TTL_SEC")
+    llm_cache_max_mb: int = Field(default=256, alias="LLM_CACHE_MAX_MB")
+    # Chat API: in-memory LRU of question embeddings (0 entries = off)
+    chat_embedding_cache_size: int = Field(default=1024, alias="CHAT_EMBEDDING_CACHE_SIZE")
+    chat_embedding_cache_ttl_sec: float = Field(default=3600, alias="CHAT_EMBEDDING_CACHE_TTL_SEC")
+    # Chat API: answers by question + filters until highlights change (0 MB = off)
+    chat_result_cache_mb: int = Field(default=64, alias="CHAT_RESULT_CACHE_MB")
+    # Chat API: questions per /chat/batch request (one embedding call, one search statement)
+    chat_batch_max_questions: int = Field(default=256, alias="CHAT_BATCH_MAX_QUESTIONS")
+
+    # Ingestion queue (app/db/jobs.py) and its workers (python -m app.worker)
+    job_max_attempts: int = Field(default=3, alias="JOB_MAX_ATTEMPTS")
+    # A running job whose worker stops heartbeating is handed to another worker after this long
+    job_lease_sec: float = Field(default=300.0, alias="JOB_LEASE_SEC")
+    job_heartbeat_sec: float = Field(default=30.0, alias="JOB_HEARTBEAT_SEC")
+    # Failed attempts wait base * 2^(attempt-1) seconds (full jitter, capped) before the next one
+    job_retry_base_sec: float = Field(default=30.0, alias="JOB_RETRY_BASE_SEC")
+    job_retry_max_sec: float = Field(default=1800.0, alias="JOB_RETRY_MAX_SEC")
+    worker_poll_sec: float = Field(default=2.0, alias="WORKER_POLL_SEC")  # idle workers look for jobs this often
+
+    # Max in-flight async requests per provider
+    llm_max_concurrency: int = Field(default=8, alias="LLM_MAX_CONCURRENCY")
+
+    # Provider routing: "single" uses the first available key (Gemini → OpenAI → Claude);
+    # "balanced" spreads generate() over every configured provider with failover
+    llm_routing: str = Field(default="single", alias="LLM_ROUTING")
+    llm_provider_weights: str = Field(default="", alias="LLM_PROVIDER_WEIGHTS")  # e.g. "gemini=2,openai=1"
+    embedding_provider: str = Field(default="", alias="EMBEDDING_PROVIDER")  # pin embeddings to one provider
+    llm_breaker_failures: int = Field(default=3, alias="LLM_BREAKER_FAILURES")
+    llm_breaker_reset_sec: float = Field(default=30.0, alias="LLM_BREAKER_RESET_SEC")
+
+    # Shared retry/backoff engine (app/llm/retry.py)
+    llm_retry_max_attempts: int = Field(default=5, alias="LLM_RETRY_MAX_ATTEMPTS")
+    llm_retry_base_delay: float = Field(default=1.0, alias="LLM_RETRY_BASE_DELAY")
+    llm_retry_max_delay: float = Field(default=30.0, alias="LLM_RETRY_MAX_DELAY")
+    # AIMD request pacing per provider (requests/second)
+    llm_initial_rps: float = Field(default=10.0, alias="LLM_INITIAL_RPS")
+    llm_min_rps: float = Field(default=0.2, alias="LLM_MIN_RPS")
+    llm_max_rps: float = Field(default=100.0, alias="LLM_MAX_RPS")
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     @field_validator("frame_sample_every_sec")
@@ -32,6 +121,97 @@ class Settings(BaseSettings):
             raise ValueError("FRAME_SAMPLE_EVERY_SEC must be > 0")
         return v
 
+    @field_validator(
+        "llm_batch_max_scenes", "llm_batch_token_budget", "llm_prompt_token_budget", "llm_max_objects",
+        "llm_max_concurrency", "llm_retry_max_attempts", "db_copy_threshold", "vector_ef_search",
+        "vector_index_defer_rows", "fts_max_candidates", "hybrid_candidates", "hybrid_rrf_k",
+        "object_filter_exact_max", "vector_rescore_factor", "db_async_pool_size", "chat_batch_max_questions",
+        "job_max_attempts",
+    )
+    @classmethod
+    def _positive_batch_limits(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError("Batch, concurrency, retry and search limits must be >= 1")
+        return v
+
+    @field_validator("embedding_backend")
+    @classmethod
+    def _known_embedding_backend(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("provider", "local"):
+            raise ValueError("EMBEDDING_BACKEND must be 'provider' or 'local'")
+        return v
+
+    @field_validator("llm_routing")
+    @classmethod
+    def _known_routing(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("single", "balanced"):
+            raise ValueError("LLM_ROUTING must be 'single' or 'balanced'")
+        return v
+
+    @field_validator("llm_initial_rps", "llm_min_rps", "llm_max_rps")
+    @classmethod
+    def _positive_rate(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("LLM request rates must be > 0")
+        return v
+
+    @field_validator("job_lease_sec", "job_heartbeat_sec", "job_retry_max_sec", "worker_poll_sec")
+    @classmethod
+    def _positive_job_timing(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("Job lease, heartbeat, retry and poll intervals must be > 0")
+        return v
+
+    @field_validator("job_heartbeat_sec")
+    @classmethod
+    def _heartbeat_within_lease(cls, v: float, info) -> float:
+        lease = info.data.get("job_lease_sec")
+        if lease is not None and v >= lease:
+            raise ValueError("JOB_HEARTBEAT_SEC must be shorter than JOB_LEASE_SEC")
+        return v
+
+    @field_validator("vector_index_method")
+    @classmethod
+    def _known_index_method(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("auto", "hnsw", "ivfflat"):
+            raise ValueError("VECTOR_INDEX_METHOD must be 'auto', 'hnsw' or 'ivfflat'")
+        return v
+
+    @field_validator("storage_backend")
+    @classmethod
+    def _known_storage_backend(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("postgres", "sqlite"):
+            raise ValueError("STORAGE_BACKEND must be 'postgres' or 'sqlite'")
+        return v
+
+    @field_validator("vector_quantization")
+    @classmethod
+    def _known_vector_quantization(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("none", "halfvec", "binary"):
+            raise ValueError("VECTOR_QUANTIZATION must be 'none', 'halfvec' or 'binary'")
+        return v
+
+    @field_validator("sqlite_quantization")
+    @classmethod
+    def _known_sqlite_quantization(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("none", "int8", "binary"):
+            raise ValueError("SQLITE_QUANTIZATION must be 'none', 'int8' or 'binary'")
+        return v
+
+    @field_validator("sqlite_embedding_dtype")
+    @classmethod
+    def _known_embedding_dtype(cls, v: str) -> str:
+        v = v.strip().lower()
+        if v not in ("float32", "float16"):
+            raise ValueError("SQLITE_EMBEDDING_DTYPE must be 'float32' or 'float16'")
+        return v
+
     def db_url(self) -> str:
         return (
             f"postgresql+psycopg2://{self.postgres_user}:{self.postgres_password}"
@@ -0,0 +1,174 @@
+import asyncio
+import re
+from typing import Optional
+
+from sqlalchemy import URL, make_url, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.config import Config
+from app.db.indexing import CURRENT_SQL, INDEX_NAME, VERSION_SQL, IndexInfo, IndexManager
+from app.db.repository import (
+    Repository, group_rows, hybrid_many_sql, hybrid_sql, in_scope_sql, many_params, ranked_sql, scope_sql,
+    trigram_sql, vector_sql,
+)
+from app.types import SearchScope
+
+
+def async_url(url: "str | URL | None" = None) -> URL:
+    """The sync (psycopg2) database URL on the asyncpg driver, with its prepared statement cache size."""
+    u = make_url(url or Config.db_url()).set(drivername="postgresql+asyncpg")
+    return u.update_query_dict({"prepared_statement_cache_size": str(Config.db_statement_cache_size)})
+
+
+class AsyncRepository:
+    """
+    Read path of Repository (vector / keyword / hybrid search) on an asyncio
+    engine, for the chat API: a query waiting on Postgres holds no thread, so
+    one worker serves as many concurrent queries as the pool has connections
+    (DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW), the rest queue for one.
+    asyncpg prepares each statement once per connection and reuses it.
+    Writes and schema management stay on the sync Repository.
+    """
+
+    def __init__(self, url: "str | URL | None" = None):
+        self.engine = create_async_engine(
+            async_url(url),
+            pool_size=Config.db_async_pool_size,
+            max_overflow=Config.db_async_max_overflow,
+            pool_pre_ping=True,
+        )
+        self.indexes = IndexManager(None)  # index info is read over the async engine, see _prepare
+        self._has_trgm: Optional[bool] = None
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+    async def warm(self, connections: int) -> None:
+        """Open `connections` pooled connections at once and load the index info queries need."""
+
+        async def one() -> None:
+            async with self.engine.begin() as conn:
+                await self._prepare(conn, 1)
+
+        await asyncio.gather(*(one() for _ in range(connections)))
+
+    async def _prepare(self, conn: AsyncConnection, top_k: int, ef_search=None, probes=None, filtered=False) -> int:
+        """Refresh the cached index info, then set this transaction's search knobs in one round trip."""
+        if not self.indexes.is_fresh():
+            row = (await conn.execute(text(CURRENT_SQL), {"name": INDEX_NAME})).first()
+            self.indexes.remember(IndexInfo.from_row(row.indexdef, row.note) if row else None)
+        if not self.indexes.version_known():
+            self.indexes.remember_version((await conn.execute(text(VERSION_SQL))).scalar())
+        first = self.indexes.first_pass_rows(top_k)
+        settings = list(self.indexes.search_params(first, ef_search, probes, filtered).items())
+        await conn.execute(
+            text("SELECT " + ", ".join(f"set_config(:k{i}, :v{i}, true)" for i in range(len(settings)))),
+            {f"{p}{i}": str(x) for i, kv in enumerate(settings) for p, x in zip("kv", kv)},
+        )
+        return first
+
+    @staticmethod
+    async def _few_in_scope(conn: AsyncConnection, cond: str, scope_params: dict) -> bool:
+        """See Repository._few_in_scope."""
+        cap = Config.object_filter_exact_max
+        return (await conn.execute(text(in_scope_sql(cond)), {**scope_params, "scope_cap": cap})).scalar() < cap
+
+    async def vector_search(
+        self,
+        query_emb: list[float],
+        top_k: int = 5,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """See Repository.vector_search (no object filter; a scope under OBJECT_FILTER_EXACT_MAX is scanned exactly)."""
+        cond, scope_params = scope_sql(scope)
+        async with self.engine.begin() as conn:
+            exact_scan = bool(cond) and await self._few_in_scope(conn, cond, scope_params)
+            first = await self._prepare(conn, top_k, ef_search, probes, filtered=bool(cond))
+            res = await conn.execute(
+                text(vector_sql(self.indexes.quantization(), where=cond, exact_scan=exact_scan)),
+                {**scope_params, "emb": str(list(query_emb)), "k": top_k, "rescore_n": first},
+            )
+            return [{**r._mapping, "score": float(r.score)} for r in res]
+
+    async def hybrid_search(
+        self,
+        query: str,
+        query_emb: list[float],
+        top_k: int = 5,
+        candidates: int | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """See Repository.hybrid_search."""
+        n = max(candidates or Config.hybrid_candidates, top_k)
+        cond, scope_params = scope_sql(scope)
+        async with self.engine.begin() as conn:
+            exact_scan = bool(cond) and await self._few_in_scope(conn, cond, scope_params)
+            first = await self._prepare(conn, n, ef_search, probes, filtered=bool(cond))
+            res = await conn.execute(
+                text(hybrid_sql(self.indexes.quantization(), where=cond, exact_scan=exact_scan)),
+                {
+                    **scope_params,
+                    "emb": str(list(query_emb)),
+                    "terms": Repository._tsquery(query, "|"),
+                    "n": n,
+                    "rescore_n": first,
+                    "k": top_k,
+                    "cap": Config.fts_max_candidates,
+                    "rrf_k": Config.hybrid_rrf_k,
+                },
+            )
+            return [{**r._mapping, "score": float(r.score)} for r in res]
+
+    async def hybrid_search_many(
+        self,
+        queries: list[str],
+        query_embs: list[list[float]],
+        top_k: int = 5,
+        scope: SearchScope | None = None,
+    ) -> list[list[dict]]:
+        """See Repository.hybrid_search_many."""
+        if not queries:
+            return []
+        n = max(Config.hybrid_candidates, top_k)
+        cond, scope_params = scope_sql(scope)
+        async with self.engine.begin() as conn:
+            exact_scan = bool(cond) and await self._few_in_scope(conn, cond, scope_params)
+            first = await self._prepare(conn, n, filtered=bool(cond))
+            res = await conn.execute(
+                text(hybrid_many_sql(len(queries), self.indexes.quantization(), where=cond, exact_scan=exact_scan)),
+                {**scope_params, **many_params(queries, query_embs), "n": n, "rescore_n": first, "k": top_k,
+                 "cap": Config.fts_max_candidates, "rrf_k": Config.hybrid_rrf_k},
+            )
+            return group_rows(res, len(queries))
+
+    async def _ranked(self, conn: AsyncConnection, terms: str, top_k: int, exclude: list[int], cond, scope_params):
+        res = await conn.execute(
+            text(ranked_sql(cond)),
+            {**scope_params, "terms": terms, "k": top_k, "exclude": exclude, "cap": Config.fts_max_candidates},
+        )
+        return [dict(r._mapping) for r in res]
+
+    async def keyword_search(self, query: str, top_k: int = 5, scope: SearchScope | None = None) -> list[dict]:
+        """See Repository.keyword_search: all terms, then any term, then pg_trgm word similarity."""
+        if not re.search(r"\w", query):
+            return []
+        cond, scope_params = scope_sql(scope)
+        async with self.engine.connect() as conn:
+            rows = await self._ranked(conn, Repository._tsquery(query, "&"), top_k, [], cond, scope_params)
+            if len(rows) < top_k:
+                rows += await self._ranked(
+                    conn, Repository._tsquery(query, "|"), top_k - len(rows), [r["id"] for r in rows],
+                    cond, scope_params,
+                )
+            if self._has_trgm is None:
+                self._has_trgm = bool(
+                    (await conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))).scalar()
+                )
+            if rows or not self._has_trgm:
+                return rows
+            res = await conn.execute(text(trigram_sql(cond)), {**scope_params, "query": query, "k": top_k})
+            return [dict(r._mapping) for r in res]
@@ -0,0 +1,132 @@
+"""
+Storage backend interface behind the repository.
+
+- Repository (app/db/repository.py): PostgreSQL + pgvector, the default.
+- SQLiteRepository (app/db/sqlite_backend.py): embedded, no server; metadata
+  and full-text search in SQLite, embeddings in a memory-mapped matrix
+  searched with NumPy.
+
+open_repository() picks one from a URL (postgresql+... or sqlite:///dir) or
+from STORAGE_BACKEND.
+
+Search methods return dicts with id, video_id, ts_start_sec, ts_end_sec,
+description, llm_summary, objects and score (higher is better). A
+SearchScope (app/types.py) limits them to some videos, a time range and a
+minimum highlight confidence.
+"""
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.config import Config
+from app.llm.tokens import Usage
+from app.types import HighlightModel, SearchScope, VideoRecord
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def create_schema(self) -> None:
+        """Create tables/files if missing and apply upgrades (idempotent)."""
+
+    @abstractmethod
+    def upsert_video(self, source: str, video_uid: str | None, duration_sec: int | None) -> VideoRecord: ...
+
+    @abstractmethod
+    def record_usage(self, video_id: int, usage: Usage) -> None:
+        """Add one processing run's LLM usage to the video's running totals."""
+
+    @abstractmethod
+    def video_usage(self, video_id: int) -> dict: ...
+
+    @abstractmethod
+    def add_highlights(self, video_id: int, highlights: List[HighlightModel], replace: bool = False) -> List[int]:
+        """
+        Insert highlights (and their detected objects); ids in input order.
+        replace=True deletes the video's earlier highlights in the same
+        transaction: readers never see it empty, concurrent replaces don't stack.
+        """
+
+    @abstractmethod
+    def get_highlights(self, ids: List[int]) -> List[dict]:
+        """Stored highlights by id (input order, missing ids skipped), embedding included."""
+
+    @abstractmethod
+    def delete_highlights(self, video_id: int) -> int:
+        """Remove a video's highlights; returns how many were deleted."""
+
+    def highlights_version(self) -> int | None:
+        """
+        Changes whenever committed highlights change, so results cached under
+        one version are current while it holds; None = unknown, don't cache.
+        """
+        return None
+
+    @abstractmethod
+    def ping(self) -> None:
+        """One round trip to the store; raises if it is unreachable."""
+
+    def close(self) -> None:
+        """Release connections and background threads."""
+
+    @abstractmethod
+    def vector_search(
+        self,
+        query_emb: list[float],
+        top_k: int = 5,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        objects: list[str] | None = None,
+        match_all: bool = True,
+        min_conf: float = 0.0,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """Cosine top-k; score = cosine similarity. objects and scope restrict the search."""
+
+    @abstractmethod
+    def keyword_search(self, query: str, top_k: int = 5, scope: SearchScope | None = None) -> list[dict]:
+        """Ranked full-text search over description, llm_summary and objects."""
+
+    @abstractmethod
+    def hybrid_search(
+        self,
+        query: str,
+        query_emb: list[float],
+        top_k: int = 5,
+        candidates: int | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """Vector and full-text candidates fused by reciprocal rank; rows carry vector_rank / lexical_rank."""
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        query_embs: list[list[float]],
+        top_k: int = 5,
+        scope: SearchScope | None = None,
+    ) -> list[list[dict]]:
+        """hybrid_search for each query (same order); backends override this to search them all at once."""
+        return [self.hybrid_search(q, emb, top_k=top_k, scope=scope) for q, emb in zip(queries, query_embs)]
+
+    @abstractmethod
+    def object_search(
+        self, objects: list[str], top_k: int = 5, match_all: bool = True, min_conf: float = 0.0
+    ) -> list[dict]:
+        """Highlights containing all (match_all) or any of the objects, best detections first."""
+
+    @abstractmethod
+    def highlight_objects(self, highlight_id: int) -> list[dict]:
+        """Detected objects of one highlight: name, max_conf, count (best first)."""
+
+
+def open_repository(url: str | None = None) -> StorageBackend:
+    """sqlite:///path → SQLiteRepository(path); any other URL → Repository; no URL → STORAGE_BACKEND."""
+    if url is None and Config.storage_backend == "sqlite":
+        url = f"sqlite:///{Config.sqlite_path}"
+    if url and url.startswith("sqlite:"):
+        from app.db.sqlite_backend import SQLiteRepository
+
+        return SQLiteRepository(url.split("sqlite:///", 1)[-1])
+    from app.db.repository import Repository
+
+    return Repository(url)
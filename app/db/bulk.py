@@ -0,0 +1,92 @@
+"""
+Bulk write path for highlights: PostgreSQL binary COPY.
+
+Rows are streamed into a temporary staging table in COPY's binary format, so
+embeddings travel as raw float32 (pgvector's binary wire format) instead of
+768 decimal strings per row, then moved into ``highlights`` with one
+INSERT ... SELECT. The staging table pins the column types, so the same bytes
+work whether ``highlights.confidence`` was created as NUMERIC (init_db.sql)
+or double precision (SQLAlchemy create_all).
+"""
+import io
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+HIGHLIGHT_COLUMNS = (
+    "id", "video_id", "ts_start_sec", "ts_end_sec", "description", "llm_summary", "embedding", "objects", "confidence",
+)
+
+_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+_INT4 = struct.Struct(">ii")  # length 4 + value
+_FLOAT8 = struct.Struct(">id")  # length 8 + value
+
+
+def _text(value: Optional[str]) -> bytes:
+    if value is None:
+        return _NULL
+    data = value.encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+
+def encode_copy_binary(rows: Sequence[tuple], embeddings: np.ndarray) -> bytes:
+    """
+    COPY BINARY payload for HIGHLIGHT_COLUMNS.
+    ``rows`` are (id, video_id, ts_start_sec, ts_end_sec, description, llm_summary, objects, confidence);
+    ``embeddings`` is the matching (n, dim) matrix.
+    """
+    n, dim = embeddings.shape
+    vectors = np.ascontiguousarray(embeddings, dtype=">f4").tobytes()
+    vec_size = 4 * dim
+    # pgvector binary format: int16 dim, int16 unused, float32[dim]
+    vec_prefix = struct.pack(">iHH", 4 + vec_size, dim, 0)
+    field_count = struct.pack(">h", len(HIGHLIGHT_COLUMNS))
+
+    parts = [_HEADER]
+    for i, (hid, video_id, start, end, description, summary, objects, confidence) in enumerate(rows):
+        parts += [
+            field_count,
+            _INT4.pack(4, hid),
+            _INT4.pack(4, video_id),
+            _INT4.pack(4, start),
+            _INT4.pack(4, end),
+            _text(description),
+            _text(summary),
+            vec_prefix,
+            vectors[i * vec_size:(i + 1) * vec_size],
+            _text(objects),
+            _NULL if confidence is None else _FLOAT8.pack(8, confidence),
+        ]
+    parts.append(_TRAILER)
+    return b"".join(parts)
+
+
+def copy_highlights(dbapi_conn, rows: Sequence[tuple], embeddings: np.ndarray) -> list[int]:
+    """
+    Insert rows (without ids) through a binary COPY on a psycopg2 connection,
+    inside the caller's transaction. Returns the new ids in input order.
+    """
+    n, dim = embeddings.shape
+    cols = ", ".join(HIGHLIGHT_COLUMNS)
+    with dbapi_conn.cursor() as cur:
+        # Ids are drawn up front so they map back to input order without relying on RETURNING order
+        cur.execute(
+            "SELECT nextval(pg_get_serial_sequence('highlights', 'id')) FROM generate_series(1, %s)", (n,)
+        )
+        ids = [r[0] for r in cur.fetchall()]
+        cur.execute(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS highlights_stage (
+                id INT, video_id INT, ts_start_sec INT, ts_end_sec INT,
+                description TEXT, llm_summary TEXT, embedding vector({dim}), objects TEXT, confidence FLOAT8
+            ) ON COMMIT DROP
+            """
+        )
+        payload = encode_copy_binary([(hid, *row) for hid, row in zip(ids, rows)], embeddings)
+        cur.copy_expert("COPY highlights_stage FROM STDIN WITH (FORMAT binary)", io.BytesIO(payload))
+        cur.execute(f"INSERT INTO highlights ({cols}) SELECT {cols} FROM highlights_stage")
+        cur.execute("DROP TABLE highlights_stage")
+    return ids
@@ -0,0 +1,117 @@
+"""
+Change notifications for the highlights table.
+
+A statement-level trigger NOTIFYs `highlights_changed` after every INSERT,
+UPDATE, DELETE or TRUNCATE, whichever path wrote (add_highlights, COPY
+loads, cascades from videos, manual SQL). Notifications are delivered at
+commit, and Postgres folds the duplicates of one transaction into one.
+
+ChangeListener LISTENs on a dedicated connection in a daemon thread and
+turns them into a version number: every notification (and every reconnect,
+which may have missed some) bumps it. Readers that cache anything derived
+from highlights read the version before computing and keep an entry only
+while the version is unchanged; a write that commits mid-computation bumps
+it afterwards, so such an entry is never served. While the connection is
+down the version is None: don't cache.
+"""
+import select
+import threading
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+
+CHANNEL = "highlights_changed"
+
+TRIGGER_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION notify_highlights_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{CHANNEL}', '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    # CREATE OR REPLACE TRIGGER needs Postgres 14
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'highlights_changed_notify') THEN
+            CREATE TRIGGER highlights_changed_notify
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON highlights
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_highlights_changed();
+        END IF;
+    END;
+    $$
+    """,
+]
+
+
+class ChangeListener:
+    """Version of the highlights table as seen through LISTEN (see module docstring)."""
+
+    def __init__(self, engine: Engine, channel: str = CHANNEL, poll_sec: float = 1.0, max_backoff_sec: float = 30.0):
+        self.engine = engine
+        self.channel = channel
+        self.poll_sec = poll_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.notifications = 0
+        self._version = 0
+        self._connected = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="highlights-listener", daemon=True)
+        self._thread.start()
+
+    def current(self) -> Optional[int]:
+        """Current version, or None while not listening."""
+        with self._lock:
+            return self._version if self._connected else None
+
+    def bump(self) -> None:
+        """Local write committed: invalidate now rather than when its notification arrives."""
+        with self._lock:
+            self._version += 1
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.poll_sec + 1)
+
+    def _set_connected(self, connected: bool) -> None:
+        with self._lock:
+            # Reconnecting may have missed notifications: treat it as a change
+            self._version += 1
+            self._connected = connected
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            conn = None
+            try:
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                raw.detach()  # held for the listener's lifetime, never returned to the pool
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {self.channel}")
+                self._set_connected(True)
+                backoff = 0.5
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_sec) == ([], [], []):
+                        conn.cursor().execute("SELECT 1")  # notices a dead connection
+                    conn.poll()
+                    if conn.notifies:
+                        with self._lock:
+                            self.notifications += len(conn.notifies)
+                            self._version += 1
+                        conn.notifies.clear()
+            except Exception as e:
+                if self._connected:
+                    print(f"⚠️ Lost the highlights change listener, result caching paused: {e}")
+                self._set_connected(False)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff_sec)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,431 @@
+"""
+Lifecycle of the ANN index on highlights.embedding.
+
+- plan():   HNSW up to VECTOR_INDEX_HNSW_MAX_ROWS rows (builds incrementally,
+            good recall from the first row), ivfflat beyond that with
+            lists sized to the row count (rows/1000, sqrt(rows) past 1M).
+- ensure(): create the planned index if none exists.
+- rebuild(): build the planned index concurrently under a temporary name and
+            swap it in, so searches keep working during the build. Builds
+            take a session advisory lock: with several writers (app.worker
+            processes) one builds and the others skip instead of colliding.
+- deferred(): drop the index for the duration of a large load and build it
+            once afterwards (maintaining HNSW row by row is far slower).
+- after_bulk_load(): rebuild when the existing index no longer fits the
+            table (ivfflat trained on far fewer rows, or the wrong method).
+            Both run after the load committed and only log their failures.
+- search_settings(): SET LOCAL hnsw.ef_search / ivfflat.probes for one query;
+            filtered queries also turn on iterative index scans (pgvector
+            >= 0.8), which keep scanning until enough rows pass the filter.
+
+Quantization (VECTOR_QUANTIZATION, pgvector >= 0.7): the index is built over
+a compact expression of the embedding instead of the float32 vector itself,
+- halfvec: embedding::halfvec, 2 bytes per dimension (about half the index);
+- binary:  binary_quantize(embedding), 1 bit per dimension, Hamming distance.
+The table keeps the float32 column: nearest_sql() takes VECTOR_RESCORE_FACTOR
+times the requested rows from the compact index and reorders them by exact
+cosine distance. Switching is a concurrent reindex over the existing rows
+(no data rewrite), and on an older pgvector the plain index is kept.
+
+CLI:
+    python -m app.db.indexing status
+    python -m app.db.indexing reindex [--method hnsw|ivfflat] [--lists N] [--quantization none|halfvec|binary]
+"""
+import argparse
+import json
+import math
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.config import Config
+
+INDEX_NAME = "highlights_embedding_idx"
+TABLE = "highlights"
+OPCLASS = "vector_cosine_ops"  # vector_search orders by cosine distance
+DIM = 768  # Highlight.embedding
+# Session advisory lock held while the index is dropped or built (one builder across all processes)
+BUILD_LOCK_SQL = f"SELECT pg_try_advisory_lock(hashtext('{INDEX_NAME}'))"
+BUILD_UNLOCK_SQL = f"SELECT pg_advisory_unlock(hashtext('{INDEX_NAME}'))"
+
+# quantization → (indexed expression, operator class, first-pass distance to the query :emb)
+QUANTIZED = {
+    "halfvec": (
+        f"(embedding::halfvec({DIM}))",
+        "halfvec_cosine_ops",
+        f"h.embedding::halfvec({DIM}) <=> CAST(:emb AS halfvec({DIM}))",
+    ),
+    "binary": (
+        f"(binary_quantize(embedding)::bit({DIM}))",
+        "bit_hamming_ops",
+        f"binary_quantize(h.embedding)::bit({DIM}) <~> binary_quantize(CAST(:emb AS vector({DIM})))",
+    ),
+}
+
+
+@dataclass
+class IndexPlan:
+    method: str  # "hnsw" | "ivfflat"
+    params: dict = field(default_factory=dict)
+    quantization: str = "none"  # "none" | "halfvec" | "binary"
+
+    def ddl(self, name: str, concurrently: bool = False) -> str:
+        opts = ", ".join(f"{k} = {v}" for k, v in self.params.items())
+        expr, opclass = ("embedding", OPCLASS) if self.quantization == "none" else QUANTIZED[self.quantization][:2]
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{name} ON {TABLE} "
+            f"USING {self.method} ({expr} {opclass})" + (f" WITH ({opts})" if opts else "")
+        )
+
+
+VERSION_SQL = "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+
+# Definition and build note of the index; bind :name = INDEX_NAME
+CURRENT_SQL = (
+    "SELECT pg_get_indexdef(i.indexrelid) AS indexdef, obj_description(i.indexrelid, 'pg_class') AS note "
+    "FROM pg_index i WHERE i.indexrelid = to_regclass(:name)"
+)
+
+
+@dataclass
+class IndexInfo:
+    method: str
+    params: dict
+    built_rows: Optional[int]  # row count recorded when the index was built
+    quantization: str = "none"
+
+    @classmethod
+    def from_row(cls, indexdef: str, note: Optional[str]) -> "IndexInfo":
+        m = re.search(r"USING (\w+)", indexdef)
+        params = {k: int(v) for k, v in re.findall(r"(\w+)='?(\d+)'?", indexdef.split("WITH", 1)[1])} \
+            if " WITH (" in indexdef else {}
+        built_rows = None
+        try:
+            built_rows = json.loads(note or "{}").get("rows")
+        except ValueError:
+            pass
+        quantization = "binary" if "binary_quantize" in indexdef else "halfvec" if "halfvec" in indexdef else "none"
+        return cls(m.group(1) if m else "unknown", params, built_rows, quantization)
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def plan_for(rows: int, method: Optional[str] = None, quantization: Optional[str] = None) -> IndexPlan:
+    method = method or Config.vector_index_method
+    quantization = quantization or Config.vector_quantization
+    if method == "auto":
+        method = "hnsw" if rows <= Config.vector_index_hnsw_max_rows else "ivfflat"
+    if method == "hnsw":
+        return IndexPlan("hnsw", {"m": 16, "ef_construction": 64}, quantization)
+    return IndexPlan("ivfflat", {"lists": ivfflat_lists(rows)}, quantization)
+
+
+def nearest_sql(quantization: str = "none", where: str = "", limit: str = ":k", exact_scan: bool = False) -> str:
+    """
+    SELECT id, dist of the `limit` highlights (alias h, optionally filtered by
+    `where`) nearest to :emb by exact cosine distance, ordered by the ANN index.
+    With a quantized index, the index scan ranks :rescore_n rows by their
+    compact codes and only those get exact distances. exact_scan keeps the
+    planner off the ANN index (selective filters: distances for matches only).
+    """
+    exact = "h.embedding <=> CAST(:emb AS vector)"
+    cond = f"WHERE {where}" if where else ""
+    if exact_scan:
+        return f"SELECT h.id, {exact} AS dist FROM highlights h {cond} ORDER BY ({exact}) + 0, h.id LIMIT {limit}"
+    if quantization == "none":
+        return f"SELECT h.id, {exact} AS dist FROM highlights h {cond} ORDER BY {exact} LIMIT {limit}"
+    return (
+        f"SELECT c.id, c.dist FROM (SELECT h.id, {exact} AS dist FROM highlights h {cond} "
+        f"ORDER BY {QUANTIZED[quantization][2]} LIMIT :rescore_n) c ORDER BY c.dist, c.id LIMIT {limit}"
+    )
+
+
+class IndexManager:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._cached: tuple[float, Optional[IndexInfo]] = (float("-inf"), None)
+        self._version: Optional[tuple] = None
+        self._warned = False
+
+    # ----- inspection -----
+
+    def pgvector_version(self) -> tuple:
+        if self._version is None:
+            with self.engine.connect() as conn:
+                self.remember_version(conn.execute(text(VERSION_SQL)).scalar())
+        return self._version
+
+    def version_known(self) -> bool:
+        return self._version is not None
+
+    def remember_version(self, extversion: Optional[str]) -> None:
+        self._version = tuple(int(p) for p in re.findall(r"\d+", extversion or "0"))
+
+    def iterative_scans(self) -> bool:
+        """pgvector >= 0.8 can resume an index scan until enough rows pass a WHERE filter."""
+        return self.pgvector_version() >= (0, 8)
+
+    def _supported(self, plan: IndexPlan) -> IndexPlan:
+        """halfvec and binary_quantize arrived in pgvector 0.7; keep the plain index before that."""
+        if plan.quantization != "none" and self.pgvector_version() < (0, 7):
+            if not self._warned:
+                print(f"⚠️ VECTOR_QUANTIZATION={plan.quantization} needs pgvector >= 0.7, using a plain index")
+                self._warned = True
+            plan.quantization = "none"
+        return plan
+
+    def row_count(self, exact: bool = False) -> int:
+        with self.engine.connect() as conn:
+            if not exact:
+                # Planner estimate: free, and accurate enough for sizing after ANALYZE/autovacuum
+                est = conn.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"), {"t": TABLE}
+                ).scalar()
+                if est is not None and est >= 0:
+                    return int(est)
+            return int(conn.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar())
+
+    def current(self) -> Optional[IndexInfo]:
+        with self.engine.connect() as conn:
+            row = conn.execute(text(CURRENT_SQL), {"name": INDEX_NAME}).first()
+        return IndexInfo.from_row(row.indexdef, row.note) if row else None
+
+    def plan(self, rows: Optional[int] = None) -> IndexPlan:
+        return self._supported(plan_for(self.row_count() if rows is None else rows))
+
+    def needs_rebuild(self, rows: Optional[int] = None) -> bool:
+        rows = self.row_count() if rows is None else rows
+        info = self.current()
+        planned = self.plan(rows)
+        if info is None or info.method != planned.method or info.quantization != planned.quantization:
+            return True
+        if info.method == "ivfflat":
+            # Centroids only reflect the rows present at build time
+            lists = info.params.get("lists", 0)
+            want = planned.params["lists"]
+            grown = info.built_rows is not None and rows > 2 * max(info.built_rows, 1)
+            return grown or not (want / 2 <= lists <= want * 2)
+        return False
+
+    # ----- building -----
+
+    @contextmanager
+    def _build_lock(self):
+        """Yields True while this session holds the build lock, False if another session does."""
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            locked = bool(conn.execute(text(BUILD_LOCK_SQL)).scalar())
+            try:
+                yield locked
+            finally:
+                if locked:
+                    conn.execute(text(BUILD_UNLOCK_SQL))
+
+    def _build(self, plan: IndexPlan, rows: int) -> None:
+        """Build and swap in `plan`; call with the build lock held."""
+        # Unique: a build that crashed halfway leaves an invalid index behind under its own name
+        tmp = f"{INDEX_NAME}_new_{uuid.uuid4().hex[:8]}"
+        note = json.dumps({"rows": rows, "built_at": int(time.time())})
+        try:
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"SET maintenance_work_mem = '{Config.vector_index_build_mem}'"))
+                conn.execute(text(plan.ddl(tmp, concurrently=True)))
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+                conn.execute(text(f"ALTER INDEX {tmp} RENAME TO {INDEX_NAME}"))
+                conn.execute(text(f"COMMENT ON INDEX {INDEX_NAME} IS '{note}'"))
+                conn.execute(text(f"ANALYZE {TABLE}"))
+        except Exception:
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"DROP INDEX IF EXISTS {tmp}"))
+            raise
+        finally:
+            self._cached = (float("-inf"), None)
+
+    def ensure(self) -> None:
+        """Create the planned index if the table has none (cheap on a new, empty table)."""
+        if self.current() is not None:
+            return
+        with self._build_lock() as locked:
+            # Not locked: another process is creating it right now
+            if locked and self.current() is None:
+                rows = self.row_count(exact=True)
+                self._build(self.plan(rows), rows)
+
+    def rebuild(
+        self, method: Optional[str] = None, lists: Optional[int] = None, quantization: Optional[str] = None
+    ) -> Optional[IndexPlan]:
+        """Build the planned (or given) index; None if another session is building one right now."""
+        with self._build_lock() as locked:
+            if not locked:
+                print("⚠️ Another session is building the vector index, skipped")
+                return None
+            return self._rebuild(method, lists, quantization)
+
+    def _rebuild(
+        self, method: Optional[str] = None, lists: Optional[int] = None, quantization: Optional[str] = None
+    ) -> IndexPlan:
+        """rebuild() with the build lock already held."""
+        rows = self.row_count(exact=True)
+        plan = self._supported(plan_for(rows, method, quantization))
+        if lists and plan.method == "ivfflat":
+            plan.params["lists"] = lists
+        quantized = f" on {plan.quantization} codes" if plan.quantization != "none" else ""
+        print(f"🔧 Building {plan.method} index {plan.params}{quantized} over {rows} rows...")
+        t0 = time.perf_counter()
+        self._build(plan, rows)
+        print(f"✅ Index ready in {time.perf_counter() - t0:.1f}s")
+        return plan
+
+    def drop(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        self._cached = (float("-inf"), None)
+
+    def should_defer(self, new_rows: int) -> bool:
+        """Loads that at least double the table (and are big) are cheaper to index afterwards."""
+        return new_rows >= Config.vector_index_defer_rows and new_rows >= self.row_count()
+
+    @contextmanager
+    def deferred(self):
+        """
+        Run a bulk load without the index; searches fall back to exact scans
+        meanwhile. The build lock is held from the drop to the rebuild, so other
+        sessions' ensure() doesn't rebuild the index under the load. While
+        another session builds the index the load runs with it in place. A
+        failed rebuild is logged, not raised: the load itself committed, and
+        the next ensure() or after_bulk_load() builds the index.
+        """
+        with self._build_lock() as locked:
+            if locked:
+                self.drop()
+            try:
+                yield
+            finally:
+                if locked:
+                    try:
+                        self._rebuild()
+                    except Exception as e:
+                        print(f"⚠️ Vector index rebuild after the load failed, searches scan exactly: {e}")
+
+    def after_bulk_load(self) -> bool:
+        """Rebuild if the index no longer matches the table; True when it did. Failures are logged."""
+        if not Config.vector_index_auto_rebuild:
+            return False
+        try:
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"ANALYZE {TABLE}"))  # refresh reltuples for sizing
+            return self.needs_rebuild() and self.rebuild() is not None
+        except Exception as e:
+            print(f"⚠️ Vector index maintenance after the load failed: {e}")
+            return False
+
+    # ----- query time -----
+
+    def search_settings(
+        self, top_k: int, ef_search: Optional[int] = None, probes: Optional[int] = None, filtered: bool = False
+    ) -> list[str]:
+        """
+        SET LOCAL statements for one query (run them inside its transaction).
+        Higher ef_search/probes → better recall, slower queries.
+        """
+        return [f"SET LOCAL {k} = {v}" for k, v in self.search_params(top_k, ef_search, probes, filtered).items()]
+
+    def search_params(
+        self, top_k: int, ef_search: Optional[int] = None, probes: Optional[int] = None, filtered: bool = False
+    ) -> dict:
+        # HNSW returns at most ef_search rows; pgvector caps the setting at 1000
+        ef = min(max(ef_search or Config.vector_ef_search, top_k), 1000)
+        params = {"hnsw.ef_search": int(ef), "ivfflat.probes": self._probes(probes)}
+        if filtered and self.iterative_scans():
+            # Results are re-sorted by exact distance afterwards, so relaxed order is enough
+            params.update({"hnsw.iterative_scan": "relaxed_order", "ivfflat.iterative_scan": "relaxed_order"})
+        return params
+
+    def _probes(self, probes: Optional[int] = None) -> int:
+        if probes is None:
+            probes = Config.vector_probes
+        if not probes:
+            info = self.current_cached()
+            lists = (info.params.get("lists") if info else None) or 1
+            probes = max(1, round(math.sqrt(lists)))
+        return int(probes)
+
+    def scan_size(self, ef_search: Optional[int] = None, probes: Optional[int] = None) -> Optional[int]:
+        """
+        Rows one index scan looks at with these settings (ef_search for HNSW,
+        the probed lists' rows for ivfflat); None when there is no index.
+        Filters applied to the scan's output can keep at most this many.
+        """
+        info = self.current_cached()
+        if info is None:
+            return None
+        if info.method == "hnsw":
+            return min(ef_search or Config.vector_ef_search, 1000)
+        lists = info.params.get("lists") or 1
+        rows = info.built_rows or self.row_count()
+        return min(rows, self._probes(probes) * rows // lists)
+
+    def quantization(self) -> str:
+        """Quantization of the index searches use now (it may lag VECTOR_QUANTIZATION until a reindex)."""
+        info = self.current_cached()
+        return info.quantization if info else "none"
+
+    def first_pass_rows(self, top_k: int) -> int:
+        """Rows taken from the index before rescoring; top_k itself without quantization."""
+        return top_k * Config.vector_rescore_factor if self.quantization() != "none" else top_k
+
+    def current_cached(self, ttl: float = 60.0) -> Optional[IndexInfo]:
+        # Without an engine (AsyncRepository) the owner refreshes it: a stale value beats no query at all
+        if not self.is_fresh(ttl) and self.engine is not None:
+            self.remember(self.current())
+        return self._cached[1]
+
+    def is_fresh(self, ttl: float = 60.0) -> bool:
+        return time.monotonic() - self._cached[0] <= ttl
+
+    def remember(self, info: Optional[IndexInfo]) -> None:
+        """Cache index info read elsewhere (the async repository inspects it over its own connection)."""
+        self._cached = (time.monotonic(), info)
+
+
+def main():
+    from app.db.repository import Repository
+
+    ap = argparse.ArgumentParser(description="Manage the highlights vector index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status")
+    rp = sub.add_parser("reindex")
+    rp.add_argument("--method", choices=["auto", "hnsw", "ivfflat"], default=None)
+    rp.add_argument("--lists", type=int, default=None, help="ivfflat lists (default: sized to the row count)")
+    rp.add_argument("--quantization", choices=["none", "halfvec", "binary"], default=None,
+                    help="index compact codes, rescored exactly (default: VECTOR_QUANTIZATION)")
+    ap.add_argument("--db-url", default=None)
+    args = ap.parse_args()
+
+    mgr = IndexManager(Repository(args.db_url).engine)
+    if args.cmd == "status":
+        rows = mgr.row_count(exact=True)
+        info = mgr.current()
+        print(f"rows: {rows}")
+        print(f"index: {info.method} {info.params}, quantization {info.quantization} "
+              f"(built over {info.built_rows} rows)" if info else "index: none")
+        print(f"pgvector: {'.'.join(map(str, mgr.pgvector_version()))}")
+        print(f"planned: {mgr.plan(rows)}; rebuild needed: {mgr.needs_rebuild(rows)}")
+    else:
+        mgr.rebuild(args.method, args.lists, args.quantization)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 -- Enable pgvector extension
 CREATE EXTENSION IF NOT EXISTS vector;
+-- pg_trgm (partial words / typos in keyword search) is optional: Repository.create_schema
+-- adds it and highlights_description_trgm_idx when the server has the extension
 
 -- Table: videos
 CREATE TABLE IF NOT EXISTS videos (
@@ -7,6 +9,9 @@ CREATE TABLE IF NOT EXISTS videos (
     source VARCHAR(1024) NOT NULL,
     video_uid VARCHAR(128) UNIQUE,
     duration_sec INT,
+    llm_calls INT NOT NULL DEFAULT 0,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -22,16 +27,84 @@ CREATE TABLE IF NOT EXISTS highlights (
     embedding vector(768) NOT NULL,
     objects TEXT,
     confidence NUMERIC,
-    created_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP DEFAULT NOW(),
+    -- Full-text search document: description (A), summary (B), object names (C)
+    search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(llm_summary, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(objects, '')), 'C')
+    ) STORED
+);
+
+-- Detected objects, normalized: a label dictionary and one row per (highlight, object)
+CREATE TABLE IF NOT EXISTS object_labels (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
 );
 
+CREATE TABLE IF NOT EXISTS highlight_objects (
+    highlight_id INT NOT NULL REFERENCES highlights(id) ON DELETE CASCADE,
+    object_id INT NOT NULL REFERENCES object_labels(id),
+    max_conf REAL NOT NULL,
+    count INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (highlight_id, object_id)
+);
+
+-- Object filters scan one object's highlights (optionally above a confidence) without touching the heap
+CREATE INDEX IF NOT EXISTS highlight_objects_object_idx
+ON highlight_objects (object_id, max_conf, highlight_id);
+
+-- Ingestion queue: workers claim with FOR UPDATE SKIP LOCKED and hold a lease (app/db/jobs.py)
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    source VARCHAR(1024) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued'
+        CONSTRAINT jobs_status_check CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    worker VARCHAR(128),
+    lease_until TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    last_error TEXT,
+    video_id INT REFERENCES videos(id) ON DELETE SET NULL,
+    highlights INT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS jobs_queued_idx ON jobs (run_after, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS jobs_running_lease_idx ON jobs (lease_until) WHERE status = 'running';
+-- One pending job per source: submitting it again returns that job
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_source_idx ON jobs (source) WHERE status IN ('queued', 'running');
+
 -- Vector index for fast similarity search
--- ivfflat works best with multiple lists; 100 is a reasonable default for small datasets.
+-- HNSW needs no training data, so it is valid on the empty table and stays accurate as rows arrive.
+-- Past VECTOR_INDEX_HNSW_MAX_ROWS rows app/db/indexing.py switches to ivfflat with lists sized to the
+-- row count; rebuild manually with: python -m app.db.indexing reindex
 CREATE INDEX IF NOT EXISTS highlights_embedding_idx
 ON highlights
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 100);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- Optional additional indexes
 CREATE INDEX IF NOT EXISTS highlights_video_ts_idx
 ON highlights (video_id, ts_start_sec);
+
+-- Keyword search: ranked full-text search
+CREATE INDEX IF NOT EXISTS highlights_search_tsv_idx
+ON highlights USING gin (search_tsv);
+
+-- Result caches: one NOTIFY highlights_changed per writing transaction (app/db/changes.py)
+CREATE OR REPLACE FUNCTION notify_highlights_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('highlights_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS highlights_changed_notify ON highlights;
+CREATE TRIGGER highlights_changed_notify
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON highlights
+FOR EACH STATEMENT EXECUTE FUNCTION notify_highlights_changed();
@@ -0,0 +1,196 @@
+"""
+Ingestion job queue on the `jobs` table (Postgres).
+
+Workers (app/worker.py) claim the oldest due job with
+`SELECT ... FOR UPDATE SKIP LOCKED`: concurrent claims skip each other's
+locked rows instead of waiting on them, so every worker gets a different
+job in one round trip and adding workers adds throughput.
+
+A claim is a lease: the job stays `running` until lease_until, which the
+worker pushes forward with heartbeats while it processes. A job whose lease
+ran out (worker crashed, was killed or lost the database) is requeued by the
+next claim. Every claim bumps `attempts`, and heartbeat / complete / fail
+only apply to the claim they name (worker and attempt), so a worker that
+lost its lease cannot overwrite the state of the job's new owner.
+
+A failed attempt requeues the job after an exponential backoff with full
+jitter, until max_attempts is reached; then it stays `failed`.
+"""
+import random
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+
+from app.config import Config
+from app.types import JobRecord
+from .models import Base, Job, Video
+
+# Running jobs whose lease ran out: back to the queue, or failed if that was their last attempt
+REAP_SQL = """
+UPDATE jobs SET
+    status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+    finished_at = CASE WHEN attempts >= max_attempts THEN now() END,
+    run_after = now(),
+    lease_until = NULL,
+    last_error = 'lease expired on worker ' || coalesce(worker, '?')
+WHERE id IN (
+    SELECT id FROM jobs WHERE status = 'running' AND lease_until < now()
+    FOR UPDATE SKIP LOCKED
+)
+"""
+
+CLAIM_SQL = """
+UPDATE jobs SET
+    status = 'running',
+    attempts = attempts + 1,
+    worker = :worker,
+    lease_until = now() + make_interval(secs => :lease),
+    heartbeat_at = now(),
+    started_at = now()
+WHERE id = (
+    SELECT id FROM jobs WHERE status = 'queued' AND run_after <= now()
+    ORDER BY run_after, id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING *
+"""
+
+# Heartbeat, complete and fail act only on the claim identified by (id, worker, attempts)
+_OWNED = "id = :id AND worker = :worker AND attempts = :attempt AND status = 'running'"
+
+HEARTBEAT_SQL = f"""
+UPDATE jobs SET heartbeat_at = now(), lease_until = now() + make_interval(secs => :lease)
+WHERE {_OWNED}
+RETURNING id
+"""
+
+COMPLETE_SQL = f"""
+UPDATE jobs SET
+    status = 'succeeded', finished_at = now(), lease_until = NULL,
+    video_id = :video_id, highlights = :highlights, last_error = NULL
+WHERE {_OWNED}
+RETURNING *
+"""
+
+FAIL_SQL = f"""
+UPDATE jobs SET
+    status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+    finished_at = CASE WHEN attempts >= max_attempts THEN now() END,
+    run_after = now() + make_interval(secs => :delay),
+    lease_until = NULL,
+    last_error = :error
+WHERE {_OWNED}
+RETURNING *
+"""
+
+# A source already queued or running is not queued twice (jobs_pending_source_idx)
+ENQUEUE_SQL = """
+INSERT INTO jobs (source, max_attempts) VALUES (:source, :max_attempts)
+ON CONFLICT (source) WHERE status IN ('queued', 'running') DO NOTHING
+RETURNING *
+"""
+
+PENDING_SQL = "SELECT * FROM jobs WHERE source = :source AND status IN ('queued', 'running')"
+
+_TIME_COLUMNS = ("run_after", "lease_until", "heartbeat_at", "created_at", "started_at", "finished_at")
+
+# Tables created before the time columns were timestamptz: naive values were written by now() in the
+# session TimeZone, which the cast applies again. Skipped once migrated (the ALTER rewrites the table).
+TIMESTAMPTZ_MIGRATION = f"""
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'jobs'
+          AND column_name = 'run_after' AND data_type = 'timestamp without time zone'
+    ) THEN
+        ALTER TABLE jobs {", ".join(f"ALTER COLUMN {c} TYPE timestamptz" for c in _TIME_COLUMNS)};
+    END IF;
+END $$
+"""
+
+
+def _record(row) -> Optional[JobRecord]:
+    return JobRecord(**row._mapping) if row is not None else None
+
+
+class JobQueue:
+    def __init__(
+        self,
+        url: str | None = None,
+        lease_sec: float | None = None,
+        retry_base_sec: float | None = None,
+        retry_max_sec: float | None = None,
+    ):
+        # A worker uses one connection at a time; the API a few
+        self.engine = create_engine(url or Config.db_url(), echo=False, future=True, pool_size=2, max_overflow=8)
+        self.lease_sec = lease_sec if lease_sec is not None else Config.job_lease_sec
+        self.retry_base_sec = retry_base_sec if retry_base_sec is not None else Config.job_retry_base_sec
+        self.retry_max_sec = retry_max_sec if retry_max_sec is not None else Config.job_retry_max_sec
+
+    def create_schema(self) -> None:
+        Base.metadata.create_all(self.engine, tables=[Video.__table__, Job.__table__])
+        with self.engine.begin() as conn:
+            conn.execute(text(TIMESTAMPTZ_MIGRATION))
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+    def enqueue(self, source: str, max_attempts: int | None = None) -> JobRecord:
+        """Queue `source`, or return the job already queued or running for it."""
+        params = {"source": source, "max_attempts": max_attempts or Config.job_max_attempts}
+        while True:
+            with self.engine.begin() as conn:
+                job = _record(conn.execute(text(ENQUEUE_SQL), params).first())
+                if job is None:
+                    job = _record(conn.execute(text(PENDING_SQL), params).first())
+            if job is not None:
+                return job
+            # The pending job finished between the two statements: queue a new one
+
+    def get(self, job_id: int) -> Optional[JobRecord]:
+        with self.engine.connect() as conn:
+            return _record(conn.execute(text("SELECT * FROM jobs WHERE id = :id"), {"id": job_id}).first())
+
+    def counts(self) -> dict[str, int]:
+        """Jobs per status."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT status, count(*) FROM jobs GROUP BY status")).all()
+        return {status: n for status, n in rows}
+
+    def claim(self, worker: str) -> Optional[JobRecord]:
+        """Lease the oldest due job to `worker`, after requeueing jobs with expired leases."""
+        with self.engine.begin() as conn:
+            conn.execute(text(REAP_SQL))
+            return _record(conn.execute(text(CLAIM_SQL), {"worker": worker, "lease": self.lease_sec}).first())
+
+    def heartbeat(self, job: JobRecord) -> bool:
+        """Extend the lease of a claimed job; False once the lease is lost (the job was requeued)."""
+        with self.engine.begin() as conn:
+            row = conn.execute(text(HEARTBEAT_SQL), {**self._owned(job), "lease": self.lease_sec}).first()
+        return row is not None
+
+    def complete(self, job: JobRecord, video_id: int | None, highlights: int) -> Optional[JobRecord]:
+        """Mark a claimed job succeeded; None if its lease was lost meanwhile."""
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                text(COMPLETE_SQL), {**self._owned(job), "video_id": video_id, "highlights": highlights}
+            ).first()
+        return _record(row)
+
+    def fail(self, job: JobRecord, error: str) -> Optional[JobRecord]:
+        """Requeue a claimed job after a backoff, or fail it on its last attempt; None if its lease was lost."""
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                text(FAIL_SQL), {**self._owned(job), "error": error, "delay": self.retry_delay(job.attempts)}
+            ).first()
+        return _record(row)
+
+    def retry_delay(self, attempt: int) -> float:
+        """Seconds before retrying after failed attempt `attempt` (1-based): full jitter, as in app/llm/retry.py."""
+        return random.uniform(0, min(self.retry_max_sec, max(self.retry_base_sec, 0.0) * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def _owned(job: JobRecord) -> dict:
+        return {"id": job.id, "worker": job.worker, "attempt": job.attempts}
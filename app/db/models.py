@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, relationship
-from sqlalchemy import Integer, String, Text, TIMESTAMP, ForeignKey, func
+from sqlalchemy import CheckConstraint, Integer, String, Text, TIMESTAMP, ForeignKey, Index, REAL, func, text
 from pgvector.sqlalchemy import Vector
 
 
@@ -18,6 +18,10 @@ class Video(Base):
     source: Mapped[str] = mapped_column(String(1024), nullable=False)
     video_uid: Mapped[Optional[str]] = mapped_column(String(128), unique=True)
     duration_sec: Mapped[Optional[int]] = mapped_column(Integer)
+    # LLM usage accumulated while processing this video
+    llm_calls: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now())
 
     highlights: Mapped[List["Highlight"]] = relationship(
@@ -46,3 +50,58 @@ class Highlight(Base):
     # __table_args__ = (
     #     Index("highlights_video_ts_idx", "video_id", "ts_start_sec"),
     # )
+
+
+class ObjectLabel(Base):
+    """Dictionary of detected object names (highlight_objects stores ids)."""
+    __tablename__ = "object_labels"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
+
+
+class HighlightObject(Base):
+    __tablename__ = "highlight_objects"
+
+    highlight_id: Mapped[int] = mapped_column(ForeignKey("highlights.id", ondelete="CASCADE"), primary_key=True)
+    object_id: Mapped[int] = mapped_column(ForeignKey("object_labels.id"), primary_key=True)
+    max_conf: Mapped[float] = mapped_column(REAL, nullable=False)  # 0 for rows backfilled from highlights.objects
+    count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __table_args__ = (
+        # Object filters: every highlight with an object (and confidence), index-only
+        Index("highlight_objects_object_idx", "object_id", "max_conf", "highlight_id"),
+    )
+
+
+class Job(Base):
+    """Ingestion work item: one video source for `python -m app.worker` (queue logic in app/db/jobs.py)."""
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    source: Mapped[str] = mapped_column(String(1024), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    # timestamptz: due times and leases compare with now() the same from any session TimeZone
+    run_after: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    worker: Mapped[Optional[str]] = mapped_column(String(128))
+    lease_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    video_id: Mapped[Optional[int]] = mapped_column(ForeignKey("videos.id", ondelete="SET NULL"))
+    highlights: Mapped[Optional[int]] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        CheckConstraint("status IN ('queued', 'running', 'succeeded', 'failed')", name="jobs_status_check"),
+        # Claims scan only queued jobs, in due order
+        Index("jobs_queued_idx", "run_after", "id", postgresql_where=text("status = 'queued'")),
+        # Lease reaping scans only running jobs
+        Index("jobs_running_lease_idx", "lease_until", postgresql_where=text("status = 'running'")),
+        # One pending job per source: submitting it again returns that job
+        Index("jobs_pending_source_idx", "source", unique=True,
+              postgresql_where=text("status IN ('queued', 'running')")),
+    )
@@ -0,0 +1,162 @@
+"""
+Detected objects per highlight, normalized.
+
+object_labels is a small dictionary (one row per object name) and
+highlight_objects holds one row per (highlight, object) with the best
+detection confidence and the number of detections. Object filters resolve
+names to label ids first, then use:
+
+- highlight_objects_object_idx (object_id, max_conf, highlight_id): all
+  highlights with an object, optionally above a confidence, index-only;
+- the primary key (highlight_id, object_id): "does this highlight
+  contain X" probes, for multi-object filters and for rows coming out of
+  an ANN index scan.
+
+highlights.objects (comma-joined names) stays as the full-text source.
+"""
+from typing import List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.types import HighlightModel
+
+# Backfill for databases created before the tables existed; confidences were not stored then (0)
+BACKFILL = [
+    """
+    INSERT INTO object_labels (name)
+    SELECT DISTINCT btrim(o) FROM highlights, unnest(string_to_array(objects, ',')) AS o
+    WHERE objects IS NOT NULL AND btrim(o) <> ''
+      AND NOT EXISTS (SELECT 1 FROM highlight_objects)
+    ON CONFLICT (name) DO NOTHING
+    """,
+    """
+    INSERT INTO highlight_objects (highlight_id, object_id, max_conf, count)
+    SELECT DISTINCT h.id, l.id, 0::real, 1
+    FROM highlights h, unnest(string_to_array(h.objects, ',')) AS o
+    JOIN object_labels l ON l.name = btrim(o)
+    WHERE h.objects IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM highlight_objects)
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+
+def normalize(name: str) -> str:
+    return name.strip().lower()
+
+
+def aggregate(highlight: HighlightModel) -> dict[str, tuple[float, int]]:
+    """name → (max confidence, detection count) for one highlight."""
+    out: dict[str, tuple[float, int]] = {}
+    for o in highlight.objects:
+        name = normalize(o.name)
+        conf, count = out.get(name, (0.0, 0))
+        out[name] = (max(conf, o.confidence), count + o.count)
+    return out
+
+
+def insert_highlight_objects(s: Session, ids: Sequence[int], highlights: Sequence[HighlightModel]) -> int:
+    """
+    Write highlight_objects rows for freshly inserted highlights, in the
+    caller's transaction: one statement to register new labels, one to insert
+    all rows (arrays unnested server-side, so the round trips don't grow with
+    the batch). Returns the number of rows written.
+    """
+    hids, names, confs, counts = [], [], [], []
+    for hid, h in zip(ids, highlights):
+        for name, (conf, count) in aggregate(h).items():
+            hids.append(hid)
+            names.append(name)
+            confs.append(conf)
+            counts.append(count)
+    if not hids:
+        return 0
+    # Sorted, so concurrent writers take label row locks in the same order
+    s.execute(
+        text(
+            "INSERT INTO object_labels (name) SELECT unnest(CAST(:names AS text[])) "
+            "ON CONFLICT (name) DO NOTHING"
+        ),
+        {"names": sorted(set(names))},
+    )
+    s.execute(
+        text(
+            """
+            INSERT INTO highlight_objects (highlight_id, object_id, max_conf, count)
+            SELECT t.hid, l.id, t.conf, t.cnt
+            FROM unnest(CAST(:hids AS int[]), CAST(:names AS text[]), CAST(:confs AS real[]), CAST(:cnts AS int[]))
+                 AS t(hid, name, conf, cnt)
+            JOIN object_labels l ON l.name = t.name
+            """
+        ),
+        {"hids": hids, "names": names, "confs": confs, "cnts": counts},
+    )
+    return len(hids)
+
+
+def label_ids(s: Session, names: Sequence[str]) -> dict[str, int]:
+    rows = s.execute(
+        text("SELECT name, id FROM object_labels WHERE name = ANY(:names)"),
+        {"names": sorted({normalize(n) for n in names})},
+    )
+    return {r.name: r.id for r in rows}
+
+
+def filter_sql(object_ids: List[int], match_all: bool, min_conf: float) -> tuple[str, dict]:
+    """
+    SELECT highlight_id of highlights containing all (match_all) or any of
+    object_ids, each detected with max_conf >= min_conf.
+    """
+    params: dict = {"min_conf": min_conf}
+    conf = "{a}.max_conf >= :min_conf"
+    if not match_all:
+        params["oids"] = list(object_ids)
+        return (
+            f"SELECT DISTINCT ho.highlight_id FROM highlight_objects ho "
+            f"WHERE ho.object_id = ANY(:oids) AND {conf.format(a='ho')}",
+            params,
+        )
+    first, rest = object_ids[0], object_ids[1:]
+    params["o0"] = first
+    sql = f"SELECT ho.highlight_id FROM highlight_objects ho WHERE ho.object_id = :o0 AND {conf.format(a='ho')}"
+    for i, oid in enumerate(rest, 1):
+        params[f"o{i}"] = oid
+        sql += (
+            f" AND EXISTS (SELECT 1 FROM highlight_objects x{i} WHERE x{i}.highlight_id = ho.highlight_id"
+            f" AND x{i}.object_id = :o{i} AND {conf.format(a=f'x{i}')})"
+        )
+    return sql, params
+
+
+def predicate_sql(alias: str, object_ids: List[int], match_all: bool, min_conf: float) -> tuple[str, dict]:
+    """
+    WHERE condition on highlights `alias`: one primary-key probe per object.
+    OFFSET 0 stops the planner from turning it into a join, so an ANN index
+    scan on highlights keeps its order and stops after LIMIT matches.
+    """
+    params: dict = {"min_conf": min_conf}
+
+    def probe(cond: str) -> str:
+        return (
+            f"EXISTS (SELECT 1 FROM highlight_objects p WHERE p.highlight_id = {alias}.id "
+            f"AND {cond} AND p.max_conf >= :min_conf OFFSET 0)"
+        )
+
+    if not match_all:
+        params["p_oids"] = list(object_ids)
+        return probe("p.object_id = ANY(:p_oids)"), params
+    conds = []
+    for i, oid in enumerate(object_ids):
+        params[f"p{i}"] = oid
+        conds.append(probe(f"p.object_id = :p{i}"))
+    return " AND ".join(conds), params
+
+
+def resolve(s: Session, objects: Sequence[str], match_all: bool) -> Optional[List[int]]:
+    """Label ids for a filter, or None when no highlight can match."""
+    ids = label_ids(s, objects)
+    wanted = {normalize(n) for n in objects}
+    if not ids or (match_all and len(ids) < len(wanted)):
+        return None
+    return [ids[n] for n in sorted(ids)]
@@ -1,19 +1,202 @@
+import re
 from typing import List
-from sqlalchemy import create_engine, select, text
+import numpy as np
+from sqlalchemy import create_engine, delete, insert, select, text, update
 from sqlalchemy.orm import sessionmaker
+from .backend import StorageBackend
+from .bulk import copy_highlights
+from .changes import TRIGGER_SQL as CHANGE_TRIGGER_SQL, ChangeListener
+from .indexing import IndexManager, nearest_sql
+from .objects import BACKFILL as OBJECT_BACKFILL, filter_sql, insert_highlight_objects, predicate_sql, resolve
 from .models import Base, Video, Highlight
 from app.config import Config
-from app.types import HighlightModel, VideoRecord
+from app.types import HighlightModel, SearchScope, VideoRecord
+from app.llm.tokens import Usage
 from pgvector.sqlalchemy import Vector
 
+# Idempotent upgrades for databases created before a column existed
+MIGRATIONS = [
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS llm_calls INT NOT NULL DEFAULT 0",
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS prompt_tokens INT NOT NULL DEFAULT 0",
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS completion_tokens INT NOT NULL DEFAULT 0",
+    # Full-text search: weighted tsvector kept in sync by Postgres, GIN-indexed
+    """
+    ALTER TABLE highlights ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(llm_summary, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(objects, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS highlights_search_tsv_idx ON highlights USING gin (search_tsv)",
+    # Scoped searches: one video's highlights (optionally a time range) without a table scan
+    "CREATE INDEX IF NOT EXISTS highlights_video_ts_idx ON highlights (video_id, ts_start_sec)",
+    # Result caches: NOTIFY highlights_changed on every write (app/db/changes.py)
+    *CHANGE_TRIGGER_SQL,
+]
 
-class Repository:
+# Trigram matching for partial words and typos; pg_trgm is a contrib extension, so it is optional
+TRGM_MIGRATIONS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS highlights_description_trgm_idx ON highlights USING gin (description gin_trgm_ops)",
+]
+
+_HIGHLIGHT_COLS = "h.id, h.video_id, h.ts_start_sec, h.ts_end_sec, h.description, h.llm_summary, h.objects"
+
+
+def scope_sql(scope: SearchScope | None, alias: str = "h") -> tuple[str, dict]:
+    """WHERE condition (empty without a scope) and its parameters; video_ids use highlights_video_ts_idx."""
+    if scope is None:
+        return "", {}
+    conds, params = [], {}
+    if scope.video_ids is not None:
+        conds.append(f"{alias}.video_id = ANY(:scope_videos)")
+        params["scope_videos"] = list(scope.video_ids)
+    if scope.ts_from is not None:
+        conds.append(f"{alias}.ts_end_sec >= :scope_from")
+        params["scope_from"] = scope.ts_from
+    if scope.ts_to is not None:
+        conds.append(f"{alias}.ts_start_sec <= :scope_to")
+        params["scope_to"] = scope.ts_to
+    if scope.min_confidence is not None:
+        conds.append(f"{alias}.confidence >= :scope_conf")
+        params["scope_conf"] = scope.min_confidence
+    return " AND ".join(conds), params
+
+
+def _and(where: str) -> str:
+    return f" AND {where}" if where else ""
+
+
+def in_scope_sql(where: str) -> str:
+    """Highlights matching `where`, counted up to :scope_cap."""
+    return f"SELECT count(*) FROM (SELECT 1 FROM highlights h WHERE {where} LIMIT :scope_cap) m"
+
+
+def vector_sql(quantization: str = "none", where: str = "", exact_scan: bool = False) -> str:
+    """Top :k highlights nearest :emb, score = cosine similarity (see indexing.nearest_sql)."""
+    return (
+        f"SELECT {_HIGHLIGHT_COLS}, 1 - n.dist AS score "
+        f"FROM ({nearest_sql(quantization, where=where, exact_scan=exact_scan)}) n JOIN highlights h USING (id) "
+        f"ORDER BY n.dist, h.id"
+    )
+
+
+def hybrid_sql(quantization: str = "none", where: str = "", exact_scan: bool = False) -> str:
+    """Top :k of the top :n vector (:emb) and full-text (:terms) hits, fused by reciprocal rank."""
+    return f"""
+    WITH vec AS (
+        SELECT id, row_number() OVER (ORDER BY dist, id) AS rnk
+        FROM ({nearest_sql(quantization, where=where, limit=':n', exact_scan=exact_scan)}) v
+    ),
+    q AS (SELECT to_tsquery('english', :terms) AS q),
+    lex AS (
+        SELECT id, row_number() OVER (ORDER BY rank DESC, id) AS rnk
+        FROM (
+            SELECT c.id, ts_rank_cd(c.search_tsv, q.q, 32) AS rank
+            FROM (
+                SELECT h.id, h.search_tsv FROM highlights h, q WHERE h.search_tsv @@ q.q{_and(where)} LIMIT :cap
+            ) c, q
+            ORDER BY rank DESC, c.id
+            LIMIT :n
+        ) l
+    ),
+    fused AS (
+        SELECT coalesce(vec.id, lex.id) AS id,
+               coalesce(1.0 / (:rrf_k + vec.rnk), 0) + coalesce(1.0 / (:rrf_k + lex.rnk), 0) AS score,
+               vec.rnk AS vector_rank, lex.rnk AS lexical_rank
+        FROM vec FULL JOIN lex ON vec.id = lex.id
+        ORDER BY score DESC, id
+        LIMIT :k
+    )
+    SELECT {_HIGHLIGHT_COLS}, f.score, f.vector_rank, f.lexical_rank
+    FROM fused f JOIN highlights h USING (id)
+    ORDER BY f.score DESC, h.id
+    """
+
+
+def hybrid_many_sql(count: int, quantization: str = "none", where: str = "", exact_scan: bool = False) -> str:
+    """
+    hybrid_sql for `count` queries in one statement: a LATERAL join over
+    VALUES (i, :emb_i, :terms_i) rows, each query's rows tagged with its q_i.
+    """
+    values = ", ".join(f"({i}, CAST(:emb_{i} AS vector), CAST(:terms_{i} AS text))" for i in range(count))
+    # The single-query statement, reading :emb / :terms from the current VALUES row
+    per_query = hybrid_sql(quantization, where, exact_scan).replace(":emb", "bq.emb").replace(":terms", "bq.terms")
+    return f"""
+    SELECT bq.i AS q_i, r.*
+    FROM (VALUES {values}) AS bq(i, emb, terms)
+    CROSS JOIN LATERAL ({per_query}) r
+    ORDER BY bq.i, r.score DESC, r.id
+    """
+
+
+def many_params(queries: list[str], query_embs: list[list[float]]) -> dict:
+    """The :emb_i / :terms_i parameters of hybrid_many_sql."""
+    params = {}
+    for i, (query, emb) in enumerate(zip(queries, query_embs)):
+        params[f"emb_{i}"] = str(list(emb))
+        params[f"terms_{i}"] = Repository._tsquery(query, "|")
+    return params
+
+
+def group_rows(rows, count: int) -> list[list[dict]]:
+    """Rows of hybrid_many_sql → one result list per query (q_i dropped)."""
+    out: list[list[dict]] = [[] for _ in range(count)]
+    for r in rows:
+        row = dict(r._mapping)
+        out[row.pop("q_i")].append({**row, "score": float(row["score"])})
+    return out
+
+
+def ranked_sql(where: str = "") -> str:
+    """Top :k full-text matches of :terms (to_tsquery syntax) not in :exclude; at most :cap get ranked."""
+    return f"""
+    WITH q AS (SELECT to_tsquery('english', :terms) AS q),
+    cand AS (
+        SELECT h.id FROM highlights h, q
+        WHERE h.search_tsv @@ q.q AND NOT (h.id = ANY(:exclude)){_and(where)}
+        LIMIT :cap
+    )
+    SELECT {_HIGHLIGHT_COLS}, ts_rank_cd(h.search_tsv, q.q, 32) AS score
+    FROM cand JOIN highlights h USING (id), q
+    ORDER BY score DESC, h.id
+    LIMIT :k
+    """
+
+
+def trigram_sql(where: str = "") -> str:
+    """Typo / partial-word fallback (pg_trgm): lexemes of :query against description words."""
+    return f"""
+    SELECT {_HIGHLIGHT_COLS}, max(word_similarity(t.term, h.description)) AS score
+    FROM unnest(tsvector_to_array(to_tsvector('english', :query))) AS t(term)
+    JOIN highlights h ON t.term <% h.description
+    WHERE length(t.term) > 2{_and(where)}
+    GROUP BY h.id
+    ORDER BY score DESC, h.id
+    LIMIT :k
+    """
+
+
+class Repository(StorageBackend):
     def __init__(self, url: str | None = None):
         self.engine = create_engine(url or Config.db_url(), echo=False, future=True)
         self.Session = sessionmaker(bind=self.engine, expire_on_commit=False, future=True)
+        self.indexes = IndexManager(self.engine)
+        self._has_trgm: bool | None = None
+        self._changes: ChangeListener | None = None
 
     def create_schema(self):
         Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            for stmt in MIGRATIONS + OBJECT_BACKFILL:
+                conn.execute(text(stmt))
+        try:
+            with self.engine.begin() as conn:
+                for stmt in TRGM_MIGRATIONS:
+                    conn.execute(text(stmt))
+        except Exception as e:
+            print(f"⚠️ pg_trgm unavailable, keyword search runs without partial matching: {e}")
+        self.indexes.ensure()
 
     def upsert_video(self, source: str, video_uid: str | None, duration_sec: int | None) -> VideoRecord:
         with self.Session() as s:
@@ -30,91 +213,403 @@ class Repository:
             s.refresh(v)
             return VideoRecord(id=v.id, source=v.source, video_uid=v.video_uid, duration_sec=v.duration_sec)
 
-    def add_highlights(self, video_id: int, highlights: List[HighlightModel]) -> List[int]:
-        ids: List[int] = []
+    def record_usage(self, video_id: int, usage: Usage) -> None:
+        """Add one processing run's LLM usage to the video's running totals."""
         with self.Session() as s:
-            for h in highlights:
-                row = Highlight(
-                    video_id=video_id,
-                    ts_start_sec=h.ts_start_sec,
-                    ts_end_sec=h.ts_end_sec,
-                    description=h.description,
-                    llm_summary=h.llm_summary,
-                    embedding=h.embedding or [],
-                    objects=",".join(sorted({o.name for o in h.objects})) or None,
-                    confidence=h.confidence,
+            s.execute(
+                update(Video)
+                .where(Video.id == video_id)
+                .values(
+                    llm_calls=Video.llm_calls + usage.calls,
+                    prompt_tokens=Video.prompt_tokens + usage.prompt_tokens,
+                    completion_tokens=Video.completion_tokens + usage.completion_tokens,
                 )
-                s.add(row)
-                s.flush()
-                ids.append(row.id)
+            )
             s.commit()
-            return ids
 
-    def vector_search(self, query_emb: list[float], top_k: int = 5) -> list[dict]:
+    def video_usage(self, video_id: int) -> dict:
         with self.Session() as s:
-            # Use SQLAlchemy ORM with pgvector
-            results = s.query(
-                Highlight.id,
-                Highlight.video_id,
-                Highlight.ts_start_sec,
-                Highlight.ts_end_sec,
-                Highlight.description,
-                Highlight.llm_summary,
-                Highlight.objects,
-                (1 - Highlight.embedding.cosine_distance(query_emb)).label('score')
-            ).order_by(
-                Highlight.embedding.cosine_distance(query_emb)
-            ).limit(top_k).all()
-            
-            return [
-                {
-                    "id": r.id,
-                    "video_id": r.video_id,
-                    "ts_start_sec": r.ts_start_sec,
-                    "ts_end_sec": r.ts_end_sec,
-                    "description": r.description,
-                    "llm_summary": r.llm_summary,
-                    "objects": r.objects,
-                    "score": float(r.score)
-                }
-                for r in results
-            ]
-
-    def keyword_search(self, query: str, top_k: int = 5) -> list[dict]:
-        """Keyword search using ILIKE on description and llm_summary fields"""
+            v = s.get(Video, video_id)
+            if not v:
+                return {}
+            return {
+                "llm_calls": v.llm_calls,
+                "prompt_tokens": v.prompt_tokens,
+                "completion_tokens": v.completion_tokens,
+            }
+
+    @staticmethod
+    def _highlight_row(video_id: int, h: HighlightModel) -> dict:
+        return dict(
+            video_id=video_id,
+            ts_start_sec=h.ts_start_sec,
+            ts_end_sec=h.ts_end_sec,
+            description=h.description,
+            llm_summary=h.llm_summary,
+            embedding=h.embedding or [],
+            objects=",".join(sorted({o.name for o in h.objects})) or None,
+            confidence=h.confidence,
+        )
+
+    def _can_copy(self, highlights: List[HighlightModel]) -> bool:
+        return (
+            len(highlights) >= Config.db_copy_threshold
+            and self.engine.dialect.driver == "psycopg2"
+            and all(h.embedding for h in highlights)
+            and len({len(h.embedding) for h in highlights}) == 1
+        )
+
+    def add_highlights(self, video_id: int, highlights: List[HighlightModel], replace: bool = False) -> List[int]:
+        """
+        Insert highlights and return their ids in input order.
+        Small batches go out as multi-row INSERT ... RETURNING id; from
+        DB_COPY_THRESHOLD rows on, a binary COPY through a staging table.
+        replace=True deletes the video's earlier highlights in the same transaction.
+        """
+        if not highlights and not replace:
+            return []
+        rows = [self._highlight_row(video_id, h) for h in highlights]
+        bulk = self._can_copy(highlights)
+        if bulk and Config.vector_index_auto_rebuild and self.indexes.should_defer(len(rows)):
+            with self.indexes.deferred():
+                return self._insert_rows(video_id, rows, highlights, bulk, replace)
+        ids = self._insert_rows(video_id, rows, highlights, bulk, replace)
+        if bulk:
+            # A big load can outgrow an ivfflat index's clustering
+            self.indexes.after_bulk_load()
+        return ids
+
+    def _insert_rows(
+        self, video_id: int, rows: List[dict], highlights: List[HighlightModel], bulk: bool, replace: bool = False
+    ) -> List[int]:
+        with self.Session() as s:
+            if replace:
+                # Concurrent replaces of one video queue on its row, so the later one deletes the earlier one's rows
+                s.execute(select(Video.id).where(Video.id == video_id).with_for_update())
+                s.execute(delete(Highlight).where(Highlight.video_id == video_id))
+            if not rows:
+                ids = []
+            elif bulk:
+                embeddings = np.asarray([h.embedding for h in highlights], dtype=np.float32)
+                copy_rows = [
+                    (r["video_id"], r["ts_start_sec"], r["ts_end_sec"], r["description"], r["llm_summary"],
+                     r["objects"], r["confidence"])
+                    for r in rows
+                ]
+                ids = copy_highlights(s.connection().connection.dbapi_connection, copy_rows, embeddings)
+            else:
+                ids = list(s.scalars(insert(Highlight).returning(Highlight.id, sort_by_parameter_order=True), rows))
+            insert_highlight_objects(s, ids, highlights)
+            s.commit()
+        self._changed()
+        return ids
+
+    def get_highlights(self, ids: List[int]) -> List[dict]:
+        with self.Session() as s:
+            found = {h.id: h for h in s.scalars(select(Highlight).where(Highlight.id.in_(ids)))}
+        return [
+            {
+                "id": h.id,
+                "video_id": h.video_id,
+                "ts_start_sec": h.ts_start_sec,
+                "ts_end_sec": h.ts_end_sec,
+                "description": h.description,
+                "llm_summary": h.llm_summary,
+                "objects": h.objects,
+                "confidence": h.confidence,
+                "embedding": [float(x) for x in h.embedding],
+            }
+            for h in (found.get(i) for i in ids)
+            if h is not None
+        ]
+
+    def delete_highlights(self, video_id: int) -> int:
+        with self.Session() as s:
+            n = s.execute(delete(Highlight).where(Highlight.video_id == video_id)).rowcount
+            s.commit()
+        self._changed()
+        return n
+
+    def highlights_version(self) -> int | None:
+        """Bumped by every committed highlights write, from any process (LISTEN highlights_changed)."""
+        if self._changes is None:
+            self._changes = ChangeListener(self.engine)
+        return self._changes.current()
+
+    def _changed(self) -> None:
+        if self._changes is not None:
+            self._changes.bump()
+
+    def ping(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    def close(self) -> None:
+        if self._changes is not None:
+            self._changes.close()
+        self.engine.dispose()
+
+    def vector_search(
+        self,
+        query_emb: list[float],
+        top_k: int = 5,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        objects: list[str] | None = None,
+        match_all: bool = True,
+        min_conf: float = 0.0,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """
+        Cosine top-k over the ANN index. ef_search (HNSW) / probes (ivfflat)
+        trade recall for latency for this query only; defaults come from Config.
+        With a quantized index, the top_k * VECTOR_RESCORE_FACTOR rows nearest by
+        compact codes are rescored with the float32 embeddings.
+        With objects, only highlights containing all (match_all) or any of
+        them, detected with at least min_conf, are searched; scope restricts
+        the search to some videos, a time range and a minimum confidence.
+        """
+        if objects or (scope and not scope.is_empty()):
+            return self._vector_search_filtered(
+                query_emb, top_k, ef_search, probes, objects, match_all, min_conf, scope
+            )
+        first = self.indexes.first_pass_rows(top_k)
+        with self.Session() as s:
+            for stmt in self.indexes.search_settings(first, ef_search, probes):
+                s.execute(text(stmt))
+            res = s.execute(
+                text(vector_sql(self.indexes.quantization())),
+                {"emb": str(list(query_emb)), "k": top_k, "rescore_n": first},
+            )
+            return [{**r._mapping, "score": float(r.score)} for r in res]
+
+    def _vector_search_filtered(
+        self, query_emb, top_k, ef_search, probes, objects, match_all, min_conf, scope
+    ) -> list[dict]:
+        """
+        Few matching highlights: exact distances over just those. Otherwise the
+        ANN index with the filter in its WHERE clause. pgvector >= 0.8 resumes
+        the index scan until top_k rows pass (iterative scan); before that, the
+        filter only sees the rows one scan looks at: ef_search is raised so that
+        one scan is expected to hold 4 * top_k matches, and the choice is made
+        on that expectation (falling back to exact if it still comes up short).
+        """
+        cond, params = scope_sql(scope)
+        params.update(emb=str(list(query_emb)), k=top_k, cap=Config.object_filter_exact_max)
+        with self.Session() as s:
+            source, pred = "highlights h", cond
+            if objects:
+                oids = resolve(s, objects, match_all)
+                if oids is None:
+                    return []
+                filt, filt_params = filter_sql(oids, match_all, min_conf)
+                pred_sql, pred_params = predicate_sql("h", oids, match_all, min_conf)
+                params.update(filt_params, **pred_params)
+                # Driven from the object index; the scope applies to the joined highlights
+                source = f"({filt}) m JOIN highlights h ON h.id = m.highlight_id"
+                pred = pred_sql + _and(cond)
+            where = f"WHERE {cond}" if cond else ""
+            # Counted through the object / video index, and only up to the cap
+            counted = filt if objects and not cond else f"SELECT 1 FROM {source} {where}"
+            matching = s.execute(text(f"SELECT count(*) FROM ({counted} LIMIT :cap) m"), params).scalar()
+            rows_total = max(self.indexes.row_count(), 1)
+            if ef_search is None and not self.indexes.iterative_scans():
+                ef_search = min(1000, max(Config.vector_ef_search, -(-4 * top_k * rows_total // max(matching, 1))))
+            scan = self.indexes.scan_size(ef_search, probes)
+            exact = f"""
+                SELECT {_HIGHLIGHT_COLS}, 1 - (h.embedding <=> CAST(:emb AS vector)) AS score
+                FROM {source} {where}
+                -- "+ 0" keeps the planner off the ANN index: distances are computed for the matches only
+                ORDER BY (h.embedding <=> CAST(:emb AS vector)) + 0, h.id
+                LIMIT :k
+            """
+            if matching < Config.object_filter_exact_max and (
+                scan is None or matching * scan < 4 * top_k * rows_total
+            ):
+                return [{**r._mapping, "score": float(r.score)} for r in s.execute(text(exact), params)]
+            first = self.indexes.first_pass_rows(top_k)
+            for stmt in self.indexes.search_settings(first, ef_search, probes, filtered=True):
+                s.execute(text(stmt))
+            rows = s.execute(
+                text(vector_sql(self.indexes.quantization(), where=pred)), {**params, "rescore_n": first}
+            ).all()
+            if len(rows) < top_k:
+                rows = s.execute(text(exact), params).all()
+            return [{**r._mapping, "score": float(r.score)} for r in rows]
+
+    def object_search(
+        self, objects: list[str], top_k: int = 5, match_all: bool = True, min_conf: float = 0.0
+    ) -> list[dict]:
+        """
+        Highlights containing all (match_all) or any of the given objects,
+        best detections first: score is the mean max_conf of the matched
+        objects (ties: newest highlight first).
+        """
         with self.Session() as s:
-            # Extract meaningful keywords from the query
-            import re
-            # Remove common stop words and extract meaningful terms
-            stop_words = {'what', 'happened', 'during', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'about', 'show', 'me', 'find', 'scenes'}
-            words = re.findall(r'\b\w+\b', query.lower())
-            keywords = [w for w in words if w not in stop_words and len(w) > 2]
-            
-            if not keywords:
-                # If no meaningful keywords, use the original query
-                keywords = [query]
-            
-            # Build OR conditions for each keyword
-            conditions = []
-            params = {"k": top_k}
-            for i, keyword in enumerate(keywords[:3]):  # Limit to 3 keywords
-                param_name = f"pattern{i}"
-                conditions.append(f"(description ILIKE :{param_name} OR llm_summary ILIKE :{param_name})")
-                params[param_name] = f"%{keyword}%"
-            
-            where_clause = " OR ".join(conditions)
-            
+            oids = resolve(s, objects, match_all)
+            if oids is None:
+                return []
+            if len(oids) == 1:
+                # Straight off the (object_id, max_conf, highlight_id) index, read backwards
+                ranked = """
+                    SELECT ho.highlight_id, ho.max_conf AS score
+                    FROM highlight_objects ho
+                    WHERE ho.object_id = :o0 AND ho.max_conf >= :min_conf
+                    ORDER BY ho.max_conf DESC, ho.highlight_id DESC
+                    LIMIT :k
+                """
+                params = {"o0": oids[0], "min_conf": min_conf}
+            else:
+                filt, params = filter_sql(oids, match_all, min_conf)
+                ranked = f"""
+                    SELECT ho.highlight_id, avg(ho.max_conf) AS score
+                    FROM highlight_objects ho
+                    WHERE ho.highlight_id IN ({filt}) AND ho.object_id = ANY(:all_oids)
+                    GROUP BY ho.highlight_id
+                    ORDER BY score DESC, ho.highlight_id DESC
+                    LIMIT :k
+                """
+                params["all_oids"] = oids
+            params["k"] = top_k
             res = s.execute(
                 text(
                     f"""
-                    SELECT id, video_id, ts_start_sec, ts_end_sec, description, llm_summary, objects,
-                           0.5 AS score
-                    FROM highlights
-                    WHERE {where_clause}
-                    ORDER BY video_id, ts_start_sec
-                    LIMIT :k
+                    SELECT {_HIGHLIGHT_COLS}, sc.score
+                    FROM ({ranked}) sc JOIN highlights h ON h.id = sc.highlight_id
+                    ORDER BY sc.score DESC, h.id DESC
                     """
                 ),
                 params,
             )
+            return [{**r._mapping, "score": float(r.score)} for r in res]
+
+    def highlight_objects(self, highlight_id: int) -> list[dict]:
+        """Detected objects of one highlight: name, max_conf, count (best first)."""
+        with self.Session() as s:
+            res = s.execute(
+                text(
+                    "SELECT l.name, ho.max_conf, ho.count FROM highlight_objects ho "
+                    "JOIN object_labels l ON l.id = ho.object_id WHERE ho.highlight_id = :hid "
+                    "ORDER BY ho.max_conf DESC, l.name"
+                ),
+                {"hid": highlight_id},
+            )
+            return [dict(r._mapping) for r in res]
+
+    def hybrid_search(
+        self,
+        query: str,
+        query_emb: list[float],
+        top_k: int = 5,
+        candidates: int | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """
+        Vector and full-text retrieval fused with reciprocal rank fusion, in one
+        statement: each side contributes its top `candidates` highlights and a
+        highlight scores sum(1 / (HYBRID_RRF_K + rank)) over the sides that
+        found it. Rows also carry vector_rank / lexical_rank (None if missed).
+        With a scope covering fewer than OBJECT_FILTER_EXACT_MAX highlights,
+        the vector side computes exact distances for just those.
+        """
+        n = max(candidates or Config.hybrid_candidates, top_k)
+        first = self.indexes.first_pass_rows(n)
+        cond, scope_params = scope_sql(scope)
+        with self.Session() as s:
+            exact_scan = bool(cond) and self._few_in_scope(s, cond, scope_params)
+            for stmt in self.indexes.search_settings(first, ef_search, probes, filtered=bool(cond)):
+                s.execute(text(stmt))
+            res = s.execute(
+                text(hybrid_sql(self.indexes.quantization(), where=cond, exact_scan=exact_scan)),
+                {
+                    **scope_params,
+                    "emb": str(list(query_emb)),
+                    "terms": self._tsquery(query, "|"),
+                    "n": n,
+                    "rescore_n": first,
+                    "k": top_k,
+                    "cap": Config.fts_max_candidates,
+                    "rrf_k": Config.hybrid_rrf_k,
+                },
+            )
+            return [{**r._mapping, "score": float(r.score)} for r in res]
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        query_embs: list[list[float]],
+        top_k: int = 5,
+        scope: SearchScope | None = None,
+    ) -> list[list[dict]]:
+        """hybrid_search for many queries in one statement (LATERAL join over their vectors and terms)."""
+        if not queries:
+            return []
+        n = max(Config.hybrid_candidates, top_k)
+        first = self.indexes.first_pass_rows(n)
+        cond, scope_params = scope_sql(scope)
+        with self.Session() as s:
+            exact_scan = bool(cond) and self._few_in_scope(s, cond, scope_params)
+            for stmt in self.indexes.search_settings(first, filtered=bool(cond)):
+                s.execute(text(stmt))
+            res = s.execute(
+                text(hybrid_many_sql(len(queries), self.indexes.quantization(), where=cond, exact_scan=exact_scan)),
+                {**scope_params, **many_params(queries, query_embs), "n": n, "rescore_n": first, "k": top_k,
+                 "cap": Config.fts_max_candidates, "rrf_k": Config.hybrid_rrf_k},
+            )
+            return group_rows(res, len(queries))
+
+    @staticmethod
+    def _few_in_scope(s, cond: str, scope_params: dict) -> bool:
+        cap = Config.object_filter_exact_max
+        return s.execute(text(in_scope_sql(cond)), {**scope_params, "scope_cap": cap}).scalar() < cap
+
+    def has_trigram(self) -> bool:
+        if self._has_trgm is None:
+            with self.engine.connect() as conn:
+                self._has_trgm = bool(
+                    conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+                )
+        return self._has_trgm
+
+    @staticmethod
+    def _tsquery(query: str, op: str) -> str:
+        """'What happened near the red car?' → 'what & happened & near & the & red & car' (op '&').
+        to_tsquery('english', ...) then drops stop words and stems the rest."""
+        return f" {op} ".join(dict.fromkeys(re.findall(r"\w+", query.lower())))
+
+    def _ranked(self, s, terms: str, top_k: int, exclude: list[int], cond: str = "", scope_params=None) -> list[dict]:
+        # Rank at most FTS_MAX_CANDIDATES matches: very common terms would otherwise rank a large share of the table
+        res = s.execute(
+            text(ranked_sql(cond)),
+            {**(scope_params or {}), "terms": terms, "k": top_k, "exclude": exclude, "cap": Config.fts_max_candidates},
+        )
+        return [dict(r._mapping) for r in res]
+
+    def keyword_search(self, query: str, top_k: int = 5, scope: SearchScope | None = None) -> list[dict]:
+        """
+        Ranked full-text search over description (weight A), llm_summary (B)
+        and object names (C), ordered by ts_rank_cd (term count and proximity).
+        Highlights matching every query term come first; if there are fewer
+        than top_k, highlights matching any term fill the rest. When nothing
+        matches (typos, partial words) and pg_trgm is installed, falls back to
+        trigram word similarity on the description. scope restricts all three.
+        """
+        if not re.search(r"\w", query):
+            return []
+        cond, scope_params = scope_sql(scope)
+        with self.Session() as s:
+            rows = self._ranked(s, self._tsquery(query, "&"), top_k, [], cond, scope_params)
+            if len(rows) < top_k:
+                rows += self._ranked(
+                    s, self._tsquery(query, "|"), top_k - len(rows), [r["id"] for r in rows], cond, scope_params
+                )
+            if rows or not self.has_trigram():
+                return rows
+            # Lexemes of the query (stop words removed) matched against description words
+            res = s.execute(
+                text(trigram_sql(cond)),
+                {**scope_params, "query": query, "k": top_k},
+            )
             return [dict(r._mapping) for r in res]
@@ -0,0 +1,431 @@
+"""
+Embedded storage backend: SQLite for metadata, NumPy for vectors.
+
+One directory holds highlights.db (videos, highlights, object tables and an
+FTS5 index for keyword search) and the embedding files of
+app/db/vector_store.py. No server, no extensions: suited to dev boxes, tests
+and edge deployments. Select it with STORAGE_BACKEND=sqlite (SQLITE_PATH) or
+open_repository("sqlite:///path/to/dir").
+
+Differences from the Postgres backend:
+- vector search is exact (vectorized NumPy) until SQLITE_IVF_MIN_ROWS rows,
+  then an IVF partition probes `probes` lists (ef_search is ignored);
+- quantization is int8 or binary codes (SQLITE_QUANTIZATION) instead of
+  pgvector's halfvec or binary index, rescored the same way;
+- keyword search ranks with FTS5's bm25 (porter stemming) and has no
+  trigram fallback;
+- hybrid search fuses the two result lists in Python.
+"""
+import os
+import re
+import sqlite3
+import threading
+from typing import List
+
+import numpy as np
+
+from app.config import Config
+from app.db.backend import StorageBackend
+from app.db.objects import aggregate, normalize
+from app.db.vector_store import EmbeddingMatrix, IVFIndex, QuantizedCodes
+from app.llm.tokens import Usage
+from app.types import HighlightModel, SearchScope, VideoRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    video_uid TEXT UNIQUE,
+    duration_sec INTEGER,
+    llm_calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+-- AUTOINCREMENT: ids are never reused, so id = embedding matrix row
+CREATE TABLE IF NOT EXISTS highlights (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id INTEGER REFERENCES videos(id) ON DELETE CASCADE,
+    ts_start_sec INTEGER NOT NULL,
+    ts_end_sec INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    llm_summary TEXT,
+    objects TEXT,
+    confidence REAL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS highlights_video_ts_idx ON highlights (video_id, ts_start_sec);
+CREATE TABLE IF NOT EXISTS object_labels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS highlight_objects (
+    highlight_id INTEGER NOT NULL REFERENCES highlights(id) ON DELETE CASCADE,
+    object_id INTEGER NOT NULL REFERENCES object_labels(id),
+    max_conf REAL NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (highlight_id, object_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS highlight_objects_object_idx ON highlight_objects (object_id, max_conf, highlight_id);
+-- rowid = highlights.id; column weights mirror the Postgres tsvector (A/B/C)
+CREATE VIRTUAL TABLE IF NOT EXISTS highlights_fts USING fts5(
+    description, llm_summary, objects, tokenize = 'porter unicode61'
+);
+"""
+
+_COLS = "h.id, h.video_id, h.ts_start_sec, h.ts_end_sec, h.description, h.llm_summary, h.objects"
+_BM25 = "bm25(highlights_fts, 4.0, 2.0, 1.0)"
+
+# FTS5 has no stop word list; the common words of Postgres' english configuration
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can did do does doing down during each few for from further had has have having he her here hers herself
+him himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only
+or other our ours ourselves out over own same she should so some such than that the their theirs them themselves
+then there these they this those through to too under until up very was we were what when where which while who
+whom why will with you your yours yourself yourselves
+""".split())
+
+
+class SQLiteRepository(StorageBackend):
+    def __init__(self, path: str | None = None, dtype: str | None = None, quantization: str | None = None):
+        self.path = path or Config.sqlite_path
+        os.makedirs(self.path, exist_ok=True)
+        # One connection shared by API worker threads; the lock serializes use
+        self.conn = sqlite3.connect(os.path.join(self.path, "highlights.db"), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.lock = threading.RLock()
+        self._writes = 0  # highlights_version()
+        self.vectors = EmbeddingMatrix(self.path, dtype or Config.sqlite_embedding_dtype)
+        self.ivf = IVFIndex(os.path.join(self.path, "ivf.npz"))
+        # Embedded: the store is usable as soon as it is opened
+        self.create_schema()
+        ids = np.fromiter((r[0] for r in self.conn.execute("SELECT id FROM highlights")), dtype=np.int64)
+        self.vectors.live[ids[ids < self.vectors.capacity]] = True
+        quantization = quantization or Config.sqlite_quantization
+        # Encodes existing rows on first open with quantization enabled
+        self.codes = QuantizedCodes(self.path, quantization, self.vectors) if quantization != "none" else None
+
+    # ----- schema / videos -----
+
+    def create_schema(self) -> None:
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+
+    def upsert_video(self, source: str, video_uid: str | None, duration_sec: int | None) -> VideoRecord:
+        with self.lock, self.conn:
+            row = None
+            if video_uid:
+                row = self.conn.execute("SELECT id FROM videos WHERE video_uid = ?", (video_uid,)).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE videos SET source = ?, duration_sec = ? WHERE id = ?", (source, duration_sec, row["id"])
+                )
+                vid = row["id"]
+            else:
+                vid = self.conn.execute(
+                    "INSERT INTO videos (source, video_uid, duration_sec) VALUES (?, ?, ?)",
+                    (source, video_uid, duration_sec),
+                ).lastrowid
+            return VideoRecord(id=vid, source=source, video_uid=video_uid, duration_sec=duration_sec)
+
+    def record_usage(self, video_id: int, usage: Usage) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE videos SET llm_calls = llm_calls + ?, prompt_tokens = prompt_tokens + ?, "
+                "completion_tokens = completion_tokens + ? WHERE id = ?",
+                (usage.calls, usage.prompt_tokens, usage.completion_tokens, video_id),
+            )
+
+    def video_usage(self, video_id: int) -> dict:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT llm_calls, prompt_tokens, completion_tokens FROM videos WHERE id = ?", (video_id,)
+            ).fetchone()
+        return dict(row) if row else {}
+
+    # ----- writes -----
+
+    def add_highlights(self, video_id: int, highlights: List[HighlightModel], replace: bool = False) -> List[int]:
+        """
+        Insert highlights in one transaction and return their ids in input
+        order. Embeddings are written (and flushed) before the rows commit, so a
+        committed highlight always has its vector. replace=True deletes the
+        video's earlier highlights in the same transaction.
+        """
+        if not highlights and not replace:
+            return []
+        if not all(h.embedding for h in highlights):
+            raise ValueError("SQLite backend requires an embedding on every highlight")
+        with self.lock, self.conn:
+            if replace:
+                self._delete_video_rows(video_id)
+            if not highlights:
+                self._writes += 1
+                return []
+            cur = self.conn.cursor()
+            ids, fts = [], []
+            for h in highlights:
+                objects = ",".join(sorted({o.name for o in h.objects})) or None
+                cur.execute(
+                    "INSERT INTO highlights (video_id, ts_start_sec, ts_end_sec, description, llm_summary, objects, "
+                    "confidence) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (video_id, h.ts_start_sec, h.ts_end_sec, h.description, h.llm_summary, objects, h.confidence),
+                )
+                ids.append(cur.lastrowid)
+                fts.append((cur.lastrowid, h.description, h.llm_summary or "", objects or ""))
+            cur.executemany(
+                "INSERT INTO highlights_fts (rowid, description, llm_summary, objects) VALUES (?, ?, ?, ?)", fts
+            )
+            self._insert_objects(cur, ids, highlights)
+            rows = np.asarray(ids, dtype=np.int64)
+            vecs = np.asarray([h.embedding for h in highlights], dtype=np.float32)
+            self.vectors.put(rows, vecs)
+            if self.codes:
+                self.codes.put(rows, vecs)
+            self.ivf.add(rows, vecs)
+            self._writes += 1
+        if self.ivf.needs_rebuild(self.vectors.count(), Config.sqlite_ivf_min_rows):
+            with self.lock:
+                print(f"🔧 Training IVF partition over {self.vectors.count()} embeddings...")
+                self.ivf.train(self.vectors)
+        return ids
+
+    @staticmethod
+    def _insert_objects(cur: sqlite3.Cursor, ids: List[int], highlights: List[HighlightModel]) -> None:
+        rows = [(hid, name, conf, count) for hid, h in zip(ids, highlights) for name, (conf, count) in aggregate(h).items()]
+        if not rows:
+            return
+        cur.executemany("INSERT OR IGNORE INTO object_labels (name) VALUES (?)", sorted({(r[1],) for r in rows}))
+        cur.executemany(
+            "INSERT INTO highlight_objects (highlight_id, object_id, max_conf, count) "
+            "SELECT ?, id, ?, ? FROM object_labels WHERE name = ?",
+            [(hid, conf, count, name) for hid, name, conf, count in rows],
+        )
+
+    def delete_highlights(self, video_id: int) -> int:
+        with self.lock, self.conn:
+            n = self._delete_video_rows(video_id)
+            self._writes += 1
+        return n
+
+    def _delete_video_rows(self, video_id: int) -> int:
+        """Delete a video's highlights in the caller's transaction (lock held)."""
+        ids = [r[0] for r in self.conn.execute("SELECT id FROM highlights WHERE video_id = ?", (video_id,))]
+        self.conn.executemany("DELETE FROM highlights_fts WHERE rowid = ?", [(i,) for i in ids])
+        self.conn.execute("DELETE FROM highlights WHERE video_id = ?", (video_id,))
+        rows = np.asarray(ids, dtype=np.int64)
+        self.vectors.live[rows[rows < self.vectors.capacity]] = False
+        return len(ids)
+
+    def highlights_version(self) -> int | None:
+        """This connection's writes plus PRAGMA data_version, which moves on other connections' commits."""
+        with self.lock:
+            (data_version,) = self.conn.execute("PRAGMA data_version").fetchone()
+            return (self._writes << 32) | data_version
+
+    def ping(self) -> None:
+        with self.lock:
+            self.conn.execute("SELECT 1")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    # ----- reads -----
+
+    def _rows(self, ids, scores=None, extra: dict | None = None) -> list[dict]:
+        """Highlight dicts for ids (in that order), with score and any extra per-id fields."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        with self.lock:
+            found = {
+                r["id"]: dict(r)
+                for r in self.conn.execute(
+                    f"SELECT {_COLS} FROM highlights h WHERE h.id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+        out = []
+        for n, i in enumerate(ids):
+            if i in found:
+                row = found[i]
+                if scores is not None:
+                    row["score"] = float(scores[n])
+                row.update((extra or {}).get(i, {}))
+                out.append(row)
+        return out
+
+    def get_highlights(self, ids: List[int]) -> List[dict]:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        with self.lock:
+            found = {
+                r["id"]: dict(r)
+                for r in self.conn.execute(
+                    f"SELECT {_COLS}, h.confidence FROM highlights h WHERE h.id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+        rows = [found[i] for i in ids if i in found]
+        if rows:
+            vecs = self.vectors.get(np.asarray([r["id"] for r in rows], dtype=np.int64))
+            for r, v in zip(rows, vecs):
+                r["embedding"] = v.tolist()
+        return rows
+
+    def _object_filter(self, objects: list[str], match_all: bool, min_conf: float) -> np.ndarray | None:
+        """Ids of highlights with all/any of the objects (None: unknown object, nothing can match)."""
+        names = sorted({normalize(n) for n in objects})
+        with self.lock:
+            labels = [r[0] for r in self.conn.execute(
+                f"SELECT id FROM object_labels WHERE name IN ({','.join('?' * len(names))})", names
+            )]
+            if not labels or (match_all and len(labels) < len(names)):
+                return None
+            res = self.conn.execute(
+                f"SELECT highlight_id FROM highlight_objects WHERE object_id IN ({','.join('?' * len(labels))}) "
+                f"AND max_conf >= ? GROUP BY highlight_id HAVING count(*) >= ?",
+                [*labels, min_conf, len(labels) if match_all else 1],
+            )
+            return np.fromiter((r[0] for r in res), dtype=np.int64)
+
+    @staticmethod
+    def _scope_sql(scope: SearchScope | None) -> tuple[str, list]:
+        """WHERE condition on highlights h (empty without a scope) and its parameters."""
+        if scope is None:
+            return "", []
+        conds, params = [], []
+        if scope.video_ids is not None:
+            conds.append(f"h.video_id IN ({','.join('?' * len(scope.video_ids))})")
+            params += scope.video_ids
+        for value, cond in ((scope.ts_from, "h.ts_end_sec >= ?"), (scope.ts_to, "h.ts_start_sec <= ?"),
+                            (scope.min_confidence, "h.confidence >= ?")):
+            if value is not None:
+                conds.append(cond)
+                params.append(value)
+        return " AND ".join(conds), params
+
+    def _scope_filter(self, scope: SearchScope) -> np.ndarray:
+        """Ids of highlights in scope (through highlights_video_ts_idx when videos are given)."""
+        cond, params = self._scope_sql(scope)
+        with self.lock:
+            res = self.conn.execute(f"SELECT h.id FROM highlights h WHERE {cond}", params)
+            return np.fromiter((r[0] for r in res), dtype=np.int64)
+
+    def vector_search(
+        self,
+        query_emb: list[float],
+        top_k: int = 5,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        objects: list[str] | None = None,
+        match_all: bool = True,
+        min_conf: float = 0.0,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        """
+        Cosine top-k in NumPy. Exact below SQLITE_IVF_MIN_ROWS rows or with an
+        object filter or a scope (scores only the matching rows); otherwise IVF
+        with `probes` lists (default VECTOR_PROBES, 0 = sqrt(lists)). With
+        codes, top_k * VECTOR_RESCORE_FACTOR candidates are rescored from the matrix.
+        """
+        rows = None
+        if objects:
+            rows = self._object_filter(objects, match_all, min_conf)
+            if rows is None or not len(rows):
+                return []
+        if scope and not scope.is_empty():
+            in_scope = self._scope_filter(scope)
+            rows = in_scope if rows is None else np.intersect1d(rows, in_scope)
+            if not len(rows):
+                return []
+        elif rows is None and self.ivf.lists:
+            q = np.asarray(query_emb, dtype=np.float32)
+            rows = self.ivf.candidates(q / (np.linalg.norm(q) or 1.0),
+                                       probes or Config.vector_probes or self.ivf.default_probes())
+        if self.codes:
+            rows = self.codes.candidates(query_emb, top_k * Config.vector_rescore_factor, rows)
+        ids, scores = self.vectors.search(query_emb, top_k, rows)
+        return self._rows(ids, scores)
+
+    def _fts(
+        self, terms: list[str], op: str, top_k: int, exclude: list[int], scope: SearchScope | None = None
+    ) -> list[tuple[int, float]]:
+        if not terms:
+            return []
+        match = f" {op} ".join(f'"{t}"' for t in terms)
+        cond, scope_params = self._scope_sql(scope)
+        in_scope = f"AND rowid IN (SELECT h.id FROM highlights h WHERE {cond}) " if cond else ""
+        with self.lock:
+            res = self.conn.execute(
+                f"SELECT rowid, -{_BM25} AS score FROM highlights_fts WHERE highlights_fts MATCH ? "
+                f"AND rowid NOT IN ({','.join('?' * len(exclude))}) {in_scope}ORDER BY {_BM25}, rowid LIMIT ?",
+                [match, *exclude, *scope_params, top_k],
+            )
+            return [(r[0], r[1]) for r in res]
+
+    @staticmethod
+    def _terms(query: str) -> list[str]:
+        return [t for t in dict.fromkeys(re.findall(r"\w+", query.lower())) if t not in STOP_WORDS]
+
+    def keyword_search(self, query: str, top_k: int = 5, scope: SearchScope | None = None) -> list[dict]:
+        """bm25-ranked FTS5 search: highlights matching every term first, then any term."""
+        terms = self._terms(query)
+        hits = self._fts(terms, "AND", top_k, [], scope)
+        if len(hits) < top_k:
+            hits += self._fts(terms, "OR", top_k - len(hits), [h[0] for h in hits], scope)
+        return self._rows([h[0] for h in hits], [h[1] for h in hits])
+
+    def hybrid_search(
+        self,
+        query: str,
+        query_emb: list[float],
+        top_k: int = 5,
+        candidates: int | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        scope: SearchScope | None = None,
+    ) -> list[dict]:
+        n = max(candidates or Config.hybrid_candidates, top_k)
+        vec = [r["id"] for r in self.vector_search(query_emb, n, ef_search, probes, scope=scope)]
+        lex = [h[0] for h in self._fts(self._terms(query), "OR", n, [], scope)]
+        ranks: dict[int, dict] = {}
+        for key, ids in (("vector_rank", vec), ("lexical_rank", lex)):
+            for rank, hid in enumerate(ids, 1):
+                ranks.setdefault(hid, {"vector_rank": None, "lexical_rank": None})[key] = rank
+        fused = sorted(
+            ((sum(1.0 / (Config.hybrid_rrf_k + r) for r in rk.values() if r), hid) for hid, rk in ranks.items()),
+            key=lambda t: (-t[0], t[1]),
+        )[:top_k]
+        return self._rows([hid for _, hid in fused], [s for s, _ in fused], ranks)
+
+    def object_search(
+        self, objects: list[str], top_k: int = 5, match_all: bool = True, min_conf: float = 0.0
+    ) -> list[dict]:
+        names = sorted({normalize(n) for n in objects})
+        with self.lock:
+            labels = [r[0] for r in self.conn.execute(
+                f"SELECT id FROM object_labels WHERE name IN ({','.join('?' * len(names))})", names
+            )]
+            if not labels or (match_all and len(labels) < len(names)):
+                return []
+            res = self.conn.execute(
+                f"SELECT highlight_id, avg(max_conf) AS score FROM highlight_objects "
+                f"WHERE object_id IN ({','.join('?' * len(labels))}) AND max_conf >= ? "
+                f"GROUP BY highlight_id HAVING count(*) >= ? ORDER BY score DESC, highlight_id DESC LIMIT ?",
+                [*labels, min_conf, len(labels) if match_all else 1, top_k],
+            ).fetchall()
+        return self._rows([r[0] for r in res], [r[1] for r in res])
+
+    def highlight_objects(self, highlight_id: int) -> list[dict]:
+        with self.lock:
+            res = self.conn.execute(
+                "SELECT l.name, ho.max_conf, ho.count FROM highlight_objects ho "
+                "JOIN object_labels l ON l.id = ho.object_id WHERE ho.highlight_id = ? "
+                "ORDER BY ho.max_conf DESC, l.name",
+                (highlight_id,),
+            )
+            return [dict(r) for r in res]
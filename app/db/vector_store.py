@@ -0,0 +1,329 @@
+"""
+Embeddings for the SQLite backend: a memory-mapped matrix plus NumPy search.
+
+EmbeddingMatrix keeps row i = highlight id i in a raw float32 or float16 file
+(grown by doubling, so ids map to rows without a lookup) and a float32
+inverse-norm file next to it, so cosine similarity is one matrix-vector
+product per chunk. Vectors are stored as given; get() returns them unchanged.
+float16 halves disk and page cache but every scan converts blocks to float32,
+which NumPy does slowly: exact float16 scans cost ~3x float32 ones.
+
+IVFIndex is an inverted-file partition (spherical k-means): a query scores
+the nearest `probes` centroids' rows instead of the whole matrix. Sized like
+pgvector's ivfflat (app/db/indexing.ivfflat_lists) and retrained when the
+store outgrows it.
+
+QuantizedCodes (SQLITE_QUANTIZATION) keeps a compact copy of every vector,
+int8 (1 byte per dimension plus a per-row scale) or sign bits (1 bit per
+dimension, Hamming distance). Searches rank the codes first and rescore the
+best candidates with the matrix, so only the codes need to stay in memory.
+"""
+import json
+import math
+import os
+from typing import Optional
+
+import numpy as np
+
+from app.db.indexing import ivfflat_lists
+
+CHUNK_ROWS = 8192  # rows scored per step: the (float32) block stays cache-sized
+
+
+def _mmap(path: str, dtype: np.dtype, shape: tuple) -> np.memmap:
+    """Map a raw file of `shape`, growing it (sparse zero fill) if shorter."""
+    size = int(np.prod(shape)) * dtype.itemsize
+    with open(path, "ab") as f:
+        if f.tell() < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+def top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Best k (row, score) pairs, best first; ties broken by the lower row."""
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[part], scores[part]
+    order = np.lexsort((rows, -scores))
+    return rows[order], scores[order]
+
+
+class EmbeddingMatrix:
+    def __init__(self, directory: str, dtype: str = "float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError("embedding dtype must be float32 or float16")
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.meta_path = os.path.join(directory, "embeddings.json")
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.live = np.zeros(0, dtype=bool)  # rows holding a current highlight
+        self._vecs: Optional[np.memmap] = None
+        self._inv: Optional[np.memmap] = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta["dtype"] != dtype:
+                raise ValueError(f"store at {directory} holds {meta['dtype']} embeddings, not {dtype}")
+            self.dim = meta["dim"]
+            self._map(meta["capacity"])
+
+    @property
+    def _vec_path(self) -> str:
+        return os.path.join(self.directory, f"embeddings.{self.dtype.name}")
+
+    @property
+    def _inv_path(self) -> str:
+        return os.path.join(self.directory, "inv_norms.float32")
+
+    def _map(self, capacity: int) -> None:
+        self._vecs = _mmap(self._vec_path, self.dtype, (capacity, self.dim))
+        self._inv = _mmap(self._inv_path, np.dtype(np.float32), (capacity,))
+        self.capacity = capacity
+        if len(self.live) < capacity:
+            self.live = np.concatenate([self.live, np.zeros(capacity - len(self.live), dtype=bool)])
+        with open(self.meta_path, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "capacity": capacity}, f)
+
+    def put(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-dim embeddings, got {vectors.shape[1]}")
+        need = int(ids.max()) + 1
+        if need > self.capacity:
+            self._map(max(need, 2 * self.capacity, 1024))
+        norms = np.linalg.norm(vectors, axis=1)
+        self._vecs[ids] = vectors
+        self._inv[ids] = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        self._vecs.flush()
+        self._inv.flush()
+        self.live[ids] = True
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(self._vecs[ids], dtype=np.float32)
+
+    def count(self) -> int:
+        return int(self.live.sum())
+
+    def scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query (unit length) with the given rows."""
+        out = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            r = rows[start:start + CHUNK_ROWS]
+            out[start:start + len(r)] = (self._vecs[r].astype(np.float32, copy=False) @ query) * self._inv[r]
+        return out
+
+    def search(self, query: list[float], k: int, rows: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact top-k (ids, cosine scores) over all live rows, or over `rows`.
+        Full scans walk the matrix in contiguous chunks; subsets are gathered.
+        """
+        if self.dim is None or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        q = np.asarray(query, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        if rows is not None:
+            rows = rows[(rows < self.capacity)]
+            rows = rows[self.live[rows]]
+            return top_k(self.scores(q, rows), rows, k)
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, self.capacity, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, self.capacity)
+            live = np.flatnonzero(self.live[start:stop])
+            if not len(live):
+                continue
+            block = self._vecs[start:stop].astype(np.float32, copy=False)
+            if len(live) == stop - start:  # common case: no deleted rows, skip the gather copy
+                s = (block @ q) * self._inv[start:stop]
+            else:
+                s = (block[live] @ q) * self._inv[start:stop][live]
+            rows_, s = top_k(s, live + start, k)
+            best_rows, best_scores = top_k(np.concatenate([best_scores, s]), np.concatenate([best_rows, rows_]), k)
+        return best_rows, best_scores
+
+
+class IVFIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.centroids: Optional[np.ndarray] = None  # (lists, dim), unit length
+        self.assign = np.zeros(0, dtype=np.int32)  # row → list (-1: not assigned)
+        self.built_rows = 0
+        self._lists: list[np.ndarray] = []
+        if os.path.exists(path):
+            data = np.load(path)
+            self.centroids, self.assign, self.built_rows = data["centroids"], data["assign"], int(data["built_rows"])
+            self._index_lists()
+
+    @property
+    def lists(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def _index_lists(self) -> None:
+        order = np.argsort(self.assign, kind="stable")
+        bounds = np.searchsorted(self.assign[order], np.arange(self.lists + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.lists)]
+
+    def _nearest(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def train(self, matrix: EmbeddingMatrix, iters: int = 10, seed: int = 0) -> None:
+        rows = np.flatnonzero(matrix.live)
+        n_lists = ivfflat_lists(len(rows))
+        rng = np.random.default_rng(seed)
+        sample = matrix.get(np.sort(rng.choice(rows, min(len(rows), 50 * n_lists), replace=False)))
+        sample /= np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~np.bincount(labels, minlength=n_lists).astype(bool)
+            sums[empty] = centroids[empty]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        self.assign = np.full(matrix.capacity, -1, dtype=np.int32)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            r = rows[start:start + CHUNK_ROWS]
+            self.assign[r] = self._nearest(matrix.get(r))
+        self.built_rows = len(rows)
+        self._index_lists()
+        self.save()
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        if self.centroids is None:
+            return
+        if int(ids.max()) >= len(self.assign):
+            grown = np.full(max(int(ids.max()) + 1, 2 * len(self.assign)), -1, dtype=np.int32)
+            grown[: len(self.assign)] = self.assign
+            self.assign = grown
+        labels = self._nearest(np.asarray(vectors, dtype=np.float32))
+        self.assign[ids] = labels
+        for lst in np.unique(labels):
+            self._lists[lst] = np.concatenate([self._lists[lst], ids[labels == lst]])
+        self.save()
+
+    def save(self) -> None:
+        with open(self.path, "wb") as f:
+            np.savez(f, centroids=self.centroids, assign=self.assign, built_rows=self.built_rows)
+
+    def needs_rebuild(self, rows: int, min_rows: int) -> bool:
+        if not min_rows or rows < min_rows:
+            return False
+        return self.centroids is None or rows > 2 * self.built_rows
+
+    def candidates(self, query: np.ndarray, probes: int) -> np.ndarray:
+        q = np.asarray(query, dtype=np.float32)
+        nearest = np.argsort(-(self.centroids @ q))[: max(1, probes)]
+        return np.sort(np.concatenate([self._lists[i] for i in nearest]))
+
+    def default_probes(self) -> int:
+        return max(1, round(math.sqrt(self.lists)))
+
+
+class QuantizedCodes:
+    def __init__(self, directory: str, kind: str, matrix: EmbeddingMatrix):
+        if kind not in ("int8", "binary"):
+            raise ValueError("quantization must be int8 or binary")
+        self.kind = kind
+        self.matrix = matrix
+        self.meta_path = os.path.join(directory, f"codes_{kind}.json")
+        self._code_path = os.path.join(directory, f"codes.{kind}")
+        self._scale_path = os.path.join(directory, "code_scales.float32")
+        self.capacity = 0
+        self.max_id = -1  # highest row encoded
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.max_id = meta["max_id"]
+            self._map(meta["capacity"])
+        self.sync()
+
+    @property
+    def width(self) -> int:
+        return self.matrix.dim if self.kind == "int8" else (self.matrix.dim + 7) // 8
+
+    def _map(self, capacity: int) -> None:
+        self._codes = _mmap(self._code_path, np.dtype(np.int8 if self.kind == "int8" else np.uint8),
+                            (capacity, self.width))
+        if self.kind == "int8":
+            self._scales = _mmap(self._scale_path, np.dtype(np.float32), (capacity,))
+        self.capacity = capacity
+        self._save_meta()
+
+    def _save_meta(self) -> None:
+        with open(self.meta_path, "w") as f:
+            json.dump({"capacity": self.capacity, "max_id": self.max_id}, f)
+
+    def sync(self) -> None:
+        """Encode rows the matrix holds but the codes don't (store created or filled without them)."""
+        live = np.flatnonzero(self.matrix.live)
+        missing = live[live > self.max_id]
+        for start in range(0, len(missing), CHUNK_ROWS):
+            r = missing[start:start + CHUNK_ROWS]
+            self.put(r, self.matrix.get(r))
+
+    def put(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        if not len(ids):
+            return
+        need = int(ids.max()) + 1
+        if need > self.capacity:
+            self._map(max(need, 2 * self.capacity, 1024))
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.kind == "int8":
+            peak = np.abs(vectors).max(axis=1)
+            norms = np.linalg.norm(vectors, axis=1)
+            safe = np.where(peak > 0, peak, 1.0)
+            self._codes[ids] = np.rint(vectors * (127.0 / safe)[:, None]).astype(np.int8)
+            # code · q * scale ≈ cosine(vector, q) for a unit q
+            self._scales[ids] = np.divide(safe / 127.0, norms, out=np.zeros_like(norms), where=norms > 0)
+            self._scales.flush()
+        else:
+            self._codes[ids] = np.packbits(vectors > 0, axis=1)
+        self._codes.flush()
+        self.max_id = max(self.max_id, int(ids.max()))
+        self._save_meta()
+
+    def _scores(self, q: np.ndarray, qbits: Optional[np.ndarray], rows) -> np.ndarray:
+        """Approximate similarity for rows (index array or slice), higher is better: int8 ≈ cosine, binary = -Hamming."""
+        if self.kind == "int8":
+            return (self._codes[rows].astype(np.float32) @ q) * self._scales[rows]
+        return -_popcount(np.bitwise_xor(self._codes[rows], qbits)).sum(axis=1, dtype=np.int32).astype(np.float32)
+
+    def candidates(self, query: list[float], k: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """The k live rows (of `rows`, default all) whose codes are nearest the query."""
+        q = np.asarray(query, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        qbits = np.packbits(q > 0) if self.kind == "binary" else None
+        live = self.matrix.live
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        def merge(r, sc):
+            nonlocal best_rows, best_scores
+            r, sc = top_k(sc, r, k)
+            best_rows, best_scores = top_k(np.concatenate([best_scores, sc]), np.concatenate([best_rows, r]), k)
+
+        if rows is None:  # full scan: contiguous blocks, scored whole
+            end = min(len(live), self.capacity)
+            for start in range(0, end, CHUNK_ROWS):
+                stop = min(start + CHUNK_ROWS, end)
+                ok = live[start:stop]
+                if ok.any():
+                    merge(np.flatnonzero(ok) + start, self._scores(q, qbits, slice(start, stop))[ok])
+        else:
+            rows = rows[rows < self.capacity]
+            rows = rows[live[rows]]
+            for start in range(0, len(rows), CHUNK_ROWS):
+                r = rows[start:start + CHUNK_ROWS]
+                merge(r, self._scores(q, qbits, r))
+        return np.sort(best_rows)
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(x)
+    return _POPCOUNT[x]
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
@@ -19,6 +19,8 @@ def main():
         print(f"\n=== Processing: {src} ===")
         video, highlights = vp.process(src)
         print(f"Saved {len(highlights)} highlights for video_id={video.id}")
+        u = vp.last_usage
+        print(f"LLM usage: {u.calls} calls, {u.prompt_tokens} prompt + {u.completion_tokens} completion tokens")
 
 if __name__ == "__main__":
     main()
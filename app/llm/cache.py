@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Optional, Union
+
+CachedValue = Union[str, list[float]]
+
+
+class LLMCache:
+    """
+    Persistent cache for generate() texts and embed() vectors, stored in one
+    SQLite file. Entries expire after ``ttl_sec``; when the stored payload
+    grows past ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, ttl_sec: float = 30 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._now = time.time
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru_idx ON llm_cache (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(kind: str, provider: str, model: str, payload: str, params: Optional[dict] = None) -> str:
+        """Key = hash of (kind, provider, model, generation params, prompt/text)."""
+        h = hashlib.sha256()
+        header = json.dumps([kind, provider, model, params or {}], sort_keys=True)
+        h.update(header.encode("utf-8"))
+        h.update(b"\0")
+        h.update(payload.encode("utf-8"))
+        return h.hexdigest()
+
+    @staticmethod
+    def _encode(value: CachedValue) -> tuple[str, bytes]:
+        if isinstance(value, str):
+            return "text", value.encode("utf-8")
+        # float32 keeps an embedding at ~3 KB instead of ~15 KB of JSON
+        return "vector", array("f", value).tobytes()
+
+    @staticmethod
+    def _decode(kind: str, blob: bytes) -> CachedValue:
+        if kind == "text":
+            return blob.decode("utf-8")
+        vec = array("f")
+        vec.frombytes(blob)
+        return vec.tolist()
+
+    def get(self, key: str) -> Optional[CachedValue]:
+        now = self._now()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, value, size, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            kind, blob, size, created_at = row
+            if now - created_at > self.ttl_sec:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return self._decode(kind, blob)
+
+    def put(self, key: str, value: CachedValue) -> None:
+        kind, blob = self._encode(value)
+        now = self._now()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, blob, len(blob), now, now),
+            )
+            self._total_bytes += len(blob) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until we are back under ~90% of max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
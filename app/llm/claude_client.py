@@ -1,66 +1,93 @@
 import anthropic
-import time
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from app.config import Config
+from app.llm.llm_client import AsyncLimiter, FallbackText
+from app.llm.local_embedder import LocalEmbedder
+from app.llm.retry import get_retrier
+from app.llm.tokens import record_usage
+
+SYSTEM_PROMPT = "You are an expert video analyst. Return only valid JSON as requested."
+FALLBACK_JSON = '{"is_highlight": true, "description": "Video segment with detected activity", "summary": "Notable moment", "confidence": 0.5}'
 
 
 class ClaudeClient:
+    provider = "claude"
+    gen_model = "claude-3-5-haiku-20241022"  # Fast and cost-effective model
+    embed_model = LocalEmbedder.embed_model
+    gen_params = {"temperature": 0.7, "max_tokens": 500, "system": SYSTEM_PROMPT}
+
     def __init__(self):
         if not Config.claude_api_key:
             raise RuntimeError("CLAUDE_API_KEY missing in environment or .env")
-        self.client = Anthropic(api_key=Config.claude_api_key)
+        base_url = Config.claude_base_url or None
+        # Retries live in app.llm.retry, so the SDK's own retry loop is disabled
+        self.client = Anthropic(api_key=Config.claude_api_key, base_url=base_url, max_retries=0)
+        # Async client keeps its own connection pool; reuse it for every request
+        self.aclient = AsyncAnthropic(api_key=Config.claude_api_key, base_url=base_url, max_retries=0)
+        self._limit = AsyncLimiter()
+        self._embedder = LocalEmbedder()
+        self._retry = get_retrier(
+            self.provider,
+            rate_limited=(anthropic.RateLimitError,),
+            transient=(anthropic.APIConnectionError, anthropic.InternalServerError),
+        )
 
     def embed(self, text: str) -> list[float]:
         """
-        Claude doesn't have native embeddings, so we'll use a simple fallback.
-        In production, you might want to use a separate embedding service.
-        For now, we'll create a simple hash-based embedding for compatibility.
+        Claude doesn't have native embeddings, so we use the offline hashed
+        n-gram embedder: similar wording gives similar 768-dim vectors.
         """
-        import hashlib
-        import struct
-        
-        # Create a deterministic 768-dimensional vector from text hash
-        hash_obj = hashlib.sha256(text.encode())
-        hash_bytes = hash_obj.digest()
-        
-        # Convert to 768 floats between -1 and 1
-        embedding = []
-        for i in range(768):
-            byte_idx = i % len(hash_bytes)
-            # Convert byte to float between -1 and 1
-            float_val = (hash_bytes[byte_idx] / 127.5) - 1.0
-            embedding.append(float_val)
-        
-        return embedding
+        return self._embedder.embed(text)
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return self._embedder.embed_many(texts)
+
+    def _message_kwargs(self, prompt: str) -> dict:
+        return dict(
+            model=self.gen_model,
+            max_tokens=self.gen_params["max_tokens"],
+            temperature=self.gen_params["temperature"],
+            system=SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+        )
+
+    def _message_text(self, response, prompt: str) -> str:
+        text = response.content[0].text.strip()
+        usage = getattr(response, "usage", None)
+        record_usage(
+            self.provider,
+            getattr(usage, "input_tokens", None),
+            getattr(usage, "output_tokens", None),
+            prompt,
+            text,
+        )
+        return text
 
     def generate(self, prompt: str) -> str:
         """Generate text using Claude's API"""
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",  # Fast and cost-effective model
-                max_tokens=500,
-                temperature=0.7,
-                system="You are an expert video analyst. Return only valid JSON as requested.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.content[0].text.strip()
-        except anthropic.RateLimitError as e:
-            print(f"⚠️ Claude rate limit exceeded: {e}")
-            # Wait a short time and retry once
-            time.sleep(5)
-            response = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=500,
-                temperature=0.7,
-                system="You are an expert video analyst. Return only valid JSON as requested.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.content[0].text.strip()
+            response = self._retry.call(self.client.messages.create, **self._message_kwargs(prompt))
+            return self._message_text(response, prompt)
         except Exception as e:
             print(f"❌ Claude generation error: {e}")
-            # Fallback for other errors
-            return '{"is_highlight": true, "description": "Video segment with detected activity", "summary": "Notable moment", "confidence": 0.5}'
+            # Fallback once retries are exhausted or for non-retryable errors
+            return FallbackText(FALLBACK_JSON)
+
+    async def aembed(self, text: str) -> list[float]:
+        """Local embedding, so there is nothing to await"""
+        return self.embed(text)
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_many(texts)
+
+    async def agenerate(self, prompt: str) -> str:
+        """Async generate; at most LLM_MAX_CONCURRENCY requests in flight"""
+        async with self._limit():
+            try:
+                response = await self._retry.acall(self.aclient.messages.create, **self._message_kwargs(prompt))
+                return self._message_text(response, prompt)
+            except Exception as e:
+                print(f"❌ Claude generation error: {e}")
+                return FallbackText(FALLBACK_JSON)
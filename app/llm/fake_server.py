@@ -0,0 +1,332 @@
+"""
+Local stand-in for the LLM provider HTTP APIs, for load tests and benchmarks.
+
+Speaks enough of each wire format for our clients:
+- OpenAI     POST /v1/chat/completions, /v1/embeddings
+- Anthropic  POST /v1/messages
+- Gemini     POST /v1beta/models/{model}:generateContent, :embedContent, :batchEmbedContents
+
+Answers are deterministic: highlight prompts get one JSON verdict per scene
+(batched prompts get an array keyed by scene_id) and embeddings come from
+LocalEmbedder. Latency is drawn from a configurable distribution and 429s can
+be injected, so retries, pacing and concurrency behave as against a real API.
+
+Run it:
+    python -m app.llm.fake_server --port 8089 --latency lognormal:0.3,0.6 --throttle-rate 0.05
+then point the clients at it with OPENAI_BASE_URL / CLAUDE_BASE_URL / GEMINI_BASE_URL.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from app.llm.local_embedder import LocalEmbedder
+from app.llm.tokens import estimate_tokens
+
+_BATCH_SCENE_RE = re.compile(r"^- scene_id (\d+): (\d+)s to (\d+)s \| Objects: (.*?) \| Transcript: T(\d+)$", re.M)
+_SCENE_RE = re.compile(r"^Scene: (\d+)s to (\d+)s\nObjects: (.*)$", re.M)
+_EXCERPT_RE = re.compile(r"^T(\d+) \(may be empty\): (.*)$", re.M)
+_SINGLE_EXCERPT_RE = re.compile(r"^Transcript excerpt \(may be empty\): (.*)$", re.M)
+
+
+_LATENCY_PARAMS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+
+class Latency:
+    """
+    Per-request delay in seconds, parsed from a spec:
+    "0.05" / "fixed:0.05", "uniform:0.02,0.2", "normal:0.1,0.03",
+    "lognormal:0.3,0.6" (median, sigma) or "exp:0.1" (mean).
+    """
+
+    def __init__(self, spec: str = "0", seed: Optional[int] = None):
+        kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+        self.kind = kind.strip().lower()
+        self.params = [float(a) for a in args.split(",") if a.strip()] if args else [0.0]
+        if self.kind not in _LATENCY_PARAMS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        if len(self.params) != _LATENCY_PARAMS[self.kind]:
+            raise ValueError(
+                f"Latency {self.kind!r} takes {_LATENCY_PARAMS[self.kind]} parameter(s), got {len(self.params)}: {spec}"
+            )
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        p = self.params
+        with self._lock:
+            if self.kind == "fixed":
+                value = p[0]
+            elif self.kind == "uniform":
+                value = self._rng.uniform(p[0], p[1])
+            elif self.kind == "normal":
+                value = self._rng.gauss(p[0], p[1])
+            elif self.kind == "lognormal":
+                value = p[0] * self._rng.lognormvariate(0.0, p[1])
+            else:
+                value = self._rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+def _stable_fraction(text: str) -> float:
+    """Deterministic value in [0, 1) derived from ``text``."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "little") / 2**32
+
+
+def _verdict(start: int, end: int, objects: str, excerpt: str) -> dict:
+    names = [o.split("(")[0] for o in objects.split(", ") if o and o != "none"]
+    is_highlight = bool(names or excerpt.strip())
+    if not is_highlight:
+        return {"is_highlight": False, "description": "", "summary": "", "confidence": 0.2}
+    what = ", ".join(names) if names else "speech"
+    return {
+        "is_highlight": True,
+        "description": f"Scene from {start}s to {end}s showing {what}.",
+        "summary": f"{what.capitalize()} at {start}s.",
+        "confidence": round(0.6 + 0.39 * _stable_fraction(f"{start}:{end}:{objects}"), 2),
+    }
+
+
+def fake_completion(prompt: str) -> str:
+    """Deterministic answer for a prompt built by HighlightSelector (or a generic one)."""
+    batch = _BATCH_SCENE_RE.findall(prompt)
+    if batch:
+        excerpts = dict(_EXCERPT_RE.findall(prompt))
+        return json.dumps([
+            {"scene_id": int(sid), **_verdict(int(s), int(e), objs, excerpts.get(t, ""))}
+            for sid, s, e, objs, t in batch
+        ])
+    single = _SCENE_RE.search(prompt)
+    if single:
+        excerpt = _SINGLE_EXCERPT_RE.search(prompt)
+        return json.dumps(_verdict(int(single[1]), int(single[2]), single[3], excerpt[1] if excerpt else ""))
+    return f"Fake answer to a {estimate_tokens(prompt)}-token prompt."
+
+
+class FakeProviderServer:
+    """
+    Threaded HTTP server; use as a context manager or start()/stop().
+    ``stats`` counts requests, throttles, peak concurrency and client connections.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "0",
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.01,
+        dimensions: int = 768,
+        seed: Optional[int] = None,
+    ):
+        self.latency = Latency(latency, seed)
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.dimensions = dimensions
+        self.stats = {"requests": 0, "throttled": 0, "in_flight": 0, "peak": 0,
+                      "connections": set(), "routes": Counter()}
+        self._throttle_next = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._embedder = LocalEmbedder()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        """Settings that point every provider client at this server."""
+        return {
+            "OPENAI_BASE_URL": self.url + "/v1",
+            "CLAUDE_BASE_URL": self.url,
+            "GEMINI_BASE_URL": self.url,
+        }
+
+    def throttle(self, n: int) -> None:
+        """Answer the next ``n`` requests with 429."""
+        with self._lock:
+            self._throttle_next += n
+
+    def start(self) -> "FakeProviderServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeProviderServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _should_throttle(self) -> bool:
+        with self._lock:
+            if self._throttle_next > 0:
+                self._throttle_next -= 1
+                hit = True
+            else:
+                hit = self.throttle_rate > 0 and self._rng.random() < self.throttle_rate
+            if hit:
+                self.stats["throttled"] += 1
+            return hit
+
+    def _embed(self, texts: list[str], dimensions: Optional[int] = None) -> list[list[float]]:
+        dim = dimensions or self.dimensions
+        return [(v + [0.0] * dim)[:dim] for v in self._embedder.embed_many(texts)]
+
+    # ----- wire formats -----
+
+    def _openai(self, route: str, body: dict) -> dict:
+        if route == "chat/completions":
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            text = fake_completion(body["messages"][-1]["content"])
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text),
+                          "total_tokens": estimate_tokens(prompt) + estimate_tokens(text)},
+            }
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(estimate_tokens(t) for t in inputs)
+        return {
+            "object": "list", "model": body.get("model"),
+            "data": [{"object": "embedding", "index": i, "embedding": v}
+                     for i, v in enumerate(self._embed(inputs, body.get("dimensions")))],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _anthropic(self, body: dict) -> dict:
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = fake_completion(body["messages"][-1]["content"])
+        return {
+            "id": "msg_fake", "type": "message", "role": "assistant", "model": body.get("model"),
+            "content": [{"type": "text", "text": text}], "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(text)},
+        }
+
+    def _gemini(self, method: str, body: dict) -> dict:
+        def text_of(content: dict) -> str:
+            return "".join(p.get("text", "") for p in content.get("parts", []))
+
+        if method == "generateContent":
+            prompt = "\n".join(text_of(c) for c in body.get("contents", []))
+            text = fake_completion(prompt)
+            return {
+                "candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": estimate_tokens(prompt),
+                                  "candidatesTokenCount": estimate_tokens(text),
+                                  "totalTokenCount": estimate_tokens(prompt) + estimate_tokens(text)},
+            }
+        if method == "embedContent":
+            return {"embedding": {"values": self._embed([text_of(body["content"])])[0]}}
+        texts = [text_of(r["content"]) for r in body.get("requests", [])]
+        return {"embeddings": [{"values": v} for v in self._embed(texts)]}
+
+    def respond(self, path: str, body: dict) -> tuple[int, dict]:
+        path = path.split("?", 1)[0]
+        if path.startswith("/v1/") and path[4:] in ("chat/completions", "embeddings"):
+            return 200, self._openai(path[4:], body)
+        if path == "/v1/messages":
+            return 200, self._anthropic(body)
+        if path.startswith("/v1beta/models/") and ":" in path:
+            method = path.rsplit(":", 1)[1]
+            if method in ("generateContent", "embedContent", "batchEmbedContents"):
+                return 200, self._gemini(method, body)
+        return 404, {"error": {"message": f"unknown path {path}", "type": "not_found"}}
+
+    @staticmethod
+    def rate_limit_body(path: str) -> dict:
+        if path.startswith("/v1beta/"):
+            return {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+        if path.startswith("/v1/messages"):
+            return {"type": "error", "error": {"type": "rate_limit_error", "message": "rate limited"}}
+        return {"error": {"message": "rate limited", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: Optional[dict] = None) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.loads(raw or b"{}")
+                if server._should_throttle():
+                    self._send(429, server.rate_limit_body(self.path), {"Retry-After": str(server.retry_after)})
+                    return
+                with server._lock:
+                    s = server.stats
+                    s["requests"] += 1
+                    s["in_flight"] += 1
+                    s["peak"] = max(s["peak"], s["in_flight"])
+                    s["connections"].add(self.client_address)
+                    s["routes"][self.path.split("?", 1)[0]] += 1
+                try:
+                    time.sleep(server.latency.sample())
+                    status, payload = server.respond(self.path, body)
+                finally:
+                    with server._lock:
+                        server.stats["in_flight"] -= 1
+                self._send(status, payload)
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local fake OpenAI/Anthropic/Gemini endpoint for load tests")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", default="lognormal:0.3,0.5",
+                    help="fixed:S | uniform:A,B | normal:MU,SIGMA | lognormal:MEDIAN,SIGMA | exp:MEAN")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    server = FakeProviderServer(args.host, args.port, args.latency, args.throttle_rate, args.retry_after,
+                                seed=args.seed)
+    print(f"🧪 Fake LLM provider listening on {server.url} (latency={args.latency}, 429 rate={args.throttle_rate})")
+    for k, v in server.env().items():
+        print(f"   {k}={v}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(f"📊 {server.stats['requests']} requests, {server.stats['throttled']} throttled, "
+              f"peak concurrency {server.stats['peak']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,123 @@
+import asyncio
 import google.generativeai as genai
-import time
-from google.api_core.exceptions import ResourceExhausted
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+    TooManyRequests,
+)
 from app.config import Config
+from app.llm.llm_client import AsyncLimiter, FallbackText
+from app.llm.retry import get_retrier
+from app.llm.tokens import record_usage
+
+FALLBACK_JSON = '{"is_highlight": true, "description": "Notable video segment with visual activity", "summary": "Interesting moment detected", "confidence": 0.6}'
 
 
 class GeminiClient:
+    provider = "gemini"
+    gen_params: dict = {}  # SDK defaults
+    embed_batch_size = 100  # batchEmbedContents accepts at most 100 requests
+
     def __init__(self):
         if not Config.google_api_key:
             raise RuntimeError("GOOGLE_API_KEY missing in environment or .env")
-        genai.configure(api_key=Config.google_api_key)
-        self._embed_model = Config.embedding_model
+        if Config.gemini_base_url:
+            # Custom endpoints (proxies, app.llm.fake_server) are reached over plain REST
+            genai.configure(
+                api_key=Config.google_api_key,
+                transport="rest",
+                client_options={"api_endpoint": Config.gemini_base_url},
+            )
+        else:
+            genai.configure(api_key=Config.google_api_key)
+        # embed_content wants a resource name ("models/text-embedding-004")
+        name = Config.embedding_model
+        self._embed_model = name if "/" in name else f"models/{name}"
         self._gen_model = Config.generation_model
+        self.embed_model = name
+        self.gen_model = self._gen_model
+        # Built once; GenerativeModel holds the underlying transport
+        self._model = genai.GenerativeModel(self._gen_model)
+        # The SDK's async calls need the gRPC transport; over REST, run the sync call in a thread
+        if Config.gemini_base_url:
+            self._embed_async = lambda **kw: asyncio.to_thread(genai.embed_content, **kw)
+            self._generate_async = lambda prompt: asyncio.to_thread(self._model.generate_content, prompt)
+        else:
+            self._embed_async = genai.embed_content_async
+            self._generate_async = self._model.generate_content_async
+        self._limit = AsyncLimiter()
+        self._retry = get_retrier(
+            self.provider,
+            # gRPC reports quota as RESOURCE_EXHAUSTED, the REST transport as HTTP 429
+            rate_limited=(ResourceExhausted, TooManyRequests),
+            transient=(ServiceUnavailable, InternalServerError, DeadlineExceeded),
+        )
+
+    def _output_text(self, out, prompt: str) -> str:
+        text = out.text.strip() if getattr(out, "text", None) else ""
+        meta = getattr(out, "usage_metadata", None)
+        record_usage(
+            self.provider,
+            getattr(meta, "prompt_token_count", None),
+            getattr(meta, "candidates_token_count", None),
+            prompt,
+            text,
+        )
+        return text
 
     def embed(self, text: str) -> list[float]:
-        """Embed text with retry logic for quota limits"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                resp = genai.embed_content(model=self._embed_model, content=text)
-                return resp["embedding"]
-            except ResourceExhausted as e:
-                if attempt < max_retries - 1:
-                    print(f"⏳ Quota exceeded, waiting 60 seconds... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(60)
-                else:
-                    raise e
+        """Embed text; quota and transient errors are retried by the shared engine"""
+        resp = self._retry.call(genai.embed_content, model=self._embed_model, content=text)
+        record_usage(self.provider, None, 0, text)  # embed responses carry no token counts
+        return resp["embedding"]
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Embed many texts with one batch call per embed_batch_size chunk, preserving order"""
+        out: list[list[float]] = []
+        for i in range(0, len(texts), self.embed_batch_size):
+            chunk = texts[i:i + self.embed_batch_size]
+            resp = self._retry.call(genai.embed_content, model=self._embed_model, content=chunk)
+            record_usage(self.provider, None, 0, "\n".join(chunk))
+            out.extend(resp["embedding"])
+        return out
 
     def generate(self, prompt: str) -> str:
-        """Generate text with retry logic for quota limits"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        """Generate text; quota and transient errors are retried by the shared engine"""
+        try:
+            out = self._retry.call(self._model.generate_content, prompt)
+            return self._output_text(out, prompt)
+        except (ResourceExhausted, TooManyRequests):
+            # If still failing, return a fallback response
+            print(f"⚠️ API quota exhausted after {self._retry.max_attempts} attempts, using fallback")
+            return FallbackText(FALLBACK_JSON)
+
+    async def aembed(self, text: str) -> list[float]:
+        """Async embed; at most LLM_MAX_CONCURRENCY requests in flight"""
+        async with self._limit():
+            resp = await self._retry.acall(self._embed_async, model=self._embed_model, content=text)
+            record_usage(self.provider, None, 0, text)
+            return resp["embedding"]
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """Async embed_many; chunks are sent concurrently within the provider cap"""
+        async def one(chunk: list[str]) -> list[list[float]]:
+            async with self._limit():
+                resp = await self._retry.acall(self._embed_async, model=self._embed_model, content=chunk)
+                record_usage(self.provider, None, 0, "\n".join(chunk))
+                return resp["embedding"]
+
+        chunks = [texts[i:i + self.embed_batch_size] for i in range(0, len(texts), self.embed_batch_size)]
+        results = await asyncio.gather(*(one(c) for c in chunks))
+        return [emb for part in results for emb in part]
+
+    async def agenerate(self, prompt: str) -> str:
+        """Async generate; at most LLM_MAX_CONCURRENCY requests in flight"""
+        async with self._limit():
             try:
-                model = genai.GenerativeModel(self._gen_model)
-                out = model.generate_content(prompt)
-                return out.text.strip() if getattr(out, "text", None) else ""
-            except ResourceExhausted as e:
-                if attempt < max_retries - 1:
-                    print(f"⏳ Quota exceeded, waiting 60 seconds... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(60)
-                else:
-                    # If still failing, return a fallback response
-                    print(f"⚠️ API quota exhausted after {max_retries} attempts, using fallback")
-                    return '{"is_highlight": true, "description": "Notable video segment with visual activity", "summary": "Interesting moment detected", "confidence": 0.6}'
+                out = await self._retry.acall(self._generate_async, prompt)
+                return self._output_text(out, prompt)
+            except (ResourceExhausted, TooManyRequests):
+                print(f"⚠️ API quota exhausted after {self._retry.max_attempts} attempts, using fallback")
+                return FallbackText(FALLBACK_JSON)
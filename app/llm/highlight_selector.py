@@ -1,6 +1,8 @@
 import json
 from typing import Tuple, Optional
+from app.config import Config
 from app.llm.llm_client import UnifiedLLMClient
+from app.llm.tokens import PromptBudget, estimate_tokens
 from app.types import HighlightModel, DetectedObjectModel
 
 SYSTEM_PROMPT = """You are an expert video analyst specializing in identifying important moments.
@@ -49,9 +51,68 @@ Return JSON:
 }
 """
 
+BATCH_INSTRUCTIONS = """You are given several scenes from the same video, each with a numeric scene_id.
+Apply the criteria above to EACH scene independently.
+
+Return a JSON array with exactly one object per scene:
+[
+  {
+    "scene_id": 1,
+    "is_highlight": true|false,
+    "description": "Detailed description of what makes this moment interesting",
+    "summary": "One sentence summary",
+    "confidence": 0.0
+  }
+]
+"""
+
+# Rough answer size per scene, reserved from the budget when packing a batch
+_OUTPUT_TOKENS_PER_SCENE = 120
+
+SceneInput = Tuple[Tuple[int, int], str, list[DetectedObjectModel]]
+
+
+def _load_json(raw: str):
+    """Parse model output, tolerating a surrounding ```json fence."""
+    txt = (raw or "").strip()
+    if txt.startswith("```"):
+        txt = txt.strip("`")
+        if txt.lower().startswith("json"):
+            txt = txt[4:]
+    return json.loads(txt)
+
+
 class HighlightSelector:
-    def __init__(self, client: UnifiedLLMClient):
+    def __init__(self, client: UnifiedLLMClient, budget: Optional[PromptBudget] = None):
         self.client = client
+        self.budget = budget or PromptBudget()
+
+    @staticmethod
+    def _from_item(seg: Tuple[int, int], it: dict, objects: list[DetectedObjectModel]) -> HighlightModel:
+        start, end = seg
+        return HighlightModel(
+            ts_start_sec=start,
+            ts_end_sec=end,
+            description=(it.get("description") or "").strip(),
+            llm_summary=(it.get("summary") or "").strip(),
+            confidence=float(it.get("confidence", 0.6)),
+            objects=objects,
+        )
+
+    @staticmethod
+    def _heuristic(seg: Tuple[int, int], objects: list[DetectedObjectModel]) -> Optional[HighlightModel]:
+        # Heuristic fallback (only if some objects exist)
+        if not objects:
+            return None
+        start, end = seg
+        return HighlightModel(
+            ts_start_sec=start,
+            ts_end_sec=end,
+            description=f"Notable activity with objects: {', '.join(o.name for o in objects)}.",
+            llm_summary="Notable visual activity.",
+            confidence=0.55,
+            objects=objects,
+        )
 
     def analyze_segment(
         self,
@@ -60,8 +121,7 @@ class HighlightSelector:
         objects: list[DetectedObjectModel],
     ) -> Optional[HighlightModel]:
         start, end = seg
-        obj_txt = ", ".join([f"{o.name}({o.confidence:.2f})" for o in objects]) if objects else "none"
-        snippet = transcript[:1200] if transcript else ""
+        obj_txt, snippet = self.budget.fit(objects, transcript)
         user_prompt = f"""
 Scene: {start}s to {end}s
 Objects: {obj_txt}
@@ -72,30 +132,118 @@ Return JSON only.
 """
         raw = self.client.generate(user_prompt)
         try:
-            data = json.loads(raw)
+            data = _load_json(raw)
             items = data if isinstance(data, list) else [data]
             for it in items:
                 if it.get("is_highlight"):
-                    return HighlightModel(
-                        ts_start_sec=start,
-                        ts_end_sec=end,
-                        description=(it.get("description") or "").strip(),
-                        llm_summary=(it.get("summary") or "").strip(),
-                        confidence=float(it.get("confidence", 0.6)),
-                        objects=objects,
-                    )
+                    return self._from_item(seg, it, objects)
         except Exception:
-            # Heuristic fallback (only if some objects exist)
-            if objects:
-                return HighlightModel(
-                    ts_start_sec=start,
-                    ts_end_sec=end,
-                    description=f"Notable activity with objects: {', '.join(o.name for o in objects)}.",
-                    llm_summary="Notable visual activity.",
-                    confidence=0.55,
-                    objects=objects,
-                )
+            return self._heuristic(seg, objects)
         return None
 
+    def analyze_segments(self, scenes: list[SceneInput]) -> list[Optional[HighlightModel]]:
+        """
+        Analyze many scenes with as few generate() calls as possible.
+        Scenes are packed into batches that fit LLM_BATCH_TOKEN_BUDGET (at most
+        LLM_BATCH_MAX_SCENES each); scenes whose entry is missing or invalid in the
+        batched answer are retried one by one with analyze_segment.
+        Returns one result per input scene, in input order.
+        """
+        results: list[Optional[HighlightModel]] = [None] * len(scenes)
+        for batch in self._plan_batches(scenes):
+            if len(batch) == 1:
+                i = batch[0]
+                results[i] = self.analyze_segment(*scenes[i])
+                continue
+            parsed = self._analyze_batch([scenes[i] for i in batch])
+            for pos, i in enumerate(batch):
+                if pos in parsed:
+                    results[i] = parsed[pos]
+                else:
+                    results[i] = self.analyze_segment(*scenes[i])
+        return results
+
+    def _plan_batches(self, scenes: list[SceneInput]) -> list[list[int]]:
+        """Greedily group scene indices so each prompt stays within the token budget."""
+        budget = Config.llm_batch_token_budget - estimate_tokens(SYSTEM_PROMPT + BATCH_INSTRUCTIONS)
+        batches: list[list[int]] = []
+        current: list[int] = []
+        used = 0
+        seen_snippets: set[str] = set()
+        for i, (_, transcript, objects) in enumerate(scenes):
+            obj_txt, snippet = self.budget.fit(objects, transcript)
+            scene_cost = estimate_tokens(obj_txt) + 20 + _OUTPUT_TOKENS_PER_SCENE
+            excerpt_cost = 0 if snippet in seen_snippets else estimate_tokens(snippet)
+            if current and (
+                used + scene_cost + excerpt_cost > budget or len(current) >= Config.llm_batch_max_scenes
+            ):
+                batches.append(current)
+                current, used, seen_snippets = [], 0, set()
+                excerpt_cost = estimate_tokens(snippet)
+            current.append(i)
+            used += scene_cost + excerpt_cost
+            seen_snippets.add(snippet)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _analyze_batch(self, scenes: list[SceneInput]) -> dict[int, Optional[HighlightModel]]:
+        """
+        Send one prompt for several scenes. Returns {position: result} for every
+        scene that came back valid; missing positions need an individual retry.
+        """
+        # Scenes of one video usually share the transcript, so send each excerpt once
+        excerpts: list[str] = []
+        lines = []
+        for pos, ((start, end), transcript, objects) in enumerate(scenes):
+            obj_txt, snippet = self.budget.fit(objects, transcript)
+            if snippet not in excerpts:
+                excerpts.append(snippet)
+            lines.append(
+                f"- scene_id {pos + 1}: {start}s to {end}s | Objects: {obj_txt}"
+                f" | Transcript: T{excerpts.index(snippet) + 1}"
+            )
+        transcripts = "\n".join(f"T{n + 1} (may be empty): {t}" for n, t in enumerate(excerpts))
+        scene_lines = "\n".join(lines)
+        user_prompt = f"""
+Scenes:
+{scene_lines}
+
+Transcript excerpts:
+{transcripts}
+
+{SYSTEM_PROMPT}
+{BATCH_INSTRUCTIONS}
+Return JSON only.
+"""
+        raw = self.client.generate(user_prompt)
+        try:
+            data = _load_json(raw)
+        except Exception:
+            return {}
+        items = data if isinstance(data, list) else [data]
+
+        parsed: dict[int, Optional[HighlightModel]] = {}
+        for it in items:
+            try:
+                pos = int(it["scene_id"]) - 1
+                if not 0 <= pos < len(scenes) or pos in parsed:
+                    continue
+                if not isinstance(it.get("is_highlight"), bool):
+                    continue
+                seg, _, objects = scenes[pos]
+                parsed[pos] = self._from_item(seg, it, objects) if it["is_highlight"] else None
+            except Exception:
+                continue
+        return parsed
+
     def embed_desc(self, text: str) -> list[float]:
         return self.client.embed(text)
+
+    def embed_descs(self, texts: list[str]) -> list[list[float]]:
+        """Embed all descriptions with batched provider calls (order preserved)."""
+        if not texts:
+            return []
+        if hasattr(self.client, "embed_many"):
+            return self.client.embed_many(texts)
+        return [self.client.embed(t) for t in texts]
@@ -1,11 +1,50 @@
+import asyncio
 from app.config import Config
-from typing import Protocol
+from typing import Protocol, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.llm.cache import LLMCache
 
 
 class LLMClientProtocol(Protocol):
     """Protocol for LLM clients to ensure consistent interface"""
     def embed(self, text: str) -> list[float]: ...
+    def embed_many(self, texts: list[str]) -> list[list[float]]: ...
     def generate(self, prompt: str) -> str: ...
+    async def aembed(self, text: str) -> list[float]: ...
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]: ...
+    async def agenerate(self, prompt: str) -> str: ...
+
+
+class FallbackText(str):
+    """
+    A canned response returned when the provider call failed.
+    Behaves like the JSON string it wraps, but callers (e.g. the cache)
+    can tell it apart from a real model answer.
+    """
+
+
+class AsyncLimiter:
+    """
+    Caps in-flight async requests for one provider.
+    asyncio primitives belong to a single event loop, so the semaphore is
+    (re)created for whichever loop is running.
+    """
+
+    def __init__(self, limit: int | None = None):
+        self.limit = limit or Config.llm_max_concurrency
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sem: asyncio.Semaphore | None = None
+
+    def __call__(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.limit)
+        return self._sem
+
+
+PROVIDER_PRIORITY = ("gemini", "openai", "claude")
 
 
 class UnifiedLLMClient:
@@ -14,46 +53,92 @@ class UnifiedLLMClient:
     based on available API keys in environment.
     """
     
-    def __init__(self):
+    def __init__(self, cache: "LLMCache | None" = None):
         self.client = self._create_client()
         self.client_type = self._get_client_type()
         print(f"🤖 Using {self.client_type} LLM client")
+        self.embedder = self._create_embedder()
+        self.cache = cache if cache is not None else self._create_cache()
 
-    def _create_client(self) -> LLMClientProtocol:
-        """Create appropriate LLM client based on available API keys"""
-        
-        # Priority 1: Try Gemini if API key is available
-        if Config.google_api_key:
+    def _create_embedder(self):
+        """Embedding backend: the provider client itself, or the offline local embedder"""
+        if Config.embedding_backend == "local":
+            from app.llm.local_embedder import LocalEmbedder
+            print("🧮 Using local offline embeddings")
+            return LocalEmbedder()
+        return self.client
+
+    @staticmethod
+    def _create_cache() -> "LLMCache | None":
+        if not Config.llm_cache_path:
+            return None
+        from app.llm.cache import LLMCache
+        return LLMCache(
+            Config.llm_cache_path,
+            ttl_sec=Config.llm_cache_ttl_sec,
+            max_bytes=Config.llm_cache_max_mb * 1024 * 1024,
+        )
+
+    @staticmethod
+    def _init_provider(name: str) -> LLMClientProtocol | None:
+        """Instantiate one provider client if its API key is set; None otherwise."""
+        if name == "gemini" and Config.google_api_key:
             try:
                 from app.llm.gemini_client import GeminiClient
                 return GeminiClient()
             except Exception as e:
                 print(f"⚠️ Failed to initialize Gemini client: {e}")
-        
-        # Priority 2: Try OpenAI if API key is available
-        if Config.openai_api_key:
+        elif name == "openai" and Config.openai_api_key:
             try:
                 from app.llm.openai_client import OpenAIClient
                 return OpenAIClient()
             except Exception as e:
                 print(f"⚠️ Failed to initialize OpenAI client: {e}")
-        
-        # Priority 3: Try Claude if API key is available
-        if Config.claude_api_key:
+        elif name == "claude" and Config.claude_api_key:
             try:
                 from app.llm.claude_client import ClaudeClient
                 return ClaudeClient()
             except Exception as e:
                 print(f"⚠️ Failed to initialize Claude client: {e}")
-        
+        return None
+
+    def _create_client(self) -> LLMClientProtocol:
+        """Create appropriate LLM client based on available API keys"""
+        if Config.llm_routing == "balanced":
+            return self._create_router()
+
+        # Priority order: Gemini → OpenAI → Claude
+        for name in PROVIDER_PRIORITY:
+            client = self._init_provider(name)
+            if client is not None:
+                return client
+
         # No valid API keys found
         raise RuntimeError(
             "No valid LLM API keys found. Please set one of: GOOGLE_API_KEY, OPENAI_API_KEY, or CLAUDE_API_KEY in your .env file"
         )
 
+    def _create_router(self) -> LLMClientProtocol:
+        """Keep every configured provider live behind a health-aware router"""
+        from app.llm.router import ProviderRouter, parse_weights
+
+        clients = [c for c in (self._init_provider(n) for n in PROVIDER_PRIORITY) if c is not None]
+        if not clients:
+            raise RuntimeError(
+                "No valid LLM API keys found. Please set one of: GOOGLE_API_KEY, OPENAI_API_KEY, or CLAUDE_API_KEY in your .env file"
+            )
+        if len(clients) == 1:
+            return clients[0]
+        # Same default as single mode (highest-priority key), so stored vectors stay comparable
+        pinned = Config.embedding_provider.strip().lower()
+        embed_client = next((c for c in clients if c.provider == pinned), clients[0])
+        return ProviderRouter(clients, embed_client, weights=parse_weights(Config.llm_provider_weights))
+
     def _get_client_type(self) -> str:
         """Get the type of client being used for logging"""
-        if hasattr(self.client, '_gen_model'):
+        if hasattr(self.client, 'providers'):
+            return f"Router({', '.join(self.client.providers)})"
+        elif hasattr(self.client, '_gen_model'):
             return "Gemini"
         elif hasattr(self.client, 'client') and hasattr(self.client.client, 'chat'):
             return "OpenAI"
@@ -62,10 +147,109 @@ class UnifiedLLMClient:
         else:
             return "Unknown"
 
+    def retry_stats(self) -> dict:
+        """Retry/backoff counters and current request rate for the active provider(s)"""
+        from app.llm.retry import retry_stats
+        stats = retry_stats()
+        if hasattr(self.client, "providers"):
+            return {name: stats.get(name, {}) for name in self.client.providers}
+        return stats.get(getattr(self.client, "provider", ""), {})
+
+    def _cache_key(self, kind: str, payload: str) -> str | None:
+        if self.cache is None:
+            return None
+        from app.llm.cache import LLMCache
+        provider = getattr(self.client, "provider", self.client_type)
+        if kind == "embed":
+            emb = self.embedder
+            provider = getattr(emb, "embed_provider", getattr(emb, "provider", self.client_type))
+            return LLMCache.make_key(kind, provider, getattr(emb, "embed_model", ""), payload)
+        return LLMCache.make_key(
+            kind, provider, getattr(self.client, "gen_model", ""), payload, getattr(self.client, "gen_params", None)
+        )
+
+    def _cache_get(self, key: str | None):
+        return self.cache.get(key) if key else None
+
+    def _cache_put(self, key: str | None, value) -> None:
+        # Never persist canned failure answers or empty completions
+        if key and value and not isinstance(value, FallbackText):
+            self.cache.put(key, value)
+
+    async def _cache_io(self, fn, *args):
+        """Run a cache step from async code: the cache is SQLite (a read also writes last_access), so in a thread."""
+        if self.cache is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
     def embed(self, text: str) -> list[float]:
         """Embed text using the active LLM client"""
-        return self.client.embed(text)
+        key = self._cache_key("embed", text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        emb = self.embedder.embed(text)
+        self._cache_put(key, emb)
+        return emb
+
+    def _split_cached(self, texts: list[str]) -> tuple[list, list[str], dict[str, str | None]]:
+        """Return (results with cache hits filled in, unique texts still to embed, text -> cache key)."""
+        keys = {t: self._cache_key("embed", t) for t in dict.fromkeys(texts)}
+        found: dict[str, list[float]] = {}
+        for t, key in keys.items():
+            cached = self._cache_get(key)
+            if cached is not None:
+                found[t] = cached
+        results = [found.get(t) for t in texts]
+        return results, [t for t in keys if t not in found], keys
+
+    def _merge_embedded(self, texts, results, todo, embedded, keys) -> list[list[float]]:
+        fresh = dict(zip(todo, embedded))
+        for t, emb in fresh.items():
+            self._cache_put(keys[t], emb)
+        return [r if r is not None else fresh[t] for t, r in zip(texts, results)]
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed many texts in as few provider calls as possible.
+        Cache hits and duplicate texts are not sent; output order matches input.
+        """
+        results, todo, keys = self._split_cached(texts)
+        embedded = self.embedder.embed_many(todo) if todo else []
+        return self._merge_embedded(texts, results, todo, embedded, keys)
 
     def generate(self, prompt: str) -> str:
         """Generate text using the active LLM client"""
-        return self.client.generate(prompt)
+        key = self._cache_key("generate", prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        out = self.client.generate(prompt)
+        self._cache_put(key, out)
+        return out
+
+    async def aembed(self, text: str) -> list[float]:
+        """Embed text without blocking the event loop"""
+        key = self._cache_key("embed", text)
+        cached = await self._cache_io(self._cache_get, key)
+        if cached is not None:
+            return cached
+        emb = await self.embedder.aembed(text)
+        await self._cache_io(self._cache_put, key, emb)
+        return emb
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """Async embed_many"""
+        results, todo, keys = await self._cache_io(self._split_cached, texts)
+        embedded = await self.embedder.aembed_many(todo) if todo else []
+        return await self._cache_io(self._merge_embedded, texts, results, todo, embedded, keys)
+
+    async def agenerate(self, prompt: str) -> str:
+        """Generate text without blocking the event loop"""
+        key = self._cache_key("generate", prompt)
+        cached = await self._cache_io(self._cache_get, key)
+        if cached is not None:
+            return cached
+        out = await self.client.agenerate(prompt)
+        await self._cache_io(self._cache_put, key, out)
+        return out
@@ -0,0 +1,101 @@
+"""
+Offline, CPU-only text embeddings.
+
+Texts are turned into sparse lexical features (words, word bigrams and
+character n-grams) which are hashed through a fixed sparse random projection
+into 768 dimensions, then L2-normalized. Similar wording gives similar
+vectors, nothing leaves the machine, and the output has the same shape as the
+provider embeddings stored in ``highlights.embedding``.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DIM = 768
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_HASHES_PER_FEATURE = 4  # non-zeros per feature in the projection
+_WEIGHTS = {"w": 1.0, "b": 0.7, "c": 0.35}
+
+
+@lru_cache(maxsize=200_000)
+def _project(feature: str) -> tuple[tuple[int, ...], tuple[float, ...]]:
+    """Projection column for a feature: 4 (index, ±1) pairs derived from one blake2b digest."""
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    idx, sign = [], []
+    for _ in range(_HASHES_PER_FEATURE):
+        h, i = divmod(h, DIM)
+        idx.append(i)
+        sign.append(1.0 if h & 1 else -1.0)
+        h >>= 1
+    return tuple(idx), tuple(sign)
+
+
+@lru_cache(maxsize=100_000)
+def _word_columns(word: str) -> tuple[np.ndarray, np.ndarray]:
+    """Summed projection of a word and its character 3-5 grams (cached: words repeat a lot)."""
+    feats = [("w:" + word, _WEIGHTS["w"])]
+    padded = f"<{word}>"
+    for n in (3, 4, 5):
+        feats += [("c:" + padded[i:i + n], _WEIGHTS["c"]) for i in range(len(padded) - n + 1)]
+    return _columns(feats)
+
+
+@lru_cache(maxsize=100_000)
+def _bigram_columns(bigram: str) -> tuple[np.ndarray, np.ndarray]:
+    return _columns([("b:" + bigram, _WEIGHTS["b"])])
+
+
+def _columns(feats: list[tuple[str, float]]) -> tuple[np.ndarray, np.ndarray]:
+    idx: list[int] = []
+    val: list[float] = []
+    for feat, weight in feats:
+        i, s = _project(feat)
+        idx.extend(i)
+        val.extend(x * weight for x in s)
+    return np.asarray(idx, dtype=np.intp), np.asarray(val, dtype=np.float32)
+
+
+class LocalEmbedder:
+    """Drop-in embedding backend (embed/embed_many and async twins) with no network access."""
+
+    provider = "local"
+    embed_model = f"hashed-ngram-{DIM}-v1"
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), 768) float32 matrix of unit-length rows."""
+        idx_parts: list[np.ndarray] = []
+        val_parts: list[np.ndarray] = []
+        lengths = np.zeros(len(texts), dtype=np.intp)
+        for r, text in enumerate(texts):
+            words = _TOKEN_RE.findall(text.lower())
+            cols = [_word_columns(w) for w in words]
+            cols += [_bigram_columns(f"{a} {b}") for a, b in zip(words, words[1:])]
+            for i, v in cols:
+                idx_parts.append(i)
+                val_parts.append(v)
+                lengths[r] += len(i)
+        if not idx_parts:
+            return np.zeros((len(texts), DIM), dtype=np.float32)
+        # one bincount over flattened (row, column) positions accumulates the whole batch
+        flat = np.repeat(np.arange(len(texts), dtype=np.intp) * DIM, lengths) + np.concatenate(idx_parts)
+        mat = np.bincount(flat, weights=np.concatenate(val_parts), minlength=len(texts) * DIM)
+        mat = mat.reshape(len(texts), DIM).astype(np.float32)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        np.divide(mat, norms, out=mat, where=norms > 0)
+        return mat
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self.embed_array(texts).tolist()
+
+    def embed(self, text: str) -> list[float]:
+        return self.embed_many([text])[0]
+
+    async def aembed(self, text: str) -> list[float]:
+        return self.embed(text)
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_many(texts)
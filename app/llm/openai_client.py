@@ -1,67 +1,126 @@
+import asyncio
 import openai
-import time
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from app.config import Config
+from app.llm.llm_client import AsyncLimiter, FallbackText
+from app.llm.retry import get_retrier
+from app.llm.tokens import record_usage
+
+SYSTEM_PROMPT = "You are an expert video analyst. Return only valid JSON as requested."
+FALLBACK_JSON = '{"is_highlight": true, "description": "Video segment with detected activity", "summary": "Notable moment", "confidence": 0.5}'
 
 
 class OpenAIClient:
+    provider = "openai"
+    gen_model = "gpt-4o-mini"  # Cost-effective model
+    embed_model = "text-embedding-3-small"
+    gen_params = {"temperature": 0.7, "max_tokens": 500, "system": SYSTEM_PROMPT}
+    embed_batch_size = 2048  # max inputs per embeddings.create call
+
     def __init__(self):
         if not Config.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY missing in environment or .env")
-        self.client = OpenAI(api_key=Config.openai_api_key)
+        base_url = Config.openai_base_url or None
+        # Retries live in app.llm.retry, so the SDK's own retry loop is disabled
+        self.client = OpenAI(api_key=Config.openai_api_key, base_url=base_url, max_retries=0)
+        # Async client keeps its own connection pool; reuse it for every request
+        self.aclient = AsyncOpenAI(api_key=Config.openai_api_key, base_url=base_url, max_retries=0)
+        self._limit = AsyncLimiter()
+        self._retry = get_retrier(
+            self.provider,
+            rate_limited=(openai.RateLimitError,),
+            transient=(openai.APIConnectionError, openai.InternalServerError),
+        )
+
+    def _embed_kwargs(self, text: str | list[str]) -> dict:
+        return dict(
+            model=self.embed_model,
+            input=text,
+            dimensions=768,  # Match Gemini's 768 dimensions
+        )
+
+    def _chat_kwargs(self, prompt: str) -> dict:
+        return dict(
+            model=self.gen_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=self.gen_params["temperature"],
+            max_tokens=self.gen_params["max_tokens"],
+        )
+
+    def _record_usage(self, response, prompt: str | list[str], completion: str = "") -> None:
+        usage = getattr(response, "usage", None)
+        prompt_text = prompt if isinstance(prompt, str) else "\n".join(prompt)
+        record_usage(
+            self.provider,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", 0 if usage is not None else None),
+            prompt_text,
+            completion,
+        )
+
+    def _chat_text(self, response, prompt: str) -> str:
+        text = response.choices[0].message.content.strip()
+        self._record_usage(response, prompt, text)
+        return text
 
     def embed(self, text: str) -> list[float]:
         """Embed text using OpenAI's text-embedding-3-small model"""
         try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                dimensions=768  # Match Gemini's 768 dimensions
-            )
-            return response.data[0].embedding
-        except openai.RateLimitError as e:
-            print(f"⚠️ OpenAI rate limit exceeded: {e}")
-            # For paid accounts, rate limits are usually much higher
-            # Just wait a short time and retry once
-            time.sleep(5)
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                dimensions=768
-            )
+            response = self._retry.call(self.client.embeddings.create, **self._embed_kwargs(text))
+            self._record_usage(response, text)
             return response.data[0].embedding
         except Exception as e:
             print(f"❌ OpenAI embedding error: {e}")
             raise e
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Embed many texts, one request per embed_batch_size chunk, preserving order"""
+        out: list[list[float]] = []
+        for i in range(0, len(texts), self.embed_batch_size):
+            chunk = texts[i:i + self.embed_batch_size]
+            response = self._retry.call(self.client.embeddings.create, **self._embed_kwargs(chunk))
+            self._record_usage(response, chunk)
+            out.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        return out
+
     def generate(self, prompt: str) -> str:
         """Generate text using OpenAI's GPT model"""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Cost-effective model
-                messages=[
-                    {"role": "system", "content": "You are an expert video analyst. Return only valid JSON as requested."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            return response.choices[0].message.content.strip()
-        except openai.RateLimitError as e:
-            print(f"⚠️ OpenAI rate limit exceeded: {e}")
-            # For paid accounts, just wait a short time and retry once
-            time.sleep(5)
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert video analyst. Return only valid JSON as requested."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            return response.choices[0].message.content.strip()
+            response = self._retry.call(self.client.chat.completions.create, **self._chat_kwargs(prompt))
+            return self._chat_text(response, prompt)
         except Exception as e:
             print(f"❌ OpenAI generation error: {e}")
-            # Fallback for other errors
-            return '{"is_highlight": true, "description": "Video segment with detected activity", "summary": "Notable moment", "confidence": 0.5}'
+            # Fallback once retries are exhausted or for non-retryable errors
+            return FallbackText(FALLBACK_JSON)
+
+    async def aembed(self, text: str) -> list[float]:
+        """Async embed; at most LLM_MAX_CONCURRENCY requests in flight"""
+        async with self._limit():
+            response = await self._retry.acall(self.aclient.embeddings.create, **self._embed_kwargs(text))
+            self._record_usage(response, text)
+            return response.data[0].embedding
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """Async embed_many; chunks are sent concurrently within the provider cap"""
+        async def one(chunk: list[str]) -> list[list[float]]:
+            async with self._limit():
+                response = await self._retry.acall(self.aclient.embeddings.create, **self._embed_kwargs(chunk))
+                self._record_usage(response, chunk)
+                return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+        chunks = [texts[i:i + self.embed_batch_size] for i in range(0, len(texts), self.embed_batch_size)]
+        results = await asyncio.gather(*(one(c) for c in chunks))
+        return [emb for part in results for emb in part]
+
+    async def agenerate(self, prompt: str) -> str:
+        """Async generate; at most LLM_MAX_CONCURRENCY requests in flight"""
+        async with self._limit():
+            try:
+                response = await self._retry.acall(self.aclient.chat.completions.create, **self._chat_kwargs(prompt))
+                return self._chat_text(response, prompt)
+            except Exception as e:
+                print(f"❌ OpenAI generation error: {e}")
+                return FallbackText(FALLBACK_JSON)
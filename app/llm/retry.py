@@ -0,0 +1,226 @@
+"""
+Shared retry/backoff engine for the LLM provider clients.
+
+Every provider gets one Retrier (see get_retrier) which
+- retries rate-limit and transient errors with exponential backoff + full jitter,
+- honors Retry-After style hints from the provider,
+- paces requests through an AIMD rate limiter: the allowed request rate grows
+  additively while calls succeed and is halved when the provider throttles us,
+- keeps per-provider counters (retry_stats()).
+"""
+import asyncio
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+from app.config import Config
+
+
+@dataclass
+class RetryStats:
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    backoff_sec: float = 0.0
+
+
+class AdaptiveRateLimiter:
+    """
+    AIMD pacing: requests are spaced 1/rate seconds apart. Each success adds
+    ``increase / rate`` to the rate (≈ +increase req/s per second of traffic);
+    a throttle halves it, at most once per ``cooldown`` seconds so a burst of
+    429s from concurrent requests counts as one signal.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._clock = clock
+        self._next_slot = 0.0
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next send slot; returns how long the caller must wait for it."""
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+            return slot - now
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            now = self._clock()
+            if now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            if retry_after:
+                # The provider told us when to come back: hold every caller until then
+                self._next_slot = max(self._next_slot, now + retry_after)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Best-effort extraction of a server-provided retry delay from an SDK exception."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        pass
+    # google.api_core errors carry a RetryInfo detail with retry_delay
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return float(getattr(delay, "seconds", 0)) + getattr(delay, "nanos", 0) / 1e9
+    return None
+
+
+class Retrier:
+    def __init__(
+        self,
+        provider: str,
+        rate_limited: tuple = (),
+        transient: tuple = (),
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        sleep: Callable[[float], Any] = time.sleep,
+    ):
+        self.provider = provider
+        self.rate_limited = rate_limited
+        self.transient = transient
+        self.max_attempts = max_attempts or Config.llm_retry_max_attempts
+        self.base_delay = Config.llm_retry_base_delay if base_delay is None else base_delay
+        self.max_delay = Config.llm_retry_max_delay if max_delay is None else max_delay
+        self.limiter = limiter or AdaptiveRateLimiter(
+            rate=Config.llm_initial_rps, min_rate=Config.llm_min_rps, max_rate=Config.llm_max_rps
+        )
+        self.stats = RetryStats()
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+
+    def _backoff(self, attempt: int, exc: BaseException) -> Optional[float]:
+        """Delay before the next attempt, or None if ``exc`` should not be retried."""
+        if isinstance(exc, self.rate_limited):
+            hint = retry_after_seconds(exc)
+            self.limiter.on_throttle(hint)
+            self._count(rate_limited=1)
+        elif isinstance(exc, self.transient):
+            hint = None
+        else:
+            return None
+        if attempt >= self.max_attempts:
+            return None
+        # Full jitter keeps concurrent retries from stampeding together
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if hint is not None:
+            delay = max(delay, min(hint, self.max_delay))
+        return delay
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run ``fn`` with pacing and retries; re-raises the last error when giving up."""
+        self._count(calls=1)
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self.limiter.reserve()
+            if wait > 0:
+                self._sleep(wait)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    self._count(failures=1)
+                    raise
+                print(f"⏳ {self.provider}: {type(e).__name__}, retrying in {delay:.1f}s "
+                      f"(attempt {attempt}/{self.max_attempts})")
+                self._count(retries=1, backoff_sec=delay)
+                self._sleep(delay)
+                continue
+            self.limiter.on_success()
+            self._count(successes=1)
+            return result
+
+    async def acall(self, fn: Callable, *args, **kwargs):
+        """Async twin of call(); ``fn`` returns an awaitable."""
+        self._count(calls=1)
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self.limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    self._count(failures=1)
+                    raise
+                print(f"⏳ {self.provider}: {type(e).__name__}, retrying in {delay:.1f}s "
+                      f"(attempt {attempt}/{self.max_attempts})")
+                self._count(retries=1, backoff_sec=delay)
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.on_success()
+            self._count(successes=1)
+            return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = asdict(self.stats)
+        out["rate_rps"] = round(self.limiter.rate, 3)
+        return out
+
+
+_RETRIERS: dict[str, Retrier] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_retrier(provider: str, rate_limited: tuple = (), transient: tuple = ()) -> Retrier:
+    """Process-wide Retrier per provider, so pacing and stats are shared by all client instances."""
+    with _REGISTRY_LOCK:
+        if provider not in _RETRIERS:
+            _RETRIERS[provider] = Retrier(provider, rate_limited=rate_limited, transient=transient)
+        return _RETRIERS[provider]
+
+
+def retry_stats() -> dict[str, dict]:
+    with _REGISTRY_LOCK:
+        return {name: r.snapshot() for name, r in _RETRIERS.items()}
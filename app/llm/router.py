@@ -0,0 +1,223 @@
+"""
+Health-aware routing of generate() traffic over several LLM providers.
+
+ProviderRouter looks like a single provider client to UnifiedLLMClient.
+Generate calls are spread over every configured provider by weight and
+observed latency; a provider that keeps failing is taken out of rotation by
+a circuit breaker and probed again after a cool-down. Embeddings always go to
+one pinned provider so stored vectors stay in a single embedding space.
+"""
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from app.config import Config
+from app.llm.llm_client import FallbackText, LLMClientProtocol
+
+
+class CircuitBreaker:
+    """closed → (N consecutive failures) → open → (cool-down) → half_open → one probe → closed/open"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True  # let exactly one request test the provider
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class _ProviderState:
+    def __init__(self, client: LLMClientProtocol, weight: float, breaker: CircuitBreaker):
+        self.client = client
+        self.name = getattr(client, "provider", type(client).__name__)
+        self.weight = weight
+        self.breaker = breaker
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+
+    def observe(self, seconds: float) -> None:
+        self.latency_ewma = seconds if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * seconds
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    """'gemini=2,openai=1' → {'gemini': 2.0, 'openai': 1.0}"""
+    weights: dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            weights[name.strip().lower()] = float(value)
+    return weights
+
+
+class ProviderRouter:
+    provider = "router"
+    gen_params: dict = {}
+
+    def __init__(
+        self,
+        clients: list[LLMClientProtocol],
+        embed_client: LLMClientProtocol,
+        weights: Optional[dict[str, float]] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not clients:
+            raise ValueError("ProviderRouter needs at least one client")
+        weights = weights or {}
+        self._states = [
+            _ProviderState(
+                c,
+                weights.get(getattr(c, "provider", ""), 1.0),
+                CircuitBreaker(
+                    failure_threshold or Config.llm_breaker_failures,
+                    Config.llm_breaker_reset_sec if reset_timeout is None else reset_timeout,
+                    clock,
+                ),
+            )
+            for c in clients
+        ]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.embed_client = embed_client
+        # Cache identity: generation may be served by any provider, embeddings by one
+        self.gen_model = "+".join(f"{s.name}:{getattr(s.client, 'gen_model', '')}" for s in self._states)
+        self.embed_provider = getattr(embed_client, "provider", "")
+        self.embed_model = getattr(embed_client, "embed_model", "")
+
+    @property
+    def providers(self) -> list[str]:
+        return [s.name for s in self._states]
+
+    def _candidates(self) -> list[_ProviderState]:
+        """Healthy providers in try-order: weighted random by weight / observed latency."""
+        allowed = [s for s in self._states if s.breaker.allow()]
+        if not allowed:
+            # Everything is tripped: better to try anyway than to fail outright
+            allowed = list(self._states)
+        known = [s.latency_ewma for s in allowed if s.latency_ewma]
+        default_latency = sum(known) / len(known) if known else 1.0
+        # A half-open provider was granted its single probe by allow(), so it must go first
+        order = [s for s in allowed if s.breaker.state == "half_open"]
+        scored = [
+            (s, s.weight / max(s.latency_ewma or default_latency, 1e-3)) for s in allowed if s not in order
+        ]
+        while scored:
+            total = sum(score for _, score in scored)
+            pick = random.uniform(0, total)
+            for i, (s, score) in enumerate(scored):
+                pick -= score
+                if pick <= 0 or i == len(scored) - 1:
+                    order.append(s)
+                    scored.pop(i)
+                    break
+        return order
+
+    def _record(self, state: _ProviderState, ok: bool, started: float) -> None:
+        with self._lock:
+            if ok:
+                state.successes += 1
+                state.observe(self._clock() - started)
+            else:
+                state.failures += 1
+        if ok:
+            state.breaker.record_success()
+        else:
+            state.breaker.record_failure()
+
+    def generate(self, prompt: str) -> str:
+        last: Optional[str] = None
+        for state in self._candidates():
+            started = self._clock()
+            try:
+                out = state.client.generate(prompt)
+            except Exception as e:
+                print(f"⚠️ {state.name} generation failed, trying next provider: {e}")
+                self._record(state, False, started)
+                continue
+            if isinstance(out, FallbackText):
+                self._record(state, False, started)
+                last = out
+                continue
+            self._record(state, True, started)
+            return out
+        if last is not None:
+            return last
+        raise RuntimeError("All LLM providers failed")
+
+    async def agenerate(self, prompt: str) -> str:
+        last: Optional[str] = None
+        for state in self._candidates():
+            started = self._clock()
+            try:
+                out = await state.client.agenerate(prompt)
+            except Exception as e:
+                print(f"⚠️ {state.name} generation failed, trying next provider: {e}")
+                self._record(state, False, started)
+                continue
+            if isinstance(out, FallbackText):
+                self._record(state, False, started)
+                last = out
+                continue
+            self._record(state, True, started)
+            return out
+        if last is not None:
+            return last
+        raise RuntimeError("All LLM providers failed")
+
+    # Embeddings are pinned: mixing providers would make vectors incomparable
+    def embed(self, text: str) -> list[float]:
+        return self.embed_client.embed(text)
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_client.embed_many(texts)
+
+    async def aembed(self, text: str) -> list[float]:
+        return await self.embed_client.aembed(text)
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        return await self.embed_client.aembed_many(texts)
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                s.name: {
+                    "state": s.breaker.state,
+                    "weight": s.weight,
+                    "latency_ewma_sec": s.latency_ewma,
+                    "successes": s.successes,
+                    "failures": s.failures,
+                }
+                for s in self._states
+            }
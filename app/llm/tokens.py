@@ -0,0 +1,143 @@
+"""
+Token accounting and prompt budgeting.
+
+- estimate_tokens: fast local estimate, no tokenizer download needed
+- PromptBudget: caps the per-scene object list and transcript excerpt
+- record_usage / track_usage: provider-reported prompt/completion tokens,
+  totalled per process and per tracked scope (e.g. one video)
+"""
+import contextvars
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, Optional
+
+from app.config import Config
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count: one token per short word or punctuation
+    mark, plus one per extra ~4 characters of longer words.
+    """
+    if not text:
+        return 0
+    return sum(1 + (len(p) - 1) // 4 for p in _PIECE_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` at a word boundary so it estimates to at most ``max_tokens``."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    end = 0
+    for m in _PIECE_RE.finditer(text):
+        used += 1 + (len(m.group()) - 1) // 4
+        if used > max_tokens:
+            break
+        end = m.end()
+    return text[:end]
+
+
+class PromptBudget:
+    """
+    Keeps the scene-specific part of a prompt under ``max_tokens``.
+    Objects (highest confidence first) may use up to a quarter of the budget;
+    the transcript excerpt gets the rest.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_objects: Optional[int] = None):
+        self.max_tokens = max_tokens or Config.llm_prompt_token_budget
+        self.max_objects = max_objects or Config.llm_max_objects
+
+    def objects_text(self, objects) -> str:
+        if not objects:
+            return "none"
+        allowance = max(self.max_tokens // 4, 1)
+        parts, used = [], 0
+        for o in sorted(objects, key=lambda o: o.confidence, reverse=True)[: self.max_objects]:
+            part = f"{o.name}({o.confidence:.2f})"
+            cost = estimate_tokens(part) + 1
+            if parts and used + cost > allowance:
+                break
+            parts.append(part)
+            used += cost
+        return ", ".join(parts)
+
+    def fit(self, objects, transcript: str) -> tuple[str, str]:
+        """Return (objects_text, transcript_excerpt) within the budget."""
+        obj_txt = self.objects_text(objects)
+        remaining = self.max_tokens - estimate_tokens(obj_txt)
+        return obj_txt, truncate_to_tokens(transcript or "", remaining)
+
+
+@dataclass
+class Usage:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated_calls: int = 0  # calls whose counts came from estimate_tokens
+    by_provider: dict = field(default_factory=dict)
+
+    def add(self, provider: str, prompt_tokens: int, completion_tokens: int, estimated: bool) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.estimated_calls += int(estimated)
+        p = self.by_provider.setdefault(provider, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        p["calls"] += 1
+        p["prompt_tokens"] += prompt_tokens
+        p["completion_tokens"] += completion_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def as_dict(self) -> dict:
+        out = asdict(self)
+        out["total_tokens"] = self.total_tokens
+        return out
+
+
+_TOTAL = Usage()
+_LOCK = threading.Lock()
+_SCOPE: contextvars.ContextVar[Optional[Usage]] = contextvars.ContextVar("llm_usage_scope", default=None)
+
+
+def record_usage(provider: str, prompt_tokens: Optional[int], completion_tokens: Optional[int],
+                 prompt_text: str = "", completion_text: str = "") -> None:
+    """
+    Record one provider call. Counts reported by the provider are used when
+    present; otherwise they are estimated from the given texts.
+    """
+    estimated = prompt_tokens is None or completion_tokens is None
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt_text)
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(completion_text)
+    scope = _SCOPE.get()
+    with _LOCK:
+        _TOTAL.add(provider, prompt_tokens, completion_tokens, estimated)
+        if scope is not None:
+            scope.add(provider, prompt_tokens, completion_tokens, estimated)
+
+
+@contextmanager
+def track_usage() -> Iterator[Usage]:
+    """Collect the usage of every call made inside the block (incl. asyncio tasks it starts)."""
+    usage = Usage()
+    token = _SCOPE.set(usage)
+    try:
+        yield usage
+    finally:
+        _SCOPE.reset(token)
+
+
+def total_usage() -> dict:
+    with _LOCK:
+        return _TOTAL.as_dict()
@@ -1,8 +1,8 @@
-from typing import List
+from typing import Callable, List, Optional
 from tqdm import tqdm
 
 from app.config import Config
-from app.db.repository import Repository
+from app.db.backend import open_repository
 from app.processors.video_downloader import VideoDownloader
 from app.processors.audio_transcriber import AudioTranscriber
 from app.processors.scene_detector import SceneDetector
@@ -10,12 +10,13 @@ from app.processors.frame_sampler import FrameSampler
 from app.processors.object_detector import ObjectDetector
 from app.llm.llm_client import UnifiedLLMClient
 from app.llm.highlight_selector import HighlightSelector
+from app.llm.tokens import Usage, track_usage
 from app.types import HighlightModel, VideoRecord
 
 
 class VideoProcessor:
     def __init__(self):
-        self.repo = Repository()
+        self.repo = open_repository()
         self.repo.create_schema()
 
         # processors (DI-friendly)
@@ -26,8 +27,16 @@ class VideoProcessor:
         self.objects = ObjectDetector(Config.yolo_model)
         self.llm_client = UnifiedLLMClient()
         self.selector = HighlightSelector(self.llm_client)
+        self.last_usage = Usage()  # LLM usage of the most recent process() call
 
-    def process(self, source: str) -> tuple[VideoRecord, List[HighlightModel]]:
+    def process(
+        self, source: str, replace: bool = False, may_write: Optional[Callable[[], bool]] = None
+    ) -> tuple[VideoRecord, List[HighlightModel]]:
+        """
+        Analyze `source` and store its highlights; replace=True swaps out the
+        video's earlier highlights. may_write is asked right before storing:
+        if it returns False nothing is stored and no highlights are returned.
+        """
         # 1) get video (path, uid) - source should be a local file path
         vpath, uid = self.downloader.fetch(source)
 
@@ -42,24 +51,30 @@ class VideoProcessor:
         if not segs:
             segs = [(0, int(duration) if duration else 60)]
 
-        # 5) per-scene: frames → objects → LLM
-        highlights: List[HighlightModel] = []
-        for i, (start, end) in enumerate(tqdm(segs, desc="Analyzing scenes")):
+        # 5) per-scene: frames → objects, then LLM over batches of scenes
+        scene_inputs = []
+        for start, end in tqdm(segs, desc="Analyzing scenes"):
             frames = self.sampler.sample(vpath, start, end)
             objs = self.objects.detect_in_frames(frames)
-            hl = self.selector.analyze_segment((start, end), transcript, objs)
-            if hl and hl.description:
-                # 6) embed description
-                emb = self.selector.embed_desc(hl.description)
+            scene_inputs.append(((start, end), transcript, objs))
+
+        # Every provider call below is counted against this video
+        with track_usage() as usage:
+            highlights: List[HighlightModel] = [
+                hl for hl in self.selector.analyze_segments(scene_inputs) if hl and hl.description
+            ]
+
+            # 6) embed all descriptions in a few batched calls
+            embeddings = self.selector.embed_descs([hl.description for hl in highlights])
+            for hl, emb in zip(highlights, embeddings):
                 hl.embedding = emb
-                highlights.append(hl)
-                
-                # Light rate limiting: small delay between API calls
-                if i < len(segs) - 1:  # Don't wait after the last scene
-                    import time
-                    time.sleep(1)  # Short delay to be respectful to API
 
-        if highlights:
-            self.repo.add_highlights(video.id, highlights)
+        self.last_usage = usage
+        if usage.calls:
+            self.repo.record_usage(video.id, usage)
+
+        if may_write is not None and not may_write():
+            return video, []
+        self.repo.add_highlights(video.id, highlights, replace=replace)
 
         return video, highlights
@@ -39,6 +39,7 @@ class ObjectDetector(ObjectDetectorI):
         if self._use_yolo and self._model is not None:
             try:
                 names_conf: Dict[str, float] = {}
+                names_count: Dict[str, int] = {}
                 results = self._model.predict(frames, conf=self.conf, verbose=False)
                 
                 for r in results:
@@ -47,12 +48,14 @@ class ObjectDetector(ObjectDetectorI):
                             cls_id = int(b.cls.item())
                             name = r.names[cls_id]
                             conf = float(b.conf.item())
+                            names_count[name] = names_count.get(name, 0) + 1
                             
                             # Keep highest confidence for each object type
                             if name not in names_conf or conf > names_conf[name]:
                                 names_conf[name] = conf
                 
-                detected_objects = [DetectedObjectModel(name=k, confidence=v) for k, v in names_conf.items()]
+                detected_objects = [DetectedObjectModel(name=k, confidence=v, count=names_count[k])
+                                    for k, v in names_conf.items()]
                 
                 if detected_objects:
                     print(f"🔍 Objects detected: {[f'{obj.name}({obj.confidence:.2f})' for obj in detected_objects]}")
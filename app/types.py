@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 
@@ -5,6 +6,7 @@ from pydantic import BaseModel, Field, field_validator
 class DetectedObjectModel(BaseModel):
     name: str = Field(min_length=1)
     confidence: float = Field(ge=0.0, le=1.0)
+    count: int = Field(default=1, ge=1)  # detections merged into this entry
 
 
 class HighlightModel(BaseModel):
@@ -30,3 +32,41 @@ class VideoRecord(BaseModel):
     source: str
     video_uid: Optional[str] = None
     duration_sec: Optional[int] = Field(default=None, ge=0)
+
+
+class JobRecord(BaseModel):
+    """An ingestion job (app/db/jobs.py): queued → running → succeeded | failed, back to queued between retries."""
+    id: int
+    source: str
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    worker: Optional[str] = None
+    lease_until: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    video_id: Optional[int] = None
+    highlights: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class SearchScope(BaseModel):
+    """Restricts a search to highlights of some videos, overlapping [ts_from, ts_to], with a minimum confidence."""
+    video_ids: Optional[List[int]] = Field(default=None, min_length=1)
+    ts_from: Optional[int] = Field(default=None, ge=0)
+    ts_to: Optional[int] = Field(default=None, ge=0)
+    min_confidence: Optional[float] = Field(default=None, ge=0.0, le=1.0)  # highlights without one are excluded
+
+    @field_validator("ts_to")
+    @classmethod
+    def _range_order(cls, v: Optional[int], info):
+        start = info.data.get("ts_from")
+        if v is not None and start is not None and v < start:
+            raise ValueError("ts_to must be >= ts_from")
+        return v
+
+    def is_empty(self) -> bool:
+        return self.video_ids is None and self.ts_from is None and self.ts_to is None and self.min_confidence is None
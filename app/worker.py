@@ -0,0 +1,156 @@
+"""
+Ingestion worker: takes jobs from the Postgres queue (app/db/jobs.py) and
+runs VideoProcessor on each.
+
+    python -m app.worker                 # one worker, until SIGTERM / Ctrl-C
+    python -m app.worker --processes 4   # four, one process each
+    python -m app.worker --drain         # exit once no job is due
+
+Workers share nothing but the jobs table, so they can run on any number of
+machines. Processing is CPU-bound (Whisper, YOLO), hence one process per
+worker. On SIGTERM a worker finishes its current job, then exits.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from typing import Callable, Optional
+
+from app.config import Config
+from app.db.jobs import JobQueue
+from app.types import JobRecord
+
+
+def _video_processor():
+    from app.main import VideoProcessor  # Whisper, YOLO and the LLM SDKs load on the first job
+
+    return VideoProcessor()
+
+
+class _Heartbeat:
+    """Extends a job's lease every `interval` seconds while its block runs."""
+
+    def __init__(self, queue: JobQueue, job: JobRecord, interval: float):
+        self.queue, self.job, self.interval = queue, job, interval
+        self.lost = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.id}", daemon=True)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._done.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._done.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job):
+                    print(f"⚠️ Job {self.job.id}: lease lost, another worker may run it")
+                    self.lost = True
+                    return
+            except Exception as e:  # database briefly unreachable: the lease outlasts a few missed beats
+                print(f"⚠️ Job {self.job.id}: heartbeat failed: {e}")
+
+
+class Worker:
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        processor_factory: Callable = _video_processor,
+        worker_id: Optional[str] = None,
+        heartbeat_sec: Optional[float] = None,
+        poll_sec: Optional[float] = None,
+    ):
+        self.queue = queue or JobQueue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_sec = heartbeat_sec or Config.job_heartbeat_sec
+        self.poll_sec = poll_sec or Config.worker_poll_sec
+        self.stop = threading.Event()
+        self._processor_factory = processor_factory
+        self._processor = None
+
+    @property
+    def processor(self):
+        """Built on the first job: loading the models is slow, an idle worker doesn't need them."""
+        if self._processor is None:
+            self._processor = self._processor_factory()
+        return self._processor
+
+    def run_once(self) -> Optional[JobRecord]:
+        """Claim and process one due job; the job's new state, or None if none was due."""
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return None
+        print(f"🔧 Job {job.id} (attempt {job.attempts}/{job.max_attempts}): {job.source}")
+        with _Heartbeat(self.queue, job, self.heartbeat_sec) as hb:
+            # Checked again right before writing: a worker whose lease was reaped leaves the video to the new owner
+            def still_leased() -> bool:
+                return not hb.lost and self.queue.heartbeat(job)
+
+            try:
+                # replace: a retry after a partial or unrecorded attempt doesn't duplicate highlights
+                video, highlights = self.processor.process(job.source, replace=True, may_write=still_leased)
+            except Exception as e:
+                print(f"⚠️ Job {job.id} failed: {e}")
+                return self.queue.fail(job, f"{type(e).__name__}: {e}")
+        done = self.queue.complete(job, video.id, len(highlights))
+        if done is None:
+            print(f"⚠️ Job {job.id}: finished after losing its lease, status left to its new owner")
+        else:
+            print(f"✅ Job {job.id}: {len(highlights)} highlights for video_id={video.id}")
+        return done
+
+    def run(self, drain: bool = False) -> None:
+        """Process jobs until stop is set (or, with drain, until none is due)."""
+        while not self.stop.is_set():
+            try:
+                job = self.run_once()
+            except Exception as e:  # database unreachable: keep polling
+                print(f"⚠️ Worker {self.worker_id}: {e}")
+                job = None
+            if job is None:
+                if drain:
+                    return
+                self.stop.wait(self.poll_sec)
+
+
+def _run_worker(drain: bool) -> None:
+    worker = Worker()
+    worker.queue.create_schema()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: worker.stop.set())
+    print(f"🔧 Worker {worker.worker_id} started")
+    try:
+        worker.run(drain=drain)
+    finally:
+        worker.queue.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Process queued videos (POST /videos).")
+    ap.add_argument("--processes", type=int, default=1, help="Workers to run, one process each.")
+    ap.add_argument("--drain", action="store_true", help="Exit once no job is due instead of polling.")
+    args = ap.parse_args()
+
+    if args.processes <= 1:
+        _run_worker(args.drain)
+        return
+    # spawn: each worker builds its own engine and models, nothing is inherited mid-state
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_run_worker, args=(args.drain,)) for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    # Forward SIGTERM; Ctrl-C already reaches the whole process group
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in procs if p.is_alive()])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
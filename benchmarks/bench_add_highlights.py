@@ -0,0 +1,89 @@
+"""
+Benchmark Repository.add_highlights against the old one-row-per-flush ORM path.
+
+    python -m benchmarks.bench_add_highlights --sizes 10,1000,100000
+
+Writes into a scratch video (deleted afterwards) in the database from
+--db-url / BENCH_DB_URL, or the app's configured database.
+"""
+import argparse
+import os
+import random
+import time
+
+from sqlalchemy import delete
+
+from app.config import Config
+from app.db.models import Highlight, Video
+from app.db.repository import Repository
+from app.types import DetectedObjectModel, HighlightModel
+
+
+def make_highlights(n: int, dim: int = 768) -> list[HighlightModel]:
+    rnd = random.Random(n)
+    objs = [DetectedObjectModel(name=name, confidence=0.8) for name in ("person", "car")]
+    return [
+        HighlightModel(
+            ts_start_sec=i,
+            ts_end_sec=i + 5,
+            description=f"Benchmark highlight {i}: a person walks past a parked car.",
+            llm_summary="Person walks past a car.",
+            confidence=0.75,
+            objects=objs,
+            embedding=[rnd.random() for _ in range(dim)],
+        )
+        for i in range(n)
+    ]
+
+
+def add_highlights_per_row(repo: Repository, video_id: int, highlights: list[HighlightModel]) -> list[int]:
+    """The previous implementation: one ORM object + flush (a round trip) per highlight."""
+    ids = []
+    with repo.Session() as s:
+        for h in highlights:
+            row = Highlight(**Repository._highlight_row(video_id, h))
+            s.add(row)
+            s.flush()
+            ids.append(row.id)
+        s.commit()
+    return ids
+
+
+def timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--sizes", default="10,1000,100000")
+    ap.add_argument("--legacy-max", type=int, default=100_000, help="skip the per-row path above this size")
+    args = ap.parse_args()
+
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    video = repo.upsert_video("benchmark", "BENCH-ADD-HIGHLIGHTS", None)
+    print(f"{'rows':>8} {'per-row':>10} {'INSERT':>10} {'COPY':>10}   rows/s (best)")
+    try:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            highlights = make_highlights(n)
+            legacy = timed(add_highlights_per_row, repo, video.id, highlights) if n <= args.legacy_max else None
+
+            Config.db_copy_threshold = n + 1  # force multi-row INSERT
+            insert_t = timed(repo.add_highlights, video.id, highlights)
+            Config.db_copy_threshold = 1  # force COPY
+            copy_t = timed(repo.add_highlights, video.id, highlights)
+
+            best = min(insert_t, copy_t)
+            print(f"{n:>8} {legacy if legacy is not None else float('nan'):>9.3f}s "
+                  f"{insert_t:>9.3f}s {copy_t:>9.3f}s   {n / best:,.0f}")
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id == video.id))
+            s.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Many questions: one /chat/query each vs one /chat/batch.
+
+    python -m benchmarks.bench_chat_batch --questions 256 --embed-ms 100
+
+Runs ChatService.aanswer per question (--concurrency in flight) and
+ChatService.abatch over all of them, on the highlights already in --db-url /
+BENCH_DB_URL. The embedder sleeps --embed-ms per provider call, single or
+batched, and returns random vectors. Caches are off so every question is
+embedded and searched.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from api.service import ChatService
+from app.db.async_repository import AsyncRepository
+from app.db.repository import Repository
+
+WORDS = ["person", "dog", "car", "red", "night", "crowd", "cheering", "door", "walks", "speaks", "indoors", "park"]
+
+
+class SleepyEmbedder:
+    def __init__(self, delay_sec: float, dim: int = 768):
+        self.rng = np.random.default_rng(0)
+        self.delay_sec = delay_sec
+        self.dim = dim
+        self.calls = 0
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.delay_sec)
+        v = self.rng.standard_normal((len(texts), self.dim))
+        return (v / np.linalg.norm(v, axis=1, keepdims=True)).tolist()
+
+    async def aembed(self, text: str) -> list[float]:
+        return (await self.aembed_many([text]))[0]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--questions", type=int, default=256)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--embed-ms", type=float, default=100.0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1)
+    questions = [" ".join(rng.choice(WORDS, 4)) + f" #{i}" for i in range(args.questions)]
+    service = ChatService(top_k=6)
+    service.repo = Repository(args.db_url)
+    service.embedding_cache = service.result_cache = None
+
+    async def run():
+        service.arepo = AsyncRepository(service.repo.engine.url)
+        try:
+            service.embedder = SleepyEmbedder(args.embed_ms / 1000)
+            await service.aanswer(questions[0])  # warm the pool
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def one(q):
+                async with gate:
+                    return await service.aanswer(q)
+
+            service.embedder = SleepyEmbedder(args.embed_ms / 1000)
+            t0 = time.perf_counter()
+            single = await asyncio.gather(*(one(q) for q in questions))
+            wall = time.perf_counter() - t0
+            print(f"/chat/query x{args.questions}, {args.concurrency} in flight: {wall * 1000:8.1f} ms   "
+                  f"{args.questions / wall:7.1f} questions/s   {service.embedder.calls} embed calls")
+
+            service.embedder = SleepyEmbedder(args.embed_ms / 1000)
+            t0 = time.perf_counter()
+            batched = await service.abatch(questions)
+            wall = time.perf_counter() - t0
+            print(f"/chat/batch of {args.questions}:{' ' * 16}{wall * 1000:8.1f} ms   "
+                  f"{args.questions / wall:7.1f} questions/s   {service.embedder.calls} embed call")
+            assert len(batched) == len(single)
+        finally:
+            await service.arepo.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
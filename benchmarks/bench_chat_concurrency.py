@@ -0,0 +1,85 @@
+"""
+Chat query throughput: sync path in a thread pool vs the asyncpg path.
+
+    python -m benchmarks.bench_chat_concurrency --queries 400 --concurrency 200
+
+Each chat query is an embedding call (simulated provider round trip of
+--embed-ms) followed by hybrid_search. The sync path runs them in a
+--threads pool, the size of FastAPI's default pool for sync endpoints; the
+async path awaits them on one event loop, with AsyncRepository's pool.
+Searches run against the highlights already in --db-url / BENCH_DB_URL.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.config import Config
+from app.db.async_repository import AsyncRepository
+from app.db.repository import Repository
+
+QUESTIONS = ["a person walking a dog", "red car at night", "crowd cheering", "someone speaking indoors"]
+
+
+def report(label: str, lat: list[float], wall: float) -> None:
+    lat.sort()
+    print(f"{label:<34} {len(lat) / wall:7.1f} queries/s   "
+          f"p50 {statistics.median(lat):7.1f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:7.1f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--queries", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--threads", type=int, default=40)
+    ap.add_argument("--embed-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    embs = [(v / np.linalg.norm(v)).tolist() for v in rng.standard_normal((len(QUESTIONS), 768))]
+    jobs = [(QUESTIONS[i % len(QUESTIONS)], embs[i % len(embs)]) for i in range(args.queries)]
+
+    repo = Repository(args.db_url)
+
+    def sync_query(job):
+        t0 = time.perf_counter()
+        time.sleep(args.embed_ms / 1000)
+        repo.hybrid_search(job[0], job[1], top_k=6)
+        return (time.perf_counter() - t0) * 1000
+
+    repo.hybrid_search(*jobs[0])  # warm the pool and index info
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        lat = list(pool.map(sync_query, jobs))
+    report(f"sync, {args.threads} threads", lat, time.perf_counter() - t0)
+
+    async def run_async():
+        arepo = AsyncRepository(repo.engine.url)
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def query(job):
+            async with gate:
+                t0 = time.perf_counter()
+                await asyncio.sleep(args.embed_ms / 1000)
+                await arepo.hybrid_search(job[0], job[1], top_k=6)
+                return (time.perf_counter() - t0) * 1000
+
+        try:
+            await arepo.hybrid_search(*jobs[0])
+            t0 = time.perf_counter()
+            lat = await asyncio.gather(*(query(j) for j in jobs))
+            report(f"async, {args.concurrency} in flight, pool "
+                   f"{Config.db_async_pool_size}+{Config.db_async_max_overflow}", list(lat), time.perf_counter() - t0)
+        finally:
+            await arepo.close()
+
+    asyncio.run(run_async())
+
+
+if __name__ == "__main__":
+    main()
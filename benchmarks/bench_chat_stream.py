@@ -0,0 +1,85 @@
+"""
+Time to first result: /chat/query (whole answer) vs /chat/stream (first event).
+
+    python -m benchmarks.bench_chat_stream --queries 50 --embed-ms 300
+
+Runs ChatService.aanswer and ChatService.astream on the highlights already
+in --db-url / BENCH_DB_URL, with an embedder that sleeps --embed-ms (the
+provider round trip) and returns a fixed random vector. Result caching is
+off so every query searches. Reports p50 / p95 of the time to the first
+matches and to the answer.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import numpy as np
+
+from api.service import ChatService
+from app.db.async_repository import AsyncRepository
+from app.db.repository import Repository
+
+QUESTIONS = ["a person walking a dog", "red car at night", "crowd cheering", "someone speaking indoors"]
+
+
+class SleepyEmbedder:
+    def __init__(self, delay_sec: float, dim: int = 768):
+        v = np.random.default_rng(0).standard_normal(dim)
+        self.vector = (v / np.linalg.norm(v)).tolist()
+        self.delay_sec = delay_sec
+
+    async def aembed(self, text: str) -> list[float]:
+        await asyncio.sleep(self.delay_sec)
+        return self.vector
+
+
+def report(label: str, lat: list[float]) -> None:
+    lat.sort()
+    print(f"{label:<34} p50 {statistics.median(lat):7.1f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:7.1f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--embed-ms", type=float, default=300.0)
+    args = ap.parse_args()
+
+    service = ChatService(top_k=6)
+    service.repo = Repository(args.db_url)
+    service.embedder = SleepyEmbedder(args.embed_ms / 1000)
+    service.embedding_cache = service.result_cache = None
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.queries)]
+
+    async def run():
+        service.arepo = AsyncRepository(service.repo.engine.url)
+        try:
+            await service.aanswer(questions[0])  # warm the pool
+            query = []
+            for q in questions:
+                t0 = time.perf_counter()
+                await service.aanswer(q)
+                query.append((time.perf_counter() - t0) * 1000)
+            first, answer = [], []
+            for q in questions:
+                t0, seen = time.perf_counter(), 0
+                async for stage, _ in service.astream(q):
+                    ms = (time.perf_counter() - t0) * 1000
+                    if not seen:
+                        first.append(ms)
+                    seen += 1
+                answer.append(ms)
+        finally:
+            await service.arepo.close()
+        report("/chat/query: answer", query)
+        report("/chat/stream: first matches", first)
+        report("/chat/stream: answer", answer)
+
+    print(f"{args.queries} queries, embedding {args.embed_ms:.0f} ms")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark ingestion throughput against the number of worker processes.
+
+    python -m benchmarks.bench_job_queue --jobs 400 --workers 1,2,4,8 --work-ms 50
+
+Each worker is a separate process running app.worker.Worker on the shared
+jobs table, with a stand-in processor that sleeps --work-ms per video (the
+real one is dominated by Whisper / YOLO time on its own core). --work-ms 0
+measures the queue alone: claim + complete round trips.
+
+Claims take any due job, so run it on a database whose queue is idle:
+--db-url / BENCH_DB_URL, or the app's configured database. It refuses to
+start while other jobs are queued or running, and deletes its own jobs.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from app.config import Config
+from app.db.jobs import JobQueue
+from app.worker import Worker
+
+PREFIX = "bench-job-queue/"
+
+
+class SleepProcessor:
+    def __init__(self, work_sec: float):
+        self.work_sec = work_sec
+
+    def process(self, source: str, replace: bool = False, may_write=None):
+        time.sleep(self.work_sec)
+        return SimpleNamespace(id=None), []
+
+
+def run_worker(url: str, work_sec: float, ready, start) -> None:
+    queue = JobQueue(url)
+    worker = Worker(queue, processor_factory=lambda: SleepProcessor(work_sec))
+    queue.get(0)  # connected
+    ready.release()
+    start.wait()
+    worker.run(drain=True)
+    queue.close()
+
+
+def run(url: str, jobs: int, workers: int, work_sec: float) -> float:
+    """Jobs per second with `workers` processes draining `jobs` queued jobs."""
+    queue = JobQueue(url)
+    for i in range(jobs):
+        queue.enqueue(f"{PREFIX}{workers}/{i}")
+    ctx = multiprocessing.get_context("spawn")
+    ready, start = ctx.Semaphore(0), ctx.Event()
+    procs = [ctx.Process(target=run_worker, args=(url, work_sec, ready, start)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:  # every process imported and connected before the clock starts
+        ready.acquire()
+    t0 = time.perf_counter()
+    start.set()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    with queue.engine.connect() as conn:
+        done = conn.execute(
+            text("SELECT count(*) FROM jobs WHERE source LIKE :p AND status = 'succeeded'"), {"p": f"{PREFIX}%"}
+        ).scalar()
+    with queue.engine.begin() as conn:
+        conn.execute(text("DELETE FROM jobs WHERE source LIKE :p"), {"p": f"{PREFIX}%"})
+    queue.close()
+    assert done == jobs, f"{done}/{jobs} jobs succeeded"
+    return jobs / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--jobs", type=int, default=400)
+    ap.add_argument("--workers", default="1,2,4,8")
+    ap.add_argument("--work-ms", type=float, default=50.0)
+    args = ap.parse_args()
+    url = args.db_url or Config.db_url()
+
+    queue = JobQueue(url)
+    queue.create_schema()
+    pending = queue.counts()
+    queue.close()
+    if pending.get("queued") or pending.get("running"):
+        raise SystemExit(f"The queue is not idle ({pending}): use a scratch database")
+
+    print(f"{args.jobs} jobs, {args.work_ms:g} ms of work each")
+    print(f"{'workers':>8} {'jobs/s':>10} {'speedup':>8}")
+    base = None
+    for w in [int(x) for x in args.workers.split(",")]:
+        rate = run(url, args.jobs, w, args.work_ms / 1000)
+        base = base or rate
+        print(f"{w:>8} {rate:>10.1f} {rate / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Keyword search latency: ranked full-text search vs the old ILIKE scan.
+
+    python -m benchmarks.bench_keyword_search --rows 1000000
+
+Generates --rows synthetic highlights server-side under a scratch video
+(deleted afterwards), then times Repository.keyword_search and the previous
+ILIKE implementation over a set of chat-style questions. The vector index is
+dropped for the load and rebuilt at the end. Use a scratch database
+(--db-url / BENCH_DB_URL).
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+
+from sqlalchemy import delete, text
+
+from app.db.models import Video
+from app.db.repository import Repository
+
+WORDS = (
+    "person people man woman child dog cat car truck bus bicycle motorcycle train boat plane horse bird "
+    "walks runs drives parks crosses jumps falls talks speaks laughs waves points opens closes enters exits "
+    "street road bridge building kitchen office park beach forest field station parking lot stage room "
+    "red blue green black white yellow small large crowded empty quiet loud bright dark rainy sunny night "
+    "explosion fire smoke crash collision siren alarm music speech interview presentation meeting crowd "
+    "slowly quickly suddenly together alone near behind across inside outside toward away during after"
+).split()
+STOP = {'what', 'happened', 'during', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of',
+        'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+        'would', 'could', 'should', 'may', 'might', 'can', 'about', 'show', 'me', 'find', 'scenes'}
+QUESTIONS = [
+    "What happened during the car crash?",
+    "Show me scenes with a dog in the park",
+    "When does the woman speak at the presentation?",
+    "Find the explosion near the bridge",
+    "red truck parking lot at night",
+    "people laughing together in the kitchen",
+]
+
+
+def ilike_search(repo: Repository, query: str, top_k: int = 5) -> list[dict]:
+    """The previous keyword_search: up to three %kw% ILIKE predicates, constant score."""
+    words = re.findall(r"\b\w+\b", query.lower())
+    keywords = [w for w in words if w not in STOP and len(w) > 2] or [query]
+    conditions, params = [], {"k": top_k}
+    for i, kw in enumerate(keywords[:3]):
+        conditions.append(f"(description ILIKE :p{i} OR llm_summary ILIKE :p{i})")
+        params[f"p{i}"] = f"%{kw}%"
+    with repo.Session() as s:
+        res = s.execute(text(
+            f"SELECT id, video_id, ts_start_sec, ts_end_sec, description, llm_summary, objects, 0.5 AS score "
+            f"FROM highlights WHERE {' OR '.join(conditions)} ORDER BY video_id, ts_start_sec LIMIT :k"
+        ), params)
+        return [dict(r._mapping) for r in res]
+
+
+def load(repo: Repository, video_id: int, rows: int, chunk: int = 100_000) -> None:
+    words = "{" + ",".join(WORDS) + "}"
+    for start in range(0, rows, chunk):
+        with repo.engine.begin() as conn:
+            conn.execute(text(
+                """
+                INSERT INTO highlights (video_id, ts_start_sec, ts_end_sec, description, llm_summary,
+                                        embedding, objects, confidence)
+                SELECT :vid, g, g + 5,
+                       -- "+ 0 * i" ties each aggregate to its own subquery level
+                       (SELECT string_agg(w[1 + floor(random() * array_length(w, 1))::int + 0 * i], ' ')
+                        FROM generate_series(1, 10 + g % 7) AS i),
+                       (SELECT string_agg(w[1 + floor(random() * array_length(w, 1))::int + 0 * i], ' ')
+                        FROM generate_series(1, 4 + g % 3) AS i),
+                       array_fill(0.0::real, ARRAY[768])::vector,
+                       w[1 + g % 16], 0.7
+                FROM generate_series(CAST(:lo AS int), CAST(:hi AS int)) AS g, CAST(:words AS text[]) AS w
+                """
+            ), {"vid": video_id, "lo": start, "hi": min(start + chunk, rows) - 1, "words": words})
+        print(f"  loaded {min(start + chunk, rows):,} rows", flush=True)
+    with repo.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE highlights"))
+
+
+def timed(fn, reps: int) -> list[float]:
+    out = []
+    for _ in range(reps):
+        for q in QUESTIONS:
+            t0 = time.perf_counter()
+            fn(q)
+            out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--reps", type=int, default=5)
+    args = ap.parse_args()
+
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    video = repo.upsert_video("benchmark", "BENCH-KEYWORD-SEARCH", None)
+    repo.indexes.drop()  # zero vectors; nothing to index for this benchmark
+    try:
+        t0 = time.perf_counter()
+        load(repo, video.id, args.rows)
+        print(f"loaded {args.rows:,} rows in {time.perf_counter() - t0:.1f}s")
+
+        for name, fn in (("ILIKE (old)", lambda q: ilike_search(repo, q)),
+                         ("full-text + ts_rank_cd", lambda q: repo.keyword_search(q))):
+            fn(QUESTIONS[0])  # warm-up
+            lat = timed(fn, args.reps)
+            print(f"{name:<24} p50 {statistics.median(lat):8.2f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:8.2f} ms")
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id == video.id))
+            s.commit()
+        repo.indexes.rebuild()
+
+
+if __name__ == "__main__":
+    main()
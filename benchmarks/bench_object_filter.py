@@ -0,0 +1,132 @@
+"""
+Object-filtered search: highlight_objects vs string matching on highlights.objects.
+
+    python -m benchmarks.bench_object_filter --rows 1000000
+
+Generates --rows synthetic highlights server-side under a scratch video
+(deleted afterwards), each with two of 40 object labels drawn from a skewed
+distribution, so the first label is on roughly half the rows and the last on
+well under 1%. Times, for a rare and a common object:
+
+- the old approach: objects LIKE '%name%' (every row's string checked);
+- Repository.object_search (best detections first);
+- Repository.vector_search(objects=[...]) without a vector index (exact
+  distances over the matches) and with ivfflat (index scan + filter when the
+  probed lists hold enough matches).
+
+The vector index is dropped for the load and re-planned at the end. Use a
+scratch database (--db-url / BENCH_DB_URL).
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.db.models import Video
+from app.db.repository import Repository
+
+LABELS = 40
+
+
+def load(repo: Repository, video_id: int, rows: int, chunk: int = 50_000) -> None:
+    for start in range(0, rows, chunk):
+        with repo.engine.begin() as conn:
+            conn.execute(text(
+                """
+                INSERT INTO highlights (video_id, ts_start_sec, ts_end_sec, description, embedding, objects)
+                SELECT :vid, g, g + 5, 'bench row ' || g,
+                       -- "+ 0 * g" correlates the subquery, so every row gets its own vector
+                       (SELECT array_agg(random() - 0.5) FROM generate_series(1, 768 + 0 * g))::vector,
+                       'bench_obj_' || a || ',bench_obj_' || CASE WHEN b = a THEN (a + 1) % :labels ELSE b END
+                FROM generate_series(CAST(:lo AS int), CAST(:hi AS int)) AS g,
+                     LATERAL (SELECT floor(:labels * random() ^ 3 + 0 * g)::int AS a,
+                                     floor(:labels * random() ^ 3 + 0 * g)::int AS b) p
+                """
+            ), {"vid": video_id, "lo": start, "hi": min(start + chunk, rows) - 1, "labels": LABELS})
+        print(f"  loaded {min(start + chunk, rows):,} rows", flush=True)
+    with repo.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO object_labels (name) SELECT 'bench_obj_' || i FROM generate_series(0, :n - 1) AS i "
+            "ON CONFLICT (name) DO NOTHING"
+        ), {"n": LABELS})
+        conn.execute(text(
+            """
+            INSERT INTO highlight_objects (highlight_id, object_id, max_conf, count)
+            SELECT h.id, l.id, (0.3 + 0.7 * random())::real, 1
+            FROM highlights h, unnest(string_to_array(h.objects, ',')) AS o
+            JOIN object_labels l ON l.name = o
+            WHERE h.video_id = :vid
+            """
+        ), {"vid": video_id})
+    with repo.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE highlights"))
+        conn.execute(text("VACUUM ANALYZE highlight_objects"))
+
+
+def like_search(repo: Repository, name: str, query: list[float], top_k: int = 10) -> list:
+    """The previous way to filter by object: substring match on the comma-joined column."""
+    with repo.Session() as s:
+        return s.execute(text(
+            "SELECT id FROM highlights WHERE objects LIKE :p "
+            "ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+        ), {"p": f"%{name}%", "q": str(query), "k": top_k}).all()
+
+
+def timed(fn, reps: int) -> str:
+    fn()  # warm-up
+    lat = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    return f"p50 {statistics.median(lat):9.2f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:9.2f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--reps", type=int, default=10)
+    args = ap.parse_args()
+
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    video = repo.upsert_video("benchmark", "BENCH-OBJECT-FILTER", None)
+    repo.indexes.drop()
+    rng = np.random.default_rng(0)
+    try:
+        t0 = time.perf_counter()
+        load(repo, video.id, args.rows)
+        print(f"loaded {args.rows:,} rows in {time.perf_counter() - t0:.1f}s")
+        with repo.engine.connect() as conn:
+            counts = dict(conn.execute(text(
+                "SELECT l.name, count(*) FROM highlight_objects ho JOIN object_labels l ON l.id = ho.object_id "
+                "WHERE l.name IN ('bench_obj_0', :rare) GROUP BY l.name"
+            ), {"rare": f"bench_obj_{LABELS - 1}"}).all())
+
+        q = (rng.random(768) - 0.5).tolist()
+        cases = [("rare", f"bench_obj_{LABELS - 1}"), ("common", "bench_obj_0")]
+        for kind, name in cases:
+            print(f"\n{kind} object {name}: {counts.get(name, 0):,} highlights")
+            print(f"  {'LIKE + exact order':<32} {timed(lambda: like_search(repo, name, q), args.reps)}")
+            print(f"  {'object_search':<32} {timed(lambda: repo.object_search([name], top_k=10), args.reps)}")
+            print(f"  {'vector_search, no index':<32} "
+                  f"{timed(lambda: repo.vector_search(q, top_k=10, objects=[name]), args.reps)}")
+        print()
+        repo.indexes.rebuild("ivfflat")
+        for kind, name in cases:
+            print(f"  {kind + ' vector_search, ivfflat':<32} "
+                  f"{timed(lambda: repo.vector_search(q, top_k=10, objects=[name]), args.reps)}")
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id == video.id))
+            s.commit()
+        repo.indexes.rebuild()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Quantized embeddings: recall, latency and size against full float32 search.
+
+    python -m benchmarks.bench_quantization --rows 100000 --queries 50
+
+Loads --rows clustered synthetic highlights, then reports recall@k (against
+exact neighbours), median/p95 latency and the size of what a search keeps hot:
+
+- pgvector (pgvector >= 0.7, skipped otherwise): plain, halfvec and binary
+  HNSW indexes, each at several VECTOR_RESCORE_FACTOR values; rows go under a
+  scratch video in --db-url / BENCH_DB_URL and are deleted afterwards;
+- SQLite backend: float32 matrix scan vs int8 and binary codes + rescoring.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.config import Config
+from app.db.indexing import INDEX_NAME
+from app.db.models import Video
+from app.db.repository import Repository
+from app.db.sqlite_backend import SQLiteRepository
+from benchmarks.bench_storage_backends import clustered, load, run
+
+FACTORS = (1, 4, 10)
+
+
+def bench_pgvector(args, vecs, queries, exact) -> None:
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    version = repo.indexes.pgvector_version()
+    if version < (0, 7):
+        print(f"pgvector {'.'.join(map(str, version))}: halfvec / binary_quantize need >= 0.7, skipping")
+        return
+    video = repo.upsert_video("benchmark", "BENCH-QUANTIZATION", None)
+    try:
+        with repo.indexes.deferred():
+            ids = np.asarray(load(repo, video.id, vecs))
+        truth = [set(ids[row].tolist()) for row in exact]
+        for quantization in ("none", "halfvec", "binary"):
+            repo.indexes.rebuild(quantization=quantization)
+            with repo.engine.connect() as conn:
+                size = conn.execute(text(f"SELECT pg_relation_size('{INDEX_NAME}')")).scalar()
+            print(f"pgvector {quantization}: index {size / 2**20:.0f} MiB")
+            for factor in FACTORS if quantization != "none" else (1,):
+                Config.vector_rescore_factor = factor
+                run(repo, queries, truth, args.k, f"  rescore x{factor}")
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id == video.id))
+            s.commit()
+        repo.indexes.rebuild(quantization="none")
+
+
+def bench_sqlite(args, vecs, queries, exact) -> None:
+    Config.sqlite_ivf_min_rows = 0  # exact scans: isolate the effect of the codes
+    path = tempfile.mkdtemp(prefix="bench-sqlite-quant-")
+    try:
+        lite = SQLiteRepository(path, quantization="none")
+        video = lite.upsert_video("benchmark", "BENCH-QUANTIZATION", None)
+        ids = np.asarray(load(lite, video.id, vecs))
+        truth = [set(ids[row].tolist()) for row in exact]
+        print(f"\nsqlite float32 matrix: {vecs.nbytes / 2**20:.0f} MiB")
+        run(lite, queries, truth, args.k, "  exact")
+        for quantization in ("int8", "binary"):
+            lite = SQLiteRepository(path, quantization=quantization)  # encodes the stored rows on open
+            per_row = lite.codes.width + (4 if quantization == "int8" else 0)
+            print(f"sqlite {quantization} codes: {per_row * len(vecs) / 2**20:.0f} MiB")
+            for factor in FACTORS:
+                Config.vector_rescore_factor = factor
+                run(lite, queries, truth, args.k, f"  rescore x{factor}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--skip-postgres", action="store_true")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = 768
+    centers = rng.standard_normal((256, dim))
+    vecs = clustered(args.rows, dim, rng, centers)
+    queries = clustered(args.queries, dim, rng, centers)
+    exact = np.argsort(-(queries @ vecs.T), axis=1)[:, : args.k]  # positions in vecs
+
+    if not args.skip_postgres:
+        bench_pgvector(args, vecs, queries, exact)
+    bench_sqlite(args, vecs, queries, exact)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Scoped vector search: filters pushed into SQL vs post-filtering ANN results.
+
+    python -m benchmarks.bench_scoped_search --rows 100000 --queries 30
+
+Loads --rows clustered synthetic highlights into scratch videos: one large
+video holding --big-share of the rows, the rest in videos of --per-video
+highlights. For scopes of very different selectivity it reports recall@k
+(against exact neighbours within the scope) and latency of
+- vector_search(scope=...): exact over a small scope, ANN with the filter in
+  its WHERE clause (iterative scan on pgvector >= 0.8) over a large one;
+- post-filtering: unscoped vector_search for 10 * k rows, filtered in Python.
+Rows go under scratch videos in --db-url / BENCH_DB_URL, deleted afterwards.
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import delete
+
+from app.db.models import Video
+from app.db.repository import Repository
+from app.types import SearchScope
+from benchmarks.bench_storage_backends import clustered, load
+
+
+def measure(search, queries, truth, k, label) -> None:
+    recalls, lat = [], []
+    for q, t in zip(queries, truth):
+        t0 = time.perf_counter()
+        rows = search(q.tolist())
+        lat.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len(t & {r["id"] for r in rows}) / min(k, len(t)))
+    lat.sort()
+    print(f"  {label:<30} recall@{k} {statistics.mean(recalls):.3f}   "
+          f"p50 {statistics.median(lat):7.2f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:7.2f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=30)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--big-share", type=float, default=0.3)
+    ap.add_argument("--per-video", type=int, default=100)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = 768
+    centers = rng.standard_normal((256, dim))
+    vecs = clustered(args.rows, dim, rng, centers)
+    queries = clustered(args.queries, dim, rng, centers)
+    big = int(args.rows * args.big_share)
+
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    print(f"pgvector {'.'.join(map(str, repo.indexes.pgvector_version()))}, "
+          f"iterative scans: {repo.indexes.iterative_scans()}")
+    videos, ids, video_of, ts_of = [], [], [], []
+    try:
+        with repo.indexes.deferred():
+            for n, start in enumerate([0] + list(range(big, args.rows, args.per_video))):
+                end = big if n == 0 else min(start + args.per_video, args.rows)
+                video = repo.upsert_video("benchmark", f"BENCH-SCOPED-{n}", None)
+                videos.append(video.id)
+                ids += load(repo, video.id, vecs[start:end])
+                video_of += [video.id] * (end - start)
+                ts_of += range(end - start)
+        ids, video_of, ts_of = np.asarray(ids), np.asarray(video_of), np.asarray(ts_of)
+        print(f"loaded {args.rows} rows into {len(videos)} videos (largest: {big} rows)")
+
+        scopes = {
+            f"one small video ({args.per_video} rows)": (SearchScope(video_ids=[videos[1]]), video_of == videos[1]),
+            f"ten small videos ({10 * args.per_video} rows)": (
+                SearchScope(video_ids=videos[1:11]), np.isin(video_of, videos[1:11])),
+            f"large video, 10% window ({big // 10} rows)": (
+                SearchScope(video_ids=[videos[0]], ts_from=0, ts_to=big // 10 - 2),
+                (video_of == videos[0]) & (ts_of <= big // 10 - 2)),
+            f"large video ({big} rows)": (SearchScope(video_ids=[videos[0]]), video_of == videos[0]),
+        }
+        for label, (scope, mask) in scopes.items():
+            sims = queries @ vecs[mask].T
+            truth = [set(ids[mask][np.argsort(-s)[: args.k]].tolist()) for s in sims]
+            allowed = set(ids[mask].tolist())
+            print(label)
+            measure(lambda q: repo.vector_search(q, top_k=args.k, scope=scope), queries, truth, args.k,
+                    "vector_search(scope=...)")
+            measure(lambda q: [r for r in repo.vector_search(q, top_k=10 * args.k) if r["id"] in allowed][: args.k],
+                    queries, truth, args.k, "post-filter top 10k")
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id.in_(videos)))
+            s.commit()
+        repo.indexes.rebuild()
+
+
+if __name__ == "__main__":
+    main()
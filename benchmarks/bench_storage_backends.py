@@ -0,0 +1,127 @@
+"""
+Storage backends side by side: Postgres + pgvector vs SQLite + NumPy.
+
+    python -m benchmarks.bench_storage_backends --rows 100000 --queries 50
+
+Loads the same --rows clustered synthetic highlights into each backend and
+reports load time, on-disk size, and recall@k / latency of vector_search
+against exact (brute-force) neighbours:
+
+- pgvector: HNSW at the default ef_search;
+- SQLite float32 and float16: exact NumPy scan, then the IVF partition.
+
+Postgres rows go under a scratch video (deleted afterwards) in the database
+from --db-url / BENCH_DB_URL; SQLite stores go to temporary directories.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.config import Config
+from app.db.models import Video
+from app.db.repository import Repository
+from app.db.sqlite_backend import SQLiteRepository
+from app.types import HighlightModel
+
+
+def clustered(n: int, dim: int, rng: np.random.Generator, centers: np.ndarray) -> np.ndarray:
+    x = centers[rng.integers(0, len(centers), n)] + rng.standard_normal((n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def load(repo, video_id: int, vecs: np.ndarray, chunk: int = 20_000) -> list[int]:
+    ids = []
+    for start in range(0, len(vecs), chunk):
+        ids += repo.add_highlights(video_id, [
+            HighlightModel(ts_start_sec=i, ts_end_sec=i + 1, description=f"row {i}", embedding=vecs[i].tolist())
+            for i in range(start, min(start + chunk, len(vecs)))
+        ])
+    return ids
+
+
+def run(repo, queries: np.ndarray, truth: list[set], k: int, label: str, **kw) -> None:
+    recalls, lat = [], []
+    for q, t in zip(queries, truth):
+        t0 = time.perf_counter()
+        rows = repo.vector_search(q.tolist(), top_k=k, **kw)
+        lat.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len(t & {r["id"] for r in rows}) / k)
+    lat.sort()
+    print(f"{label:<28} recall@{k} {statistics.mean(recalls):.3f}   "
+          f"p50 {statistics.median(lat):7.2f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:7.2f} ms")
+
+
+def dir_size(path: str) -> int:
+    # st_blocks: the matrix files are sparse up to their capacity
+    return sum(os.stat(os.path.join(path, f)).st_blocks * 512 for f in os.listdir(path))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = 768
+    centers = rng.standard_normal((256, dim))
+    vecs = clustered(args.rows, dim, rng, centers)
+    queries = clustered(args.queries, dim, rng, centers)
+    exact = np.argsort(-(queries @ vecs.T), axis=1)[:, : args.k]  # positions in vecs
+
+    # ----- Postgres + pgvector -----
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    video = repo.upsert_video("benchmark", "BENCH-STORAGE-BACKENDS", None)
+    try:
+        t0 = time.perf_counter()
+        with repo.indexes.deferred():
+            ids = np.asarray(load(repo, video.id, vecs))
+        print(f"pgvector: loaded and indexed {args.rows} rows in {time.perf_counter() - t0:.1f}s")
+        with repo.engine.connect() as conn:
+            rows_size = conn.execute(
+                text("SELECT sum(pg_column_size(h.*)) FROM highlights h WHERE video_id = :v"), {"v": video.id}
+            ).scalar()
+            index_size = conn.execute(text("SELECT pg_relation_size('highlights_embedding_idx')")).scalar()
+        print(f"pgvector: rows {rows_size / 2**20:.0f} MiB + vector index {index_size / 2**20:.0f} MiB")
+        truth = [set(ids[row].tolist()) for row in exact]
+        run(repo, queries, truth, args.k, f"pgvector {repo.indexes.current().method}")
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id == video.id))
+            s.commit()
+        repo.indexes.rebuild()
+
+    # ----- SQLite + NumPy -----
+    Config.sqlite_ivf_min_rows = 0  # train the partition explicitly below
+    for dtype in ("float32", "float16"):
+        path = tempfile.mkdtemp(prefix=f"bench-sqlite-{dtype}-")
+        try:
+            lite = SQLiteRepository(path, dtype=dtype)
+            video = lite.upsert_video("benchmark", "BENCH-STORAGE-BACKENDS", None)
+            t0 = time.perf_counter()
+            ids = np.asarray(load(lite, video.id, vecs))
+            print(f"\nsqlite {dtype}: loaded {args.rows} rows in {time.perf_counter() - t0:.1f}s, "
+                  f"{dir_size(path) / 2**20:.0f} MiB on disk")
+            truth = [set(ids[row].tolist()) for row in exact]
+            run(lite, queries, truth, args.k, f"sqlite {dtype} exact")
+            t0 = time.perf_counter()
+            lite.ivf.train(lite.vectors)
+            print(f"sqlite {dtype}: IVF with {lite.ivf.lists} lists trained in {time.perf_counter() - t0:.1f}s")
+            probes = lite.ivf.default_probes()
+            for p in sorted({probes, 2 * probes}):
+                run(lite, queries, truth, args.k, f"sqlite {dtype} ivf probes={p}", probes=p)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
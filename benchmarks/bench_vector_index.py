@@ -0,0 +1,107 @@
+"""
+Recall/latency of the ANN index against exact search.
+
+    python -m benchmarks.bench_vector_index --rows 100000 --queries 50
+
+Loads --rows clustered synthetic embeddings under a scratch video, then for
+HNSW (several ef_search values) and ivfflat (several probes values) reports
+recall@k against exact search and median/p95 query latency. The scratch rows
+are deleted and the index re-planned afterwards. Use a scratch database
+(--db-url / BENCH_DB_URL): building indexes over a large table takes a while.
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import delete, text
+
+from app.config import Config
+from app.db.models import Video
+from app.db.repository import Repository
+from app.types import HighlightModel
+
+
+def clustered(n: int, dim: int, rng: np.random.Generator, centers: np.ndarray) -> np.ndarray:
+    x = centers[rng.integers(0, len(centers), n)] + rng.standard_normal((n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def search_ids(repo: Repository, q: list[float], k: int, exact: bool = False, **kw) -> tuple[list[int], float]:
+    with repo.Session() as s:
+        if exact:
+            s.execute(text("SET LOCAL enable_indexscan = off"))
+        else:
+            for stmt in repo.indexes.search_settings(k, kw.get("ef_search"), kw.get("probes")):
+                s.execute(text(stmt))
+        t0 = time.perf_counter()
+        ids = s.execute(
+            text("SELECT id FROM highlights ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"),
+            {"q": str(q), "k": k},
+        ).scalars().all()
+        return list(ids), time.perf_counter() - t0
+
+
+def run(repo: Repository, queries: list[list[float]], truth: list[set], k: int, label: str, **kw) -> None:
+    recalls, lat = [], []
+    for q, t in zip(queries, truth):
+        ids, dt = search_ids(repo, q, k, **kw)
+        recalls.append(len(t & set(ids)) / k)
+        lat.append(dt * 1000)
+    lat.sort()
+    print(f"{label:<24} recall@{k} {statistics.mean(recalls):.3f}   "
+          f"p50 {statistics.median(lat):6.2f} ms   p95 {lat[int(0.95 * (len(lat) - 1))]:6.2f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"))
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = 768
+    centers = rng.standard_normal((256, dim))
+    repo = Repository(args.db_url)
+    repo.create_schema()
+    video = repo.upsert_video("benchmark", "BENCH-VECTOR-INDEX", None)
+    Config.vector_index_auto_rebuild = False  # the benchmark decides when indexes are built
+    try:
+        vecs = clustered(args.rows, dim, rng, centers)
+        t0 = time.perf_counter()
+        with repo.indexes.deferred():  # chunked load, one index build at the end
+            for start in range(0, args.rows, 20_000):
+                repo.add_highlights(video.id, [
+                    HighlightModel(ts_start_sec=i, ts_end_sec=i + 1, description=f"row {i}",
+                                   embedding=vecs[i].tolist())
+                    for i in range(start, min(start + 20_000, args.rows))
+                ])
+        print(f"loaded and indexed {args.rows} rows in {time.perf_counter() - t0:.1f}s")
+
+        queries = clustered(args.queries, dim, rng, centers).tolist()
+        exact = [search_ids(repo, q, args.k, exact=True) for q in queries]
+        truth = [set(ids) for ids, _ in exact]
+        lat = sorted(dt * 1000 for _, dt in exact)
+        print(f"{'exact (seq scan)':<24} recall@{args.k} 1.000   p50 {statistics.median(lat):6.2f} ms")
+
+        if repo.indexes.current().method != "hnsw":
+            repo.indexes.rebuild("hnsw")
+        for ef in (10, 20, 40, 80, 160):
+            run(repo, queries, truth, args.k, f"hnsw ef_search={ef}", ef_search=ef)
+
+        plan = repo.indexes.rebuild("ivfflat")
+        lists = plan.params["lists"]
+        for probes in sorted({1, 2, 4, 8, 16, max(1, lists // 10)}):
+            run(repo, queries, truth, args.k, f"ivfflat lists={lists} probes={probes}", probes=probes)
+    finally:
+        with repo.Session() as s:
+            s.execute(delete(Video).where(Video.id == video.id))
+            s.commit()
+        repo.indexes.rebuild()
+
+
+if __name__ == "__main__":
+    main()
@@ -52,3 +52,20 @@ def fake_gemini():
             return [0.0] * 768
     
     return FakeGeminiClient()
+
+
+@pytest.fixture
+def fake_llm_server(monkeypatch):
+    """
+    app.llm.fake_server on a free port (50 ms per request), with fresh,
+    fast-paced retry state per test.
+    """
+    from app.llm import retry
+    from app.llm.fake_server import FakeProviderServer
+
+    monkeypatch.setattr(retry, "_RETRIERS", {})
+    monkeypatch.setattr(retry.Config, "llm_initial_rps", 1000.0)
+    monkeypatch.setattr(retry.Config, "llm_max_rps", 1000.0)
+
+    with FakeProviderServer(latency="fixed:0.05") as server:
+        yield server
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("httpx")  # fastapi.testclient
+from fastapi.testclient import TestClient
+
+import api.dependencies
+from app.config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold start: import the app, run its startup and answer /healthz in a fresh interpreter
+COLD_START = """
+import json, sys, time
+t0 = time.perf_counter()
+import api.main
+from fastapi.testclient import TestClient
+with TestClient(api.main.app) as client:
+    health = client.get("/healthz").status_code
+    started = time.perf_counter() - t0
+    loaded = [m for m in ("anthropic", "openai", "google.generativeai", "asyncpg", "psycopg2") if m in sys.modules]
+    ready = client.get("/readyz")
+print(json.dumps({"seconds": started, "health": health, "loaded": loaded,
+                  "ready": ready.status_code, "ready_body": ready.json()}))
+"""
+
+
+def test_cold_start_loads_no_provider_sdk_or_database():
+    # Every provider key set, and a database that refuses connections
+    env = {**os.environ, "CLAUDE_API_KEY": "x", "OPENAI_API_KEY": "x", "GOOGLE_API_KEY": "x",
+           "STORAGE_BACKEND": "postgres", "POSTGRES_HOST": "127.0.0.1", "POSTGRES_PORT": "1"}
+    out = subprocess.run([sys.executable, "-c", COLD_START], env=env, cwd=ROOT, capture_output=True, text=True,
+                         timeout=120)
+    assert out.returncode == 0, out.stderr
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"cold start to /healthz: {result['seconds'] * 1000:.0f} ms")
+    assert result["health"] == 200
+    assert result["loaded"] == []
+    assert result["seconds"] < 10
+    assert result["ready"] == 503 and result["ready_body"]["status"] == "unavailable"
+
+
+def test_readyz_builds_and_warms_the_service(tmp_path, monkeypatch):
+    for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "CLAUDE_API_KEY"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setattr(Config, "storage_backend", "sqlite")
+    monkeypatch.setattr(Config, "sqlite_path", str(tmp_path / "store"))
+    monkeypatch.setattr(Config, "embedding_backend", "local")
+    monkeypatch.setattr(api.dependencies, "_service", None)
+    from api.main import app
+
+    with TestClient(app) as client:
+        assert api.dependencies._service is None  # startup opened nothing
+        ready = client.get("/readyz")
+        assert ready.status_code == 200
+        assert ready.json()["checks"] == {"database": "ok", "embedder": "ok"}
+        service = api.dependencies._service
+        assert service is not None and service._embedder_warm
+        assert client.post("/chat/query", json={"question": "anything here?"}).status_code == 200
+        assert api.dependencies._service is service  # built once
+    assert api.dependencies._service is None  # closed at shutdown
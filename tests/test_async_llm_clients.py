@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from app.config import Config
+from app.llm.local_embedder import LocalEmbedder
+
+
+def _scene(i):
+    # the fake server answers prompts in HighlightSelector's format deterministically
+    return f"Scene: {i}s to {i + 1}s\nObjects: person(0.90)\nTranscript excerpt (may be empty): hi"
+
+
+def _run_many(coro_factory, n):
+    async def main():
+        return await asyncio.gather(*(coro_factory(i) for i in range(n)))
+    return asyncio.run(main())
+
+
+def test_openai_agenerate_bounded_concurrency(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+    monkeypatch.setattr(Config, "llm_max_concurrency", 4)
+    from app.llm.openai_client import OpenAIClient
+
+    client = OpenAIClient()
+    outs = _run_many(lambda i: client.agenerate(_scene(i)), 20)
+
+    assert all(json.loads(o)["is_highlight"] for o in outs)
+    assert fake_llm_server.stats["requests"] == 20
+    assert 1 < fake_llm_server.stats["peak"] <= 4
+    # keep-alive pool: no more sockets than the concurrency cap
+    assert len(fake_llm_server.stats["connections"]) <= 4
+
+
+def test_openai_aembed(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+    from app.llm.openai_client import OpenAIClient
+
+    emb = asyncio.run(OpenAIClient().aembed("a person walking"))
+    assert len(emb) == 768
+
+
+def test_claude_agenerate_bounded_concurrency(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "claude_api_key", "test-key")
+    monkeypatch.setattr(Config, "claude_base_url", fake_llm_server.url)
+    monkeypatch.setattr(Config, "llm_max_concurrency", 3)
+    from app.llm.claude_client import ClaudeClient
+
+    client = ClaudeClient()
+    outs = _run_many(lambda i: client.agenerate(_scene(i)), 12)
+
+    assert len(outs) == 12
+    assert [json.loads(o)["description"] for o in outs] == [
+        f"Scene from {i}s to {i + 1}s showing person." for i in range(12)
+    ]
+    assert 1 < fake_llm_server.stats["peak"] <= 3
+
+
+def test_unified_client_async_delegates(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "google_api_key", "")
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+    from app.llm.llm_client import UnifiedLLMClient
+
+    client = UnifiedLLMClient()
+
+    async def main():
+        return await asyncio.gather(client.agenerate(_scene(0)), client.aembed("scene"))
+
+    text, emb = asyncio.run(main())
+    assert json.loads(text)["summary"] == "Person at 0s."
+    assert len(emb) == 768
+
+
+def test_openai_embed_many_chunks_and_keeps_order(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+    from app.llm.openai_client import OpenAIClient
+
+    client = OpenAIClient()
+    client.embed_batch_size = 4
+    texts = ["x" * n for n in range(1, 11)]
+    expected = LocalEmbedder().embed_many(texts)  # what the fake server embeds with
+
+    embs = client.embed_many(texts)
+    assert fake_llm_server.stats["requests"] == 3
+    assert embs == expected
+
+    embs = asyncio.run(client.aembed_many(texts))
+    assert fake_llm_server.stats["requests"] == 6
+    assert embs == expected
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.embedding_cache import QueryEmbeddingCache, normalize_question
+
+
+class SlowEmbedder:
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def embed(self, text):
+        self.calls.append(text)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [float(len(text))] * 4
+
+    async def aembed(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [float(len(text))] * 4
+
+
+def test_normalized_questions_share_an_entry():
+    assert normalize_question("  What happened to the RED car?") == "what happened to the red car"
+    cache, emb = QueryEmbeddingCache(), SlowEmbedder(delay=0)
+    first = cache.get("Red car?", emb.embed)
+    assert cache.get("red   car", emb.embed) == first
+    assert emb.calls == ["Red car?"]
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction_and_ttl():
+    cache, emb = QueryEmbeddingCache(max_entries=2, ttl_sec=10), SlowEmbedder(delay=0)
+    now = [0.0]
+    cache._now = lambda: now[0]
+    cache.get("a dog", emb.embed)
+    cache.get("a cat", emb.embed)
+    cache.get("a dog", emb.embed)  # refreshes "a dog"
+    cache.get("a bird", emb.embed)  # evicts "a cat", the least recently used
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    cache.get("a dog", emb.embed)
+    assert emb.calls == ["a dog", "a cat", "a bird"]
+
+    now[0] = 11.0  # expired
+    cache.get("a dog", emb.embed)
+    assert emb.calls[-1] == "a dog" and len(emb.calls) == 4
+
+
+def test_concurrent_threads_share_one_embed_call():
+    cache, emb = QueryEmbeddingCache(), SlowEmbedder(delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("who scored?", emb.embed)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(emb.calls) == 1 and len(results) == 8 and all(r == results[0] for r in results)
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 7
+
+
+def test_concurrent_coroutines_share_one_embed_call():
+    cache, emb = QueryEmbeddingCache(), SlowEmbedder()
+
+    async def main():
+        return await asyncio.gather(*(cache.aget("who scored?", emb.aembed) for _ in range(50)))
+
+    results = asyncio.run(main())
+    assert len(emb.calls) == 1 and all(r == results[0] for r in results)
+    assert asyncio.run(cache.aget("Who scored", emb.aembed)) == results[0]  # now a hit
+    assert cache.stats()["coalesced"] == 49 and cache.stats()["hits"] == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache, emb = QueryEmbeddingCache(), SlowEmbedder(fail=True)
+
+    async def main():
+        return await asyncio.gather(*(cache.aget("q", emb.aembed) for _ in range(5)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+    assert len(emb.calls) == 1
+    with pytest.raises(RuntimeError):
+        cache.get("q", emb.embed)
+    assert len(emb.calls) == 2 and cache.stats()["entries"] == 0
+
+
+def test_get_many_embeds_only_missing_questions_in_one_call():
+    cache, calls = QueryEmbeddingCache(), []
+
+    def embed_many(texts):
+        calls.append(texts)
+        return [[float(len(t))] * 4 for t in texts]
+
+    cache.get("Red car?", lambda t: [1.0] * 4)
+    out = cache.get_many(["red car", "A dog", "a dog!", "crowd"], embed_many)
+    assert calls == [["A dog", "crowd"]]
+    assert out[0] == [1.0] * 4 and out[1] == out[2] == [5.0] * 4 and out[3] == [5.0] * 4
+    assert asyncio.run(cache.aget_many(["crowd", "A DOG"], None)) == [[5.0] * 4, [5.0] * 4]  # all cached
+    assert cache.stats()["misses"] == 3
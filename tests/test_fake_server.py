@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from app.config import Config
+from app.llm.fake_server import FakeProviderServer, Latency, fake_completion
+from app.llm.highlight_selector import HighlightSelector
+from app.types import DetectedObjectModel
+
+
+def test_latency_specs():
+    assert Latency("0.2").sample() == 0.2
+    assert 0.1 <= Latency("uniform:0.1,0.3", seed=1).sample() <= 0.3
+    assert Latency("lognormal:0.3,0.5", seed=1).sample() == Latency("lognormal:0.3,0.5", seed=1).sample()
+    assert Latency("normal:0,1", seed=3).sample() >= 0
+    with pytest.raises(ValueError):
+        Latency("pareto:1")
+    for spec in ["normal:0.1", "uniform:0.1", "lognormal:0.3", "exp:0.1,0.2", "fixed:0.1,0.2"]:
+        with pytest.raises(ValueError, match="parameter"):
+            Latency(spec)
+
+
+def test_completions_are_deterministic():
+    prompt = "Scene: 0s to 5s\nObjects: none\nTranscript excerpt (may be empty): "
+    assert json.loads(fake_completion(prompt))["is_highlight"] is False
+    assert fake_completion("What happened?") == fake_completion("What happened?")
+
+
+def test_selector_batches_against_fake_openai(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "google_api_key", "")
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+    from app.llm.llm_client import UnifiedLLMClient
+
+    person = [DetectedObjectModel(name="person", confidence=0.9)]
+    scenes = [((0, 5), "hello", person), ((5, 10), "", []), ((10, 15), "", person)]
+    results = HighlightSelector(UnifiedLLMClient()).analyze_segments(scenes)
+
+    assert fake_llm_server.stats["routes"]["/v1/chat/completions"] == 1  # one batched call
+    assert [r.ts_start_sec if r else None for r in results] == [0, None, 10]
+    assert results[2].description == "Scene from 10s to 15s showing person."
+
+
+def test_gemini_rest_transport_with_429s(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "google_api_key", "test-key")
+    monkeypatch.setattr(Config, "gemini_base_url", fake_llm_server.url)
+    monkeypatch.setattr(Config, "llm_retry_base_delay", 0.01)
+    from app.llm.gemini_client import GeminiClient
+
+    client = GeminiClient()
+    fake_llm_server.throttle(1)
+    out = client.generate("Scene: 0s to 5s\nObjects: car(0.80)\nTranscript excerpt (may be empty): ")
+    assert json.loads(out)["summary"] == "Car at 0s."
+    assert client._retry.snapshot()["rate_limited"] == 1
+    assert len(client.embed("a car")) == 768
+    assert len(client.embed_many(["a", "b", "c"])) == 3
+
+
+def test_throttle_rate_injects_429s():
+    import httpx
+
+    with FakeProviderServer(throttle_rate=1.0, retry_after=2) as server:
+        r = httpx.post(server.url + "/v1/messages", json={"messages": [{"role": "user", "content": "hi"}]})
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "2"
+    assert r.json()["error"]["type"] == "rate_limit_error"
+    assert server.stats["throttled"] == 1
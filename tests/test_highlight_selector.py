@@ -1,3 +1,4 @@
+import json
 from app.llm.highlight_selector import HighlightSelector
 from app.types import DetectedObjectModel
 
@@ -12,3 +13,62 @@ def test_highlight_selector_basic(fake_gemini):
     assert hl.ts_start_sec == 0
     assert hl.ts_end_sec == 5
     assert "key moment" in hl.llm_summary.lower()
+
+
+def _scenes(n, transcript="hello world"):
+    return [((i * 5, i * 5 + 5), transcript, [DetectedObjectModel(name="person", confidence=0.8)]) for i in range(n)]
+
+
+def test_analyze_segments_single_batched_call():
+    class BatchClient:
+        def __init__(self):
+            self.prompts = []
+        def generate(self, prompt):
+            self.prompts.append(prompt)
+            return json.dumps([
+                {"scene_id": 1, "is_highlight": True, "description": "Person talks.", "summary": "Talk.", "confidence": 0.9},
+                {"scene_id": 2, "is_highlight": False},
+                {"scene_id": 3, "is_highlight": True, "description": "Person waves.", "summary": "Wave.", "confidence": 0.7},
+            ])
+        def embed(self, text): return [0.0] * 768
+
+    client = BatchClient()
+    results = HighlightSelector(client).analyze_segments(_scenes(3))
+    assert len(client.prompts) == 1
+    assert client.prompts[0].count("IMPORTANT HIGHLIGHT CRITERIA") == 1
+    assert client.prompts[0].count("hello world") == 1  # shared transcript sent once
+    assert [r.ts_start_sec if r else None for r in results] == [0, None, 10]
+
+
+def test_analyze_segments_retries_only_failed_scenes():
+    class PartialClient:
+        def __init__(self):
+            self.prompts = []
+        def generate(self, prompt):
+            self.prompts.append(prompt)
+            if "scene_id" in prompt:
+                # scene 2 missing, scene 3 invalid
+                return json.dumps([
+                    {"scene_id": 1, "is_highlight": True, "description": "Person talks.", "summary": "Talk."},
+                    {"scene_id": 3, "is_highlight": "maybe"},
+                ])
+            return json.dumps({"is_highlight": True, "description": "Retried scene.", "summary": "Retry."})
+        def embed(self, text): return [0.0] * 768
+
+    client = PartialClient()
+    results = HighlightSelector(client).analyze_segments(_scenes(3))
+    assert len(client.prompts) == 3  # one batch + two individual retries
+    assert results[0].description == "Person talks."
+    assert results[1].description == "Retried scene."
+    assert results[2].description == "Retried scene."
+
+
+def test_analyze_segments_respects_token_budget(monkeypatch):
+    from app.config import Config
+    monkeypatch.setattr(Config, "llm_batch_max_scenes", 2)
+    sel = HighlightSelector(None)
+    assert sel._plan_batches(_scenes(5)) == [[0, 1], [2, 3], [4]]
+
+    monkeypatch.setattr(Config, "llm_batch_max_scenes", 50)
+    monkeypatch.setattr(Config, "llm_batch_token_budget", 1)
+    assert sel._plan_batches(_scenes(3)) == [[0], [1], [2]]
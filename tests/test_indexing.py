@@ -0,0 +1,178 @@
+import os
+
+import pytest
+
+from app.config import Config
+from app.db.indexing import IndexInfo, IndexManager, ivfflat_lists, nearest_sql, plan_for
+
+
+def test_plan_by_table_size(monkeypatch):
+    monkeypatch.setattr(Config, "vector_index_method", "auto")
+    monkeypatch.setattr(Config, "vector_index_hnsw_max_rows", 1_000_000)
+    assert plan_for(0).method == "hnsw"
+    assert plan_for(1_000_000).method == "hnsw"
+    big = plan_for(4_000_000)
+    assert big.method == "ivfflat" and big.params["lists"] == 2000
+    assert plan_for(50_000, "ivfflat").params == {"lists": 50}
+    assert ivfflat_lists(10) == 1
+    assert "WITH (m = 16, ef_construction = 64)" in plan_for(10).ddl("idx")
+
+
+def test_quantized_index_ddl_and_rescoring_sql(monkeypatch):
+    monkeypatch.setattr(Config, "vector_quantization", "none")
+    assert "(embedding vector_cosine_ops)" in plan_for(10).ddl("idx")
+    assert "((embedding::halfvec(768)) halfvec_cosine_ops)" in plan_for(10, quantization="halfvec").ddl("idx")
+    assert "((binary_quantize(embedding)::bit(768)) bit_hamming_ops)" in plan_for(10, "ivfflat", "binary").ddl("idx")
+
+    assert ":rescore_n" not in nearest_sql()
+    sql = nearest_sql("halfvec", where="h.video_id = 1", limit=":n")
+    # compact codes order the index scan, exact distances order the result
+    assert "ORDER BY h.embedding::halfvec(768) <=> CAST(:emb AS halfvec(768)) LIMIT :rescore_n" in sql
+    assert sql.endswith("ORDER BY c.dist, c.id LIMIT :n") and "WHERE h.video_id = 1" in sql
+
+    monkeypatch.setattr(Config, "vector_rescore_factor", 4)
+    mgr = IndexManager(engine=None)
+    mgr._cached = (float("inf"), None)
+    assert mgr.first_pass_rows(5) == 5
+
+
+def test_search_settings_per_query(monkeypatch):
+    monkeypatch.setattr(Config, "vector_ef_search", 40)
+    monkeypatch.setattr(Config, "vector_probes", 0)
+    mgr = IndexManager(engine=None)
+    mgr._cached = (float("inf"), None)  # pretend the index was just inspected: none
+
+    assert mgr.search_settings(5) == ["SET LOCAL hnsw.ef_search = 40", "SET LOCAL ivfflat.probes = 1"]
+    assert mgr.search_settings(100, ef_search=10, probes=7) == [
+        "SET LOCAL hnsw.ef_search = 100",  # never below top_k
+        "SET LOCAL ivfflat.probes = 7",
+    ]
+
+    mgr.remember_version("0.7.4")  # filtered queries: iterative scans only where pgvector has them
+    assert mgr.search_settings(5, filtered=True) == mgr.search_settings(5)
+    mgr.remember_version("0.8.0")
+    assert mgr.search_settings(5, filtered=True)[2:] == [
+        "SET LOCAL hnsw.iterative_scan = relaxed_order",
+        "SET LOCAL ivfflat.iterative_scan = relaxed_order",
+    ]
+
+
+def test_engineless_manager_keeps_expired_info(monkeypatch):
+    monkeypatch.setattr(Config, "vector_rescore_factor", 4)
+    mgr = IndexManager(engine=None)  # as in AsyncRepository: only _prepare refreshes it
+    mgr.remember(IndexInfo("hnsw", {"m": 16}, built_rows=100, quantization="halfvec"))
+    mgr._cached = (mgr._cached[0] - 61, mgr._cached[1])  # expired between _prepare and the query
+
+    assert not mgr.is_fresh()
+    assert mgr.quantization() == "halfvec" and mgr.first_pass_rows(5) == 20
+    assert mgr.scan_size(ef_search=30) == 30
+
+
+@pytest.mark.integration
+def test_rebuild_and_staleness(monkeypatch):
+    url = os.environ.get("TEST_DB_URL")
+    if not url:
+        pytest.skip("TEST_DB_URL not set; skipping integration test")
+    from app.db.repository import Repository
+
+    repo = Repository(url)
+    repo.create_schema()
+    mgr = repo.indexes
+    assert mgr.current() is not None
+
+    mgr.rebuild("ivfflat", lists=500)
+    info = mgr.current()
+    assert (info.method, info.params, info.built_rows) == ("ivfflat", {"lists": 500}, mgr.row_count(exact=True))
+    monkeypatch.setattr(Config, "vector_index_method", "ivfflat")
+    assert mgr.needs_rebuild()  # 500 lists for a handful of rows
+
+    monkeypatch.setattr(Config, "vector_index_method", "auto")
+    mgr.rebuild()
+    assert mgr.current().method == "hnsw"
+    assert not mgr.needs_rebuild()
+    assert repo.vector_search([0.01] * 768, top_k=3, ef_search=100, probes=2) is not None
+
+
+@pytest.mark.integration
+def test_quantized_index_search(monkeypatch):
+    url = os.environ.get("TEST_DB_URL")
+    if not url:
+        pytest.skip("TEST_DB_URL not set; skipping integration test")
+    from app.db.repository import Repository
+    from app.types import HighlightModel
+
+    repo = Repository(url)
+    repo.create_schema()
+    mgr = repo.indexes
+    video = repo.upsert_video("quantized-source", "VIDQUANT", 30)
+    repo.delete_highlights(video.id)
+    emb = [0.0] * 730 + [1.0, 0.5] + [0.0] * 36
+    near = [0.0] * 730 + [1.0, 0.6] + [0.0] * 36
+    ids = repo.add_highlights(video.id, [
+        HighlightModel(ts_start_sec=i, ts_end_sec=i + 1, description=f"quantized row {i}", embedding=e)
+        for i, e in enumerate([emb, near])
+    ])
+
+    monkeypatch.setattr(Config, "vector_quantization", "halfvec")
+    try:
+        mgr.rebuild()
+        info = mgr.current()
+        if mgr.pgvector_version() < (0, 7):
+            assert info.quantization == "none" and not mgr.needs_rebuild()  # kept the plain index
+        else:
+            assert info.quantization == "halfvec" and mgr.first_pass_rows(5) == 5 * Config.vector_rescore_factor
+        rows = repo.vector_search(emb, top_k=2)
+        assert [r["id"] for r in rows] == ids and rows[0]["score"] == pytest.approx(1.0, abs=1e-6)
+        assert repo.hybrid_search("quantized row 0", emb, top_k=2)[0]["id"] == ids[0]
+    finally:
+        monkeypatch.setattr(Config, "vector_quantization", "none")
+        mgr.rebuild()
+    assert mgr.current().quantization == "none"
+
+
+@pytest.mark.integration
+def test_concurrent_builders_skip_and_failures_stay_out_of_the_write_path(monkeypatch):
+    url = os.environ.get("TEST_DB_URL")
+    if not url:
+        pytest.skip("TEST_DB_URL not set; skipping integration test")
+    from sqlalchemy import text
+
+    from app.db.indexing import BUILD_LOCK_SQL, BUILD_UNLOCK_SQL
+    from app.db.repository import Repository
+
+    repo = Repository(url)
+    repo.create_schema()
+    mgr = repo.indexes
+    before = mgr.current()
+
+    # Another process (a second worker) is building: this one neither drops nor builds
+    with repo.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as other:
+        assert other.execute(text(BUILD_LOCK_SQL)).scalar()
+        try:
+            assert mgr.rebuild() is None
+            with mgr.deferred():
+                assert mgr.current() is not None
+            assert mgr.current().built_rows == before.built_rows
+        finally:
+            other.execute(text(BUILD_UNLOCK_SQL))
+
+    # During this session's deferred load, another process starting up (create_schema → ensure) doesn't build
+    starting = Repository(url)
+    with mgr.deferred():
+        assert mgr.current() is None
+        starting.indexes.ensure()
+        assert mgr.current() is None
+    assert mgr.current() is not None
+    starting.close()
+
+    def broken_build(plan, rows):
+        raise RuntimeError("canceling statement due to conflict")
+
+    monkeypatch.setattr(mgr, "_build", broken_build)
+    monkeypatch.setattr(mgr, "needs_rebuild", lambda rows=None: True)
+    assert mgr.after_bulk_load() is False
+    with mgr.deferred():
+        pass  # the rebuild fails after the "load": logged, not raised
+    monkeypatch.undo()
+    mgr.ensure()
+    assert mgr.current() is not None
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db.jobs import _TIME_COLUMNS, JobQueue
+from app.worker import Worker
+
+
+@pytest.fixture(params=[pytest.param("postgres", marks=pytest.mark.integration)])
+def queue():
+    url = os.environ.get("TEST_DB_URL")
+    if not url:
+        pytest.skip("TEST_DB_URL not set; skipping integration test")
+    queue = JobQueue(url, lease_sec=60, retry_base_sec=0, retry_max_sec=0)
+    queue.create_schema()
+    with queue.engine.begin() as conn:
+        conn.execute(text("DELETE FROM jobs"))  # claims take any due job: start from an empty queue
+    yield queue
+    queue.close()
+
+
+class FakeProcessor:
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.fail_times, self.delay = fail_times, delay
+        self.calls = []
+
+    def process(self, source: str, replace: bool = False, may_write=None):
+        self.calls.append((source, replace))
+        time.sleep(self.delay)
+        if len(self.calls) <= self.fail_times:
+            raise RuntimeError("transcoder crashed")
+        if may_write is not None and not may_write():
+            return SimpleNamespace(id=None), []
+        return SimpleNamespace(id=None), ["h1", "h2"]
+
+
+def test_enqueue_returns_the_pending_job_for_a_source(queue):
+    first = queue.enqueue("clip-a.mp4")
+    assert first.status == "queued" and first.attempts == 0
+    assert queue.enqueue("clip-a.mp4").id == first.id
+    assert queue.enqueue("clip-b.mp4").id != first.id
+
+    job = queue.claim("w1")
+    assert queue.complete(job, None, 0).status == "succeeded"
+    assert queue.enqueue("clip-a.mp4").id != first.id  # finished: submitting again queues new work
+
+
+def test_concurrent_claims_never_share_a_job(queue):
+    ids = {queue.enqueue(f"clip-{i}.mp4").id for i in range(40)}
+    claimed, lock = [], threading.Lock()
+
+    def drain(worker):
+        while (job := queue.claim(worker)) is not None:
+            with lock:
+                claimed.append(job.id)
+
+    threads = [threading.Thread(target=drain, args=(f"w{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(ids)
+    assert queue.counts() == {"running": 40}
+
+
+def test_retry_delay_grows_exponentially_up_to_the_cap():
+    queue = JobQueue("postgresql+psycopg2://unused/none", retry_base_sec=10, retry_max_sec=60)
+    for attempt, cap in [(1, 10), (2, 20), (3, 40), (4, 60), (10, 60)]:
+        assert all(0 <= queue.retry_delay(attempt) <= cap for _ in range(50))
+    queue.close()
+
+
+def test_failed_attempts_back_off_then_fail(queue, monkeypatch):
+    monkeypatch.setattr(queue, "retry_delay", lambda attempt: 3600)
+    queue.enqueue("flaky.mp4", max_attempts=2)
+    job = queue.claim("w1")
+    retried = queue.fail(job, "RuntimeError: boom")
+    assert retried.status == "queued" and retried.last_error == "RuntimeError: boom"
+    assert queue.claim("w1") is None  # not due for an hour
+
+    with queue.engine.begin() as conn:
+        conn.execute(text("UPDATE jobs SET run_after = now() WHERE id = :id"), {"id": job.id})
+    second = queue.claim("w2")
+    assert second.id == job.id and second.attempts == 2
+    failed = queue.fail(second, "RuntimeError: boom again")
+    assert failed.status == "failed" and failed.finished_at is not None
+    assert queue.claim("w1") is None
+
+
+def test_expired_lease_is_reclaimed_and_fences_the_old_worker(queue):
+    queue.enqueue("slow.mp4")
+    stale = queue.claim("w-dead")
+    with queue.engine.begin() as conn:
+        conn.execute(text("UPDATE jobs SET lease_until = now() - interval '1 second' WHERE id = :id"),
+                     {"id": stale.id})
+
+    fresh = queue.claim("w-alive")
+    assert fresh.id == stale.id and fresh.attempts == 2
+    assert fresh.last_error == "lease expired on worker w-dead"
+    assert queue.heartbeat(fresh)
+    assert not queue.heartbeat(stale)
+    assert queue.complete(stale, None, 1) is None  # the old owner can't overwrite
+    assert queue.get(fresh.id).status == "running"
+    assert queue.complete(fresh, None, 3).highlights == 3
+
+
+def test_leases_hold_across_session_time_zones(queue):
+    queue.enqueue("far-away.mp4")
+    with queue.engine.begin() as conn:  # a table from before the time columns were timestamptz
+        conn.execute(text("ALTER TABLE jobs " + ", ".join(f"ALTER COLUMN {c} TYPE timestamp" for c in _TIME_COLUMNS)))
+    queue.create_schema()
+    assert queue.get(queue.claim("w-utc").id).lease_until.tzinfo is not None
+
+    # UTC+14: a naive lease_until written from another zone would read as hours in the past
+    far = JobQueue(queue.engine.url, lease_sec=60)
+    far.engine = create_engine(queue.engine.url, connect_args={"options": "-c timezone=Pacific/Kiritimati"})
+    assert far.claim("w-kiritimati") is None
+    far.close()
+
+
+def test_worker_retries_then_succeeds(queue):
+    processor = FakeProcessor(fail_times=1)
+    worker = Worker(queue, processor_factory=lambda: processor, worker_id="w1", heartbeat_sec=0.05)
+    job = queue.enqueue("retry-me.mp4")
+
+    first = worker.run_once()
+    assert first.status == "queued" and "transcoder crashed" in first.last_error
+    done = worker.run_once()
+    assert done.id == job.id and done.status == "succeeded" and done.highlights == 2 and done.attempts == 2
+    assert processor.calls == [("retry-me.mp4", True)] * 2
+    assert worker.run_once() is None
+
+
+def test_worker_that_lost_its_lease_writes_nothing(queue):
+    job = queue.enqueue("reaped.mp4")
+    thief = JobQueue(queue.engine.url, lease_sec=60)
+    seen = {}
+
+    class ReapedMidway(FakeProcessor):
+        def process(self, source, replace=False, may_write=None):
+            # The worker stalls past its lease (before the next heartbeat) and another one takes the job
+            with queue.engine.begin() as conn:
+                conn.execute(text("UPDATE jobs SET lease_until = now() - interval '1 second' WHERE id = :id"),
+                             {"id": job.id})
+            seen["thief"] = thief.claim("w-new")
+            seen["may_write"] = may_write()
+            return super().process(source, replace, may_write)
+
+    worker = Worker(queue, processor_factory=ReapedMidway, worker_id="w-old", heartbeat_sec=60)
+    assert worker.run_once() is None  # nothing written, and the job's state is the new owner's
+    thief.close()
+    assert seen["thief"].id == job.id and seen["may_write"] is False
+    current = queue.get(job.id)
+    assert current.status == "running" and current.worker == "w-new" and current.attempts == 2
+
+
+def test_worker_heartbeats_keep_a_long_job(queue):
+    queue.lease_sec = 1.0
+    worker = Worker(queue, processor_factory=lambda: FakeProcessor(delay=2.0), worker_id="w1", heartbeat_sec=0.2)
+    queue.enqueue("long.mp4")
+    thief = JobQueue(queue.engine.url, lease_sec=1.0)
+    result = {}
+    t = threading.Thread(target=lambda: result.update(done=worker.run_once()))
+    t.start()
+    time.sleep(1.5)  # past the first lease: only heartbeats keep the job
+    assert thief.claim("w2") is None
+    t.join()
+    thief.close()
+    assert result["done"].status == "succeeded" and result["done"].attempts == 1
+
+
+def test_submit_and_poll_over_http(queue, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import api.dependencies
+    from api.main import app
+
+    monkeypatch.setattr(api.dependencies, "_queue", queue)
+    client = TestClient(app)
+    response = client.post("/videos", json={"source": "  https://youtu.be/abc  "})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued" and job["source"] == "https://youtu.be/abc"
+    assert response.headers["location"] == f"/videos/jobs/{job['id']}"
+
+    Worker(queue, processor_factory=FakeProcessor, worker_id="w1").run_once()
+    status = client.get(response.headers["location"]).json()
+    assert status["status"] == "succeeded" and status["highlights"] == 2
+    assert client.get("/videos/jobs/999999999").status_code == 404
+    assert client.post("/videos", json={"source": "   "}).status_code == 422
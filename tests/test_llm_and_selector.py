@@ -19,3 +19,16 @@ def test_selector_fallback_without_valid_json(monkeypatch):
     hl = sel.analyze_segment((0,5), "", [DetectedObjectModel(name="car", confidence=0.6)])
     assert hl is not None
     assert "car" in hl.description.lower()
+
+def test_selector_embed_descs_uses_batch_api():
+    class BatchClient:
+        def __init__(self): self.calls = []
+        def generate(self, prompt): return "{}"
+        def embed(self, text): raise AssertionError("embed_many expected")
+        def embed_many(self, texts):
+            self.calls.append(texts)
+            return [[float(i)] for i, _ in enumerate(texts)]
+    client = BatchClient()
+    out = HighlightSelector(client).embed_descs(["a", "b", "c"])
+    assert out == [[0.0], [1.0], [2.0]]
+    assert len(client.calls) == 1
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+
+from app.llm.cache import LLMCache
+from app.llm.llm_client import FallbackText, UnifiedLLMClient
+
+
+class CountingClient:
+    provider = "fake"
+    gen_model = "fake-gen"
+    embed_model = "fake-embed"
+    gen_params = {"temperature": 0.7}
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def generate(self, prompt):
+        self.calls += 1
+        return FallbackText('{"is_highlight": true}') if self.fail else f'{{"echo": "{prompt}"}}'
+
+    def embed(self, text):
+        self.calls += 1
+        return [0.25] * 768
+
+    async def agenerate(self, prompt):
+        return self.generate(prompt)
+
+    async def aembed(self, text):
+        return self.embed(text)
+
+
+def _client(monkeypatch, tmp_path, fake):
+    monkeypatch.setattr(UnifiedLLMClient, "_create_client", lambda self: fake)
+    return UnifiedLLMClient(cache=LLMCache(str(tmp_path / "cache.sqlite")))
+
+
+def test_generate_and_embed_hit_cache(monkeypatch, tmp_path):
+    fake = CountingClient()
+    client = _client(monkeypatch, tmp_path, fake)
+    assert client.generate("p1") == client.generate("p1")
+    assert client.embed("hello") == client.embed("hello")
+    assert fake.calls == 2
+    stats = client.cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+    # persisted across instances
+    again = UnifiedLLMClient(cache=LLMCache(str(tmp_path / "cache.sqlite")))
+    again.generate("p1")
+    assert fake.calls == 2
+
+
+def test_async_paths_hit_cache_off_the_event_loop(monkeypatch, tmp_path):
+    fake = CountingClient()
+    client = _client(monkeypatch, tmp_path, fake)
+    cache_threads = []
+    for name in ("get", "put"):
+        method = getattr(client.cache, name)
+        monkeypatch.setattr(client.cache, name,
+                            lambda *a, _m=method: cache_threads.append(threading.get_ident()) or _m(*a))
+
+    async def main():
+        return threading.get_ident(), [
+            await client.agenerate("p1"), await client.agenerate("p1"),
+            await client.aembed("hello"), await client.aembed("hello"),
+        ]
+
+    loop_thread, (g1, g2, e1, e2) = asyncio.run(main())
+    assert g1 == g2 and e1 == e2 and fake.calls == 2
+    # SQLite reads write last_access: never on the event loop
+    assert len(cache_threads) == 6 and loop_thread not in cache_threads
+
+
+def test_fallback_responses_are_not_cached(monkeypatch, tmp_path):
+    fake = CountingClient(fail=True)
+    client = _client(monkeypatch, tmp_path, fake)
+    client.generate("p1")
+    client.generate("p1")
+    assert fake.calls == 2
+    assert client.cache.stats()["entries"] == 0
+
+
+def test_ttl_expiry(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"), ttl_sec=10)
+    now = [1000.0]
+    cache._now = lambda: now[0]
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_size_based_lru_eviction(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"), max_bytes=3 * 768 * 4)
+    now = [0.0]
+    cache._now = lambda: now[0]
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.put(key, [0.0] * 768)
+    now[0] += 1
+    cache.get("a")  # "b" becomes least recently used
+    now[0] += 1
+    cache.put("d", [0.0] * 768)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_key_depends_on_model_and_params():
+    base = LLMCache.make_key("generate", "openai", "gpt-4o-mini", "p", {"temperature": 0.7})
+    assert base != LLMCache.make_key("generate", "openai", "gpt-4o", "p", {"temperature": 0.7})
+    assert base != LLMCache.make_key("generate", "openai", "gpt-4o-mini", "p", {"temperature": 0.2})
+    assert base != LLMCache.make_key("generate", "claude", "gpt-4o-mini", "p", {"temperature": 0.7})
+
+
+def test_embed_many_skips_cached_and_duplicate_texts(monkeypatch, tmp_path):
+    class BatchClient(CountingClient):
+        def __init__(self):
+            super().__init__()
+            self.batches = []
+
+        def embed_many(self, texts):
+            self.batches.append(list(texts))
+            return [[float(len(t))] * 768 for t in texts]
+
+    fake = BatchClient()
+    client = _client(monkeypatch, tmp_path, fake)
+    client.embed("bb")
+
+    out = client.embed_many(["a", "bb", "a", "ccc"])
+    assert fake.batches == [["a", "ccc"]]
+    assert [e[0] for e in out] == [1.0, 0.25, 1.0, 3.0]
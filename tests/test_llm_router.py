@@ -0,0 +1,104 @@
+import asyncio
+import random
+
+from app.config import Config
+from app.llm.llm_client import FallbackText, UnifiedLLMClient
+from app.llm.router import CircuitBreaker, ProviderRouter, parse_weights
+
+
+class FakeProvider:
+    def __init__(self, name, fail=False):
+        self.provider = name
+        self.gen_model = f"{name}-model"
+        self.embed_model = f"{name}-embed"
+        self.fail = fail
+        self.calls = 0
+        self.embeds = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.fail == "raise":
+            raise ConnectionError("down")
+        return FallbackText("{}") if self.fail else f"{self.provider}:{prompt}"
+
+    async def agenerate(self, prompt):
+        return self.generate(prompt)
+
+    def embed(self, text):
+        self.embeds += 1
+        return [1.0] * 768
+
+    def embed_many(self, texts):
+        return [self.embed(t) for t in texts]
+
+
+def test_weighted_spread():
+    random.seed(7)
+    a, b = FakeProvider("gemini"), FakeProvider("openai")
+    router = ProviderRouter([a, b], a, weights={"gemini": 3, "openai": 1})
+    for i in range(400):
+        router.generate(f"p{i}")
+    assert a.calls + b.calls == 400
+    assert 0.6 < a.calls / 400 < 0.9
+
+
+def test_failover_and_breaker_probe():
+    now = [0.0]
+    bad, good = FakeProvider("gemini", fail=True), FakeProvider("openai")
+    router = ProviderRouter([bad, good], bad, failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    for i in range(20):
+        assert router.generate(f"p{i}").startswith("openai:")
+    assert router.stats()["gemini"]["state"] == "open"
+    assert bad.calls == 2  # no traffic once the breaker is open
+
+    now[0] += 11
+    bad.fail = False
+    router.generate("probe")
+    assert bad.calls == 3  # exactly one probe after the cool-down
+    assert router.stats()["gemini"]["state"] == "closed"
+
+
+def test_exceptions_fail_over_async():
+    down, up = FakeProvider("claude", fail="raise"), FakeProvider("openai")
+    router = ProviderRouter([down, up], up)
+
+    async def main():
+        return await asyncio.gather(*(router.agenerate(f"p{i}") for i in range(5)))
+
+    outs = asyncio.run(main())
+    assert all(o.startswith("openai:") for o in outs)
+
+
+def test_embeddings_stay_pinned():
+    a, b = FakeProvider("gemini"), FakeProvider("openai")
+    router = ProviderRouter([a, b], b)
+    router.embed("x")
+    router.embed_many(["y", "z"])
+    assert (a.embeds, b.embeds) == (0, 3)
+    assert router.embed_provider == "openai"
+
+
+def test_breaker_half_open_allows_single_probe():
+    now = [0.0]
+    br = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+    br.record_failure()
+    assert not br.allow()
+    now[0] = 6
+    assert br.allow()
+    assert not br.allow()
+    br.record_failure()
+    assert br.state == "open"
+
+
+def test_unified_client_balanced_mode(monkeypatch):
+    providers = {"gemini": FakeProvider("gemini"), "claude": FakeProvider("claude")}
+    monkeypatch.setattr(Config, "llm_routing", "balanced")
+    monkeypatch.setattr(Config, "embedding_provider", "claude")
+    monkeypatch.setattr(UnifiedLLMClient, "_init_provider", staticmethod(lambda name: providers.get(name)))
+
+    client = UnifiedLLMClient()
+    assert client.client_type == "Router(gemini, claude)"
+    client.embed("x")
+    assert providers["claude"].embeds == 1 and providers["gemini"].embeds == 0
+    assert parse_weights("gemini=2, openai=0.5") == {"gemini": 2.0, "openai": 0.5}
@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.llm.llm_client import UnifiedLLMClient
+from app.llm.local_embedder import LocalEmbedder
+
+
+def test_shape_norm_and_determinism():
+    emb = LocalEmbedder()
+    v = emb.embed("A person exits the car and walks to the building.")
+    assert len(v) == 768
+    assert abs(np.linalg.norm(v) - 1.0) < 1e-5
+    assert v == LocalEmbedder().embed("A person exits the car and walks to the building.")
+    assert emb.embed("") == [0.0] * 768
+
+
+def test_similar_texts_score_higher():
+    a, b, c = np.array(LocalEmbedder().embed_many([
+        "a person walking down the street",
+        "person walks along a street",
+        "explosion and fire on a mountain",
+    ]))
+    assert a @ b > a @ c + 0.2
+
+
+def test_batch_matches_single_and_is_fast():
+    emb = LocalEmbedder()
+    texts = [f"scene {i}: a dog chases a bicycle near the river while people talk" for i in range(2000)]
+    assert emb.embed_many(texts[:3])[1] == emb.embed(texts[1])
+
+    start = time.perf_counter()
+    out = emb.embed_array(texts)
+    elapsed = time.perf_counter() - start
+    assert out.shape == (2000, 768)
+    assert 2000 / elapsed > 1000  # thousands of texts per second, no network
+
+
+def test_unified_client_local_backend(monkeypatch):
+    class GenOnly:
+        provider = "fake"
+        def generate(self, prompt): return "{}"
+        def embed(self, text): raise AssertionError("provider embed should not be used")
+
+    monkeypatch.setattr(Config, "embedding_backend", "local")
+    monkeypatch.setattr(UnifiedLLMClient, "_create_client", lambda self: GenOnly())
+    client = UnifiedLLMClient()
+    assert client.embed("person speaking") == LocalEmbedder().embed("person speaking")
+    assert len(client.embed_many(["a", "b"])) == 2
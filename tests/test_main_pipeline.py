@@ -9,11 +9,11 @@ def test_main_pipeline_mocks(monkeypatch):
             pass
         def upsert_video(self, source, video_uid, duration_sec):
             return VideoRecord(id=1, source=source, video_uid=video_uid, duration_sec=duration_sec)
-        def add_highlights(self, video_id, highlights):
+        def add_highlights(self, video_id, highlights, replace=False):
             return [1, 2]
     
     # Patch Repository class before VideoProcessor is created
-    monkeypatch.setattr("app.main.Repository", lambda: FakeRepo())
+    monkeypatch.setattr("app.main.open_repository", lambda: FakeRepo())
     
     vp = VideoProcessor()
 
@@ -37,11 +37,11 @@ def test_main_pipeline_mocks(monkeypatch):
             self.description="desc"; self.llm_summary="sum"
             self.confidence=0.8; self.objects=[]
             self.embedding=None
-    monkeypatch.setattr(vp.selector, "analyze_segment", lambda seg, t, o: FakeHL(*seg))
-    monkeypatch.setattr(vp.selector, "embed_desc", lambda text: [0.1]*768)
+    monkeypatch.setattr(vp.selector, "analyze_segments", lambda scenes: [FakeHL(*seg) for seg, t, o in scenes])
+    monkeypatch.setattr(vp.selector, "embed_descs", lambda texts: [[0.1]*768 for _ in texts])
 
     captured = {"added": None}
-    def fake_add(video_id, highs):
+    def fake_add(video_id, highs, replace=False):
         captured["added"] = (video_id, highs)
         return [1,2]
     monkeypatch.setattr(vp.repo, "add_highlights", fake_add)
@@ -0,0 +1,120 @@
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from api import metrics
+from api.metrics import Counter, Histogram
+from api.service import ChatService
+
+
+def _sample(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def _service(**attrs) -> ChatService:
+    with patch.dict("os.environ", {}, clear=True):
+        service = ChatService(top_k=2)
+    service.embedding_cache = None
+    service.result_cache = None
+    for name, value in attrs.items():
+        setattr(service, name, value)
+    return service
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "Test.", ("phase",), buckets=(0.1, 1.0))
+    h.observe(0.05, "a")
+    h.observe(0.5, "a")
+    h.observe(3.0, "a")
+    text = "\n".join(h.render())
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{phase="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{phase="a",le="1"} 2' in text
+    assert 't_seconds_bucket{phase="a",le="+Inf"} 3' in text
+    assert 't_seconds_sum{phase="a"} 3.55' in text
+    assert 't_seconds_count{phase="a"} 3' in text
+
+
+def test_histogram_time_observes_when_the_block_raises():
+    h = Histogram("t_seconds", "Test.", ("phase",))
+    with pytest.raises(ValueError):
+        with h.time("boom"):
+            raise ValueError
+    assert 't_seconds_count{phase="boom"} 1' in "\n".join(h.render())
+
+
+def test_counter_escapes_label_values():
+    c = Counter("t_total", "Test.", ("reason",))
+    c.inc('say "hi"')
+    c.inc('say "hi"', amount=2)
+    assert 't_total{reason="say \\"hi\\""} 3' in "\n".join(c.render())
+
+
+def test_phases_and_fallbacks_are_recorded():
+    repo = Mock()
+    repo.keyword_search.return_value = [{"id": 1, "video_id": 1, "ts_start_sec": 0, "ts_end_sec": 5,
+                                         "description": "goal", "score": 1.0}]
+    repo.hybrid_search.side_effect = RuntimeError("vector index gone")
+    embedder = Mock()
+    embedder.embed.return_value = [0.1] * 3
+    before = metrics.render()
+
+    _service(repo=repo, embedder=embedder).answer("who scored?")
+    _service(repo=repo, embedder=None).answer("who scored?")
+
+    after = metrics.render()
+    for prefix, delta in [
+        ('chat_fallbacks_total{reason="search_error"}', 1),
+        ('chat_fallbacks_total{reason="no_embedder"}', 1),
+        ('chat_phase_seconds_count{phase="embed"}', 1),
+        ('chat_phase_seconds_count{phase="vector_search"}', 1),
+        ('chat_phase_seconds_count{phase="keyword_fallback"}', 2),
+        ('chat_phase_seconds_count{phase="compose"}', 2),
+    ]:
+        assert _sample(after, prefix) - _sample(before, prefix) == delta, prefix
+
+
+def test_scrape_reads_cache_and_pool_stats():
+    service = _service(repo=Mock(engine=None), arepo=None, embedder=None)
+    service.stats = Mock(return_value={
+        "embedding_cache": None,
+        "result_cache": {"hits": 3, "misses": 1, "hit_rate": 0.75, "entries": 1},
+    })
+    text = metrics.render(service)
+    assert 'chat_cache_hits_total{cache="result_cache"} 3' in text
+    assert 'chat_cache_hit_ratio{cache="result_cache"} 0.75' in text
+    assert "embedding_cache" not in text
+    assert "# TYPE db_pool_checked_out gauge" in text
+    assert "# TYPE llm_provider_failures_total counter" in text
+
+
+def test_observation_overhead_is_small():
+    h = Histogram("t_seconds", "Test.", ("phase",))
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        with h.time("embed"):
+            pass
+    per_call = (time.perf_counter() - start) / n
+    print(f"histogram timing: {per_call * 1e6:.2f} µs per observation")
+    assert per_call < 50e-6
+
+
+def test_metrics_endpoint():
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import api.dependencies
+    from api.main import app
+
+    with patch.object(api.dependencies, "_service", None):
+        response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE chat_request_seconds histogram" in response.text
+    assert "chat_cache_hits_total" not in response.text  # service not built: nothing to read
+    assert api.dependencies._service is None
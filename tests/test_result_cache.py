@@ -0,0 +1,55 @@
+from api.result_cache import ResultCache, result_key
+from app.types import SearchScope
+
+
+def test_key_normalizes_the_question_and_keeps_filters_apart():
+    assert result_key("Who  scored?", None, 5) == result_key("who scored", None, 5)
+    assert result_key("who scored", None, 5) != result_key("who scored", None, 6)
+    assert result_key("who scored", None, 5) != result_key("who scored", SearchScope(video_ids=[2]), 5)
+
+
+def test_entries_live_for_one_version():
+    cache = ResultCache()
+    key = result_key("who scored", None, 5)
+    assert cache.get(key, 1) is None
+    cache.put(key, 1, ("answer", [{"id": 1}]))
+    assert cache.get(key, 1) == ("answer", [{"id": 1}])
+
+    assert cache.get(key, 2) is None  # highlights changed
+    cache.put(key, 1, ("stale", []))  # a search that started before the change
+    assert cache.get(key, 2) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["invalidations"] == 1 and stats["entries"] == 0
+
+
+def test_an_older_version_never_rolls_the_cache_back():
+    cache = ResultCache()
+    key = result_key("who scored", None, 5)
+    cache.get(key, 2)
+    cache.put(key, 2, ("answer", []))
+
+    # A worker thread that read the version before the last write
+    assert cache.get(key, 1) is None
+    cache.put(key, 1, ("stale", []))
+    assert cache.get(key, 2) == ("answer", [])
+    assert cache.stats()["invalidations"] == 0 and cache.stats()["entries"] == 1
+
+
+def test_unknown_version_bypasses_the_cache():
+    cache = ResultCache()
+    cache.put(("q",), None, ("answer", []))
+    assert cache.get(("q",), None) is None and cache.stats()["entries"] == 0
+
+
+def test_size_bounded_lru():
+    row = {"id": 1, "description": "x" * 100}
+    cache = ResultCache(max_bytes=300)
+    cache.get(("a",), 1)
+    cache.put(("a",), 1, ("a", [row]))
+    cache.put(("b",), 1, ("b", [row]))
+    cache.get(("a",), 1)  # refreshes "a"
+    cache.put(("c",), 1, ("c", [row]))  # over 300 bytes: evicts "b"
+    assert cache.get(("b",), 1) is None and cache.get(("a",), 1) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] <= 300
+    cache.put(("huge",), 1, ("huge", [{"description": "x" * 1000}]))  # larger than the whole cache
+    assert cache.get(("huge",), 1) is None
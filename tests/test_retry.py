@@ -0,0 +1,113 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import Config
+from app.llm.retry import AdaptiveRateLimiter, Retrier, retry_after_seconds
+
+
+class Throttled(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        headers = {"retry-after": retry_after} if retry_after else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class Flaky(Exception):
+    pass
+
+
+def _retrier(**kw):
+    sleeps = []
+    limiter = AdaptiveRateLimiter(rate=1000, min_rate=1, max_rate=1000)
+    r = Retrier("test", rate_limited=(Throttled,), transient=(Flaky,), max_attempts=4,
+                base_delay=1.0, max_delay=8.0, limiter=limiter, sleep=sleeps.append, **kw)
+    return r, sleeps
+
+
+def test_retries_then_succeeds_and_counts():
+    r, sleeps = _retrier()
+    outcomes = [Flaky(), Throttled(), "ok"]
+
+    def fn():
+        out = outcomes.pop(0)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    assert r.call(fn) == "ok"
+    stats = r.snapshot()
+    assert stats["calls"] == 1 and stats["successes"] == 1
+    assert stats["retries"] == 2 and stats["rate_limited"] == 1
+    assert all(0 <= s <= 8.0 for s in sleeps)
+
+
+def test_gives_up_after_max_attempts_and_skips_non_retryable():
+    r, _ = _retrier()
+    with pytest.raises(Flaky):
+        r.call(lambda: (_ for _ in ()).throw(Flaky()))
+    assert r.snapshot()["retries"] == 3
+
+    calls = []
+    def bad():
+        calls.append(1)
+        raise ValueError("bad request")
+    with pytest.raises(ValueError):
+        r.call(bad)
+    assert len(calls) == 1
+    assert r.snapshot()["failures"] == 2
+
+
+def test_retry_after_header_is_honored():
+    r, sleeps = _retrier()
+    outcomes = [Throttled(retry_after="5"), "ok"]
+
+    def fn():
+        out = outcomes.pop(0)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    r.call(fn)
+    assert sleeps[0] >= 5.0
+    assert retry_after_seconds(Throttled(retry_after="2.5")) == 2.5
+    assert retry_after_seconds(SimpleNamespace(response=SimpleNamespace(headers={"retry-after-ms": "250"}))) == 0.25
+
+
+def test_aimd_rate_adapts():
+    now = [0.0]
+    lim = AdaptiveRateLimiter(rate=10, min_rate=1, max_rate=20, cooldown=1.0, clock=lambda: now[0])
+    lim.on_throttle()
+    assert lim.rate == 5
+    lim.on_throttle()  # within cooldown: one burst counts once
+    assert lim.rate == 5
+    for _ in range(50):
+        lim.on_success()
+    assert 5 < lim.rate <= 20
+
+    # requests are spaced 1/rate apart
+    lim.rate = 4
+    lim._next_slot = 0.0
+    waits = [lim.reserve() for _ in range(3)]
+    assert waits == [0.0, 0.25, 0.5]
+
+
+def test_openai_client_recovers_from_429(monkeypatch, fake_llm_server):
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+    monkeypatch.setattr(Config, "llm_retry_base_delay", 0.01)
+    from app.llm.openai_client import OpenAIClient
+
+    client = OpenAIClient()
+    prompt = "Scene: 0s to 5s\nObjects: car(0.80)\nTranscript excerpt (may be empty): "
+    fake_llm_server.throttle(2)
+    assert json.loads(client.generate(prompt))["is_highlight"]
+
+    fake_llm_server.throttle(1)
+    assert json.loads(asyncio.run(client.agenerate(prompt)))["is_highlight"]
+
+    stats = client._retry.snapshot()
+    assert stats["rate_limited"] == 3
+    assert stats["successes"] == 2
@@ -1,10 +1,14 @@
 """
 Tests for Step 2 Chat functionality
 """
+import asyncio
+import threading
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from api.service import ChatService
-from api.schemas import ChatQuery, ChatAnswer, Match
+from api.schemas import ChatBatchQuery, ChatQuery, ChatAnswer, Match
+from app.config import Config
+from app.types import SearchScope
 
 
 class TestChatService:
@@ -31,7 +35,7 @@ class TestChatService:
         mock_repo = Mock()
         mock_embedder = Mock()
         mock_embedder.embed.return_value = [0.1] * 768
-        mock_repo.vector_search.return_value = [
+        mock_repo.hybrid_search.return_value = [
             {
                 'id': 1,
                 'video_id': 1,
@@ -50,7 +54,7 @@ class TestChatService:
         answer, matches = service.answer("test question")
         
         mock_embedder.embed.assert_called_once_with("test question")
-        mock_repo.vector_search.assert_called_once()
+        mock_repo.hybrid_search.assert_called_once_with("test question", [0.1] * 768, top_k=5, scope=None)
         assert "[10s–15s] Test summary" in answer
         assert len(matches) == 1
     
@@ -75,7 +79,7 @@ class TestChatService:
         
         answer, matches = service.answer("test question")
         
-        mock_repo.keyword_search.assert_called_once_with("test question", top_k=5)
+        mock_repo.keyword_search.assert_called_once_with("test question", top_k=5, scope=None)
         assert "[20s–25s] Keyword match" in answer
         assert len(matches) == 1
     
@@ -117,10 +121,263 @@ class TestChatService:
         answer, matches = service.answer("test question")
         
         mock_embedder.embed.assert_called_once()
-        mock_repo.keyword_search.assert_called_once_with("test question", top_k=5)
+        mock_repo.keyword_search.assert_called_once_with("test question", top_k=5, scope=None)
         assert "[30s–35s] Fallback summary" in answer
         assert len(matches) == 1
 
+    def test_aanswer_uses_async_embedder_and_repository(self):
+        """Test aanswer awaits the async embedder and the asyncpg repository"""
+        mock_arepo = Mock()
+        mock_arepo.hybrid_search = AsyncMock(return_value=[
+            {'id': 4, 'video_id': 1, 'ts_start_sec': 40, 'ts_end_sec': 45,
+             'description': 'Async result', 'llm_summary': None, 'score': 0.03}
+        ])
+        mock_embedder = Mock()
+        mock_embedder.aembed = AsyncMock(return_value=[0.2] * 768)
+
+        service = ChatService(top_k=5)
+        service.repo = Mock()
+        service.arepo = mock_arepo
+        service.embedder = mock_embedder
+
+        answer, matches = asyncio.run(service.aanswer("test question"))
+
+        mock_embedder.aembed.assert_awaited_once_with("test question")
+        mock_arepo.hybrid_search.assert_awaited_once_with("test question", [0.2] * 768, top_k=5, scope=None)
+        service.repo.hybrid_search.assert_not_called()
+        assert "[40s–45s] Async result" in answer
+        assert len(matches) == 1
+
+    def test_repeated_questions_reuse_the_embedding(self):
+        """Test the question embedding is cached across calls and paths"""
+        mock_repo = Mock()
+        mock_repo.hybrid_search.return_value = []
+        mock_repo.highlights_version.return_value = None  # not listening: results are not cached
+        mock_arepo = Mock()
+        mock_arepo.hybrid_search = AsyncMock(return_value=[])
+        mock_embedder = Mock()
+        mock_embedder.embed.return_value = [0.3] * 768
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.arepo = mock_arepo
+        service.embedder = mock_embedder
+
+        service.answer("What happened?")
+        service.answer("what happened")
+        asyncio.run(service.aanswer("WHAT HAPPENED?!"))
+
+        mock_embedder.embed.assert_called_once_with("What happened?")
+        mock_embedder.aembed.assert_not_called()
+        mock_arepo.hybrid_search.assert_awaited_once_with("WHAT HAPPENED?!", [0.3] * 768, top_k=5, scope=None)
+        assert service.stats()["embedding_cache"]["hits"] == 2
+
+    def test_results_are_cached_until_highlights_change(self):
+        """Test a repeated question skips embedding and search until the version moves"""
+        mock_repo = Mock()
+        mock_repo.highlights_version.return_value = 7
+        mock_repo.hybrid_search.return_value = [
+            {'id': 6, 'video_id': 1, 'ts_start_sec': 60, 'ts_end_sec': 65,
+             'description': 'Cached result', 'llm_summary': None, 'score': 0.04}
+        ]
+        mock_embedder = Mock()
+        mock_embedder.embed.return_value = [0.4] * 768
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.embedder = mock_embedder
+        service.embedding_cache = None
+
+        first = service.answer("Who arrived?")
+        assert service.answer("who arrived") == first
+        assert mock_embedder.embed.call_count == 1 and mock_repo.hybrid_search.call_count == 1
+
+        service.answer("who arrived", scope=SearchScope(video_ids=[1]))  # other filters: own entry
+        assert mock_repo.hybrid_search.call_count == 2
+
+        mock_repo.highlights_version.return_value = 8  # highlights written
+        service.answer("Who arrived?")
+        assert mock_repo.hybrid_search.call_count == 3
+        assert service.stats()["result_cache"]["hits"] == 1
+
+    def test_fallback_results_are_not_cached(self):
+        """Test keyword fallback after an embedding error is retried next time"""
+        mock_repo = Mock()
+        mock_repo.highlights_version.return_value = 1
+        mock_repo.keyword_search.return_value = []
+        mock_embedder = Mock()
+        mock_embedder.embed.side_effect = Exception("Embedding failed")
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.embedder = mock_embedder
+        service.embedding_cache = None
+
+        service.answer("test question")
+        service.answer("test question")
+        assert mock_embedder.embed.call_count == 2
+
+    def test_batch_embeds_and_searches_once(self):
+        """Test batch embeds distinct uncached questions in one call and searches them in one statement"""
+        row = {'id': 9, 'video_id': 2, 'ts_start_sec': 90, 'ts_end_sec': 95,
+               'description': 'Batch hit', 'llm_summary': None, 'score': 0.03}
+        mock_repo = Mock()
+        mock_repo.highlights_version.return_value = 1
+        mock_repo.hybrid_search_many.side_effect = lambda qs, embs, top_k, scope: [[dict(row, id=i)] for i in range(len(qs))]
+        mock_embedder = Mock()
+        mock_embedder.embed_many.side_effect = lambda texts: [[0.1] * 768 for _ in texts]
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.embedder = mock_embedder
+
+        results = service.batch(["Who won?", "who won", "Any goals?"])
+        mock_embedder.embed_many.assert_called_once_with(["Who won?", "Any goals?"])
+        mock_repo.hybrid_search_many.assert_called_once()
+        assert [m[0]["id"] for _, m in results] == [0, 0, 1]
+
+        again = service.batch(["any goals", "New question?"])  # one cached, one searched
+        assert mock_repo.hybrid_search_many.call_args[0][0] == ["New question?"]
+        assert again[0] == results[2] and "[90s–95s] Batch hit" in again[1][0]
+
+    def test_question_without_ngrams_skips_the_vector_leg(self):
+        """Test a zero-norm question embedding ("??") goes to keyword search, single and batched"""
+        from app.llm.local_embedder import LocalEmbedder
+
+        row = {'id': 3, 'video_id': 1, 'ts_start_sec': 0, 'ts_end_sec': 5,
+               'description': 'Keyword hit', 'llm_summary': None, 'score': 0.5}
+        mock_repo = Mock()
+        mock_repo.highlights_version.return_value = None
+        mock_repo.keyword_search.return_value = [row]
+        mock_repo.hybrid_search_many.side_effect = lambda qs, embs, top_k, scope: [[] for _ in qs]
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.embedder = LocalEmbedder()
+        service.embedding_cache = None
+
+        answer, matches = service.answer("??")
+        mock_repo.hybrid_search.assert_not_called()
+        mock_repo.keyword_search.assert_called_once_with("??", top_k=5, scope=None)
+        assert matches == [row]
+
+        results = service.batch(["??", "who scored the goal?"])
+        assert mock_repo.hybrid_search_many.call_args[0][0] == ["who scored the goal?"]
+        assert results[0][1] == [row] and results[1][1] == []
+
+    def test_abatch_uses_the_async_repository(self):
+        """Test abatch awaits one batched embedding and one batched search"""
+        mock_arepo = Mock()
+        mock_arepo.hybrid_search_many = AsyncMock(return_value=[[], []])
+        mock_embedder = Mock()
+        mock_embedder.aembed_many = AsyncMock(return_value=[[0.2] * 768, [0.3] * 768])
+
+        service = ChatService(top_k=5)
+        service.repo = Mock()
+        service.repo.highlights_version.return_value = None
+        service.arepo = mock_arepo
+        service.embedder = mock_embedder
+
+        results = asyncio.run(service.abatch(["first question", "second question"]))
+        mock_embedder.aembed_many.assert_awaited_once_with(["first question", "second question"])
+        mock_arepo.hybrid_search_many.assert_awaited_once_with(
+            ["first question", "second question"], [[0.2] * 768, [0.3] * 768], top_k=5, scope=None
+        )
+        assert [answer for answer, _ in results] == ["I couldn't find relevant highlights for that question."] * 2
+
+    def test_aanswer_falls_back_to_async_keyword_search(self):
+        """Test aanswer falls back to async keyword search when embedding fails"""
+        mock_arepo = Mock()
+        mock_arepo.keyword_search = AsyncMock(return_value=[])
+        mock_embedder = Mock()
+        mock_embedder.aembed = AsyncMock(side_effect=Exception("Embedding failed"))
+
+        service = ChatService(top_k=5)
+        service.arepo = mock_arepo
+        service.embedder = mock_embedder
+
+        answer, matches = asyncio.run(service.aanswer("test question"))
+
+        mock_arepo.keyword_search.assert_awaited_once_with("test question", top_k=5, scope=None)
+        assert matches == []
+
+    def test_aanswer_without_async_repository(self):
+        """Test aanswer runs the sync path in a thread for the embedded backend"""
+        mock_repo = Mock()
+        mock_repo.keyword_search.return_value = [
+            {'id': 5, 'video_id': 1, 'ts_start_sec': 50, 'ts_end_sec': 55,
+             'description': 'Embedded result', 'llm_summary': None, 'score': 0.5}
+        ]
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.arepo = None
+        service.embedder = None
+
+        answer, matches = asyncio.run(service.aanswer("test question"))
+
+        mock_repo.keyword_search.assert_called_once_with("test question", top_k=5, scope=None)
+        assert "[50s–55s] Embedded result" in answer
+
+    def test_astream_sends_keyword_hits_before_the_embedding_finishes(self):
+        """Test astream yields keyword, then hybrid matches, then the answer"""
+        keyword_row = {'id': 7, 'video_id': 1, 'ts_start_sec': 70, 'ts_end_sec': 75,
+                       'description': 'Keyword hit', 'llm_summary': None, 'score': 0.5}
+        hybrid_row = dict(keyword_row, id=8, description='Hybrid hit', score=0.03)
+        mock_arepo = Mock()
+        mock_arepo.keyword_search = AsyncMock(return_value=[keyword_row])
+        mock_arepo.hybrid_search = AsyncMock(return_value=[hybrid_row])
+        embedded = asyncio.Event()
+
+        async def slow_embed(text):
+            await asyncio.sleep(0.05)
+            embedded.set()
+            return [0.5] * 768
+
+        service = ChatService(top_k=5)
+        service.repo = Mock()
+        service.repo.highlights_version.return_value = 3
+        service.arepo = mock_arepo
+        service.embedder = Mock(aembed=slow_embed)
+        service.embedding_cache = None
+
+        async def collect(question):
+            events = []
+            async for stage, payload in service.astream(question):
+                events.append((stage, payload, embedded.is_set()))
+            return events
+
+        events = asyncio.run(collect("test question"))
+        assert [(stage, done) for stage, _, done in events] == [("keyword", False), ("hybrid", True), ("answer", True)]
+        assert events[0][1] == [keyword_row] and events[1][1] == [hybrid_row]
+        assert "[70s–75s] Hybrid hit" in events[2][1][0]
+
+        again = asyncio.run(collect("Test question?"))  # now from the result cache
+        assert [stage for stage, _, _ in again] == ["cached", "answer"] and again[1][1] == events[2][1]
+        assert mock_arepo.hybrid_search.await_count == 1
+
+    def test_astream_without_async_repository(self):
+        """Test astream runs embedded-backend searches in worker threads"""
+        mock_repo = Mock()
+        version_threads = []
+        mock_repo.highlights_version.side_effect = lambda: version_threads.append(threading.get_ident())
+        mock_repo.keyword_search.return_value = []
+
+        service = ChatService(top_k=5)
+        service.repo = mock_repo
+        service.arepo = None
+        service.embedder = None
+
+        async def collect():
+            loop_thread = threading.get_ident()
+            return loop_thread, [stage async for stage, _ in service.astream("test question")]
+
+        loop_thread, stages = asyncio.run(collect())
+        assert stages == ["keyword", "answer"]
+        mock_repo.keyword_search.assert_called_once_with("test question", top_k=5, scope=None)
+        # the version read may wait on SQLiteRepository.lock: never on the event loop
+        assert version_threads and loop_thread not in version_threads
+
 
 class TestSchemas:
     """Test Pydantic schemas"""
@@ -130,6 +387,26 @@ class TestSchemas:
         query = ChatQuery(question="What happened in the video?")
         assert query.question == "What happened in the video?"
     
+    def test_chat_query_scope(self):
+        """Test ChatQuery filters become a SearchScope"""
+        assert ChatQuery(question="What happened?").scope() is None
+        scope = ChatQuery(question="What happened?", video_ids=[3], ts_from=10, ts_to=20).scope()
+        assert scope.video_ids == [3] and scope.ts_from == 10 and scope.min_confidence is None
+        with pytest.raises(ValueError):
+            ChatQuery(question="What happened?", ts_from=20, ts_to=10)
+
+    def test_chat_batch_query(self):
+        """Test ChatBatchQuery bounds and shared scope"""
+        body = ChatBatchQuery(questions=[" Who won? ", "Any goals?"], video_ids=[4])
+        assert body.questions == ["Who won?", "Any goals?"] and body.scope().video_ids == [4]
+        with pytest.raises(ValueError):
+            ChatBatchQuery(questions=[])
+        with pytest.raises(ValueError):
+            ChatBatchQuery(questions=["ok question", "a"])
+        with patch.object(Config, "chat_batch_max_questions", 2):
+            with pytest.raises(ValueError):
+                ChatBatchQuery(questions=["q1", "q2", "q3"])
+
     def test_chat_query_too_short(self):
         """Test ChatQuery with too short question"""
         with pytest.raises(ValueError):
@@ -178,7 +455,7 @@ class TestSchemas:
 @pytest.fixture
 def mock_repository():
     """Mock repository for testing"""
-    with patch('api.service.Repository') as mock:
+    with patch('api.service.open_repository') as mock:
         yield mock.return_value
 
 
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from app.llm.highlight_selector import HighlightSelector
+from app.llm.tokens import (
+    PromptBudget,
+    estimate_tokens,
+    record_usage,
+    total_usage,
+    track_usage,
+    truncate_to_tokens,
+)
+from app.types import DetectedObjectModel
+
+
+def test_estimate_and_truncate():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a person walks.") == 6
+    assert estimate_tokens("internationalization") > 1
+
+    text = " ".join(["word"] * 500)
+    cut = truncate_to_tokens(text, 50)
+    assert estimate_tokens(cut) <= 50
+    assert text.startswith(cut) and not cut.endswith(" ")
+    assert truncate_to_tokens("short", 50) == "short"
+
+
+def test_budget_caps_objects_and_transcript():
+    objects = [DetectedObjectModel(name=f"obj{i}", confidence=i / 100) for i in range(40)]
+    budget = PromptBudget(max_tokens=100, max_objects=10)
+    obj_txt, excerpt = budget.fit(objects, "talking " * 1000)
+    assert obj_txt.startswith("obj39(0.39)")  # highest confidence first
+    assert obj_txt.count("(") <= 10
+    assert estimate_tokens(obj_txt) + estimate_tokens(excerpt) <= 100
+    assert budget.fit([], "") == ("none", "")
+
+
+def test_selector_prompt_stays_within_budget():
+    class Client:
+        prompt = ""
+        def generate(self, prompt):
+            Client.prompt = prompt
+            return json.dumps({"is_highlight": False})
+
+    selector = HighlightSelector(Client(), PromptBudget(max_tokens=200, max_objects=5))
+    objects = [DetectedObjectModel(name="person", confidence=0.9)] * 30
+    selector.analyze_segment((0, 5), "hello " * 5000, objects)
+    assert Client.prompt.count("person(") == 5
+    assert Client.prompt.count("hello") < 200
+
+
+def test_track_usage_scopes_and_totals():
+    before = total_usage()["calls"]
+    with track_usage() as usage:
+        record_usage("openai", 100, 20)
+        record_usage("gemini", None, None, "a person walks.", "ok")  # no counts reported
+
+        async def one():
+            await asyncio.sleep(0)
+            record_usage("claude", 10, 5)
+
+        async def more():
+            await asyncio.gather(*(one() for _ in range(3)))
+
+        asyncio.run(more())
+    record_usage("openai", 1, 1)  # outside the scope
+
+    assert usage.calls == 5
+    assert usage.prompt_tokens == 100 + 6 + 30
+    assert usage.completion_tokens == 20 + 1 + 15
+    assert usage.estimated_calls == 1
+    assert usage.by_provider["claude"]["calls"] == 3
+    assert total_usage()["calls"] == before + 6
+
+
+def test_openai_client_records_reported_usage(fake_llm_server, monkeypatch):
+    from app.config import Config
+    from app.llm.openai_client import SYSTEM_PROMPT, OpenAIClient
+
+    monkeypatch.setattr(Config, "openai_api_key", "test-key")
+    monkeypatch.setattr(Config, "openai_base_url", fake_llm_server.url + "/v1")
+
+    with track_usage() as usage:
+        text = OpenAIClient().generate("hi")
+    # counts come from the response's usage block, which the fake server fills in
+    assert usage.calls == 1
+    assert usage.prompt_tokens == estimate_tokens(SYSTEM_PROMPT + "\nhi")
+    assert usage.completion_tokens == estimate_tokens(text)
+    assert usage.estimated_calls == 0
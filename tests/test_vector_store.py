@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from app.db.vector_store import EmbeddingMatrix, IVFIndex, QuantizedCodes
+
+
+def _data(n=3000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dim))
+    vecs = centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dim))
+    return vecs.astype(np.float32), rng.standard_normal((10, dim)).astype(np.float32)
+
+
+def _brute(vecs, q, k):
+    s = (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)) @ (q / np.linalg.norm(q))
+    return np.argsort(-s, kind="stable")[:k]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_exact_search_matches_brute_force(tmp_path, dtype, monkeypatch):
+    monkeypatch.setattr("app.db.vector_store.CHUNK_ROWS", 256)  # several chunks
+    vecs, queries = _data()
+    m = EmbeddingMatrix(str(tmp_path), dtype)
+    m.put(np.arange(1, len(vecs) + 1), vecs)  # row 0 unused, like AUTOINCREMENT ids
+    for q in queries:
+        ids, scores = m.search(q.tolist(), 10)
+        truth = _brute(vecs, q, 10) + 1
+        if dtype == "float32":
+            assert ids.tolist() == truth.tolist()
+        else:
+            assert len(set(ids.tolist()) & set(truth.tolist())) >= 9
+        assert np.all(np.diff(scores) <= 0)
+
+    m.live[truth[0]] = False  # deleted rows are never returned
+    assert truth[0] not in m.search(queries[-1].tolist(), 10)[0]
+
+
+def test_store_reopens_with_same_vectors(tmp_path):
+    vecs, _ = _data(n=50)
+    EmbeddingMatrix(str(tmp_path), "float16").put(np.arange(50), vecs)
+    again = EmbeddingMatrix(str(tmp_path), "float16")
+    assert again.dim == 32 and again.capacity >= 50
+    np.testing.assert_allclose(again.get(np.arange(50)), vecs, rtol=1e-3, atol=1e-3)
+    with pytest.raises(ValueError):
+        EmbeddingMatrix(str(tmp_path), "float32")
+
+
+def test_ivf_probes_trade_recall(tmp_path):
+    vecs, queries = _data()
+    m = EmbeddingMatrix(str(tmp_path), "float32")
+    m.put(np.arange(len(vecs)), vecs)
+    ivf = IVFIndex(str(tmp_path / "ivf.npz"))
+    ivf.train(m)
+    assert ivf.lists > 1 and ivf.built_rows == len(vecs)
+
+    extra, _ = _data(n=100, seed=1)
+    new = np.arange(len(vecs), len(vecs) + 100)
+    m.put(new, extra)
+    ivf.add(new, extra)
+    all_vecs = np.concatenate([vecs, extra])
+
+    def recall(probes):
+        hits = 0
+        for q in queries:
+            qn = q / np.linalg.norm(q)
+            ids, _ = m.search(q.tolist(), 10, ivf.candidates(qn, probes))
+            hits += len(set(ids.tolist()) & set(_brute(all_vecs, q, 10).tolist()))
+        return hits / (10 * len(queries))
+
+    assert recall(ivf.lists) == 1.0  # every list probed: exact
+    assert recall(1) <= recall(ivf.default_probes())
+    reloaded = IVFIndex(str(tmp_path / "ivf.npz"))
+    assert reloaded.lists == ivf.lists and reloaded.assign[new[-1]] == ivf.assign[new[-1]]
+    assert ivf.needs_rebuild(2 * len(vecs) + 1, 1) and not ivf.needs_rebuild(len(vecs) + 100, 1)
+    assert not ivf.needs_rebuild(10 ** 9, 0)
+
+
+@pytest.mark.parametrize("kind", ["int8", "binary"])
+def test_quantized_codes_rescored(tmp_path, kind):
+    vecs, _ = _data(dim=256)
+    rng = np.random.default_rng(1)
+    queries = vecs[rng.integers(0, len(vecs), 10)] + 0.3 * rng.standard_normal((10, 256)).astype(np.float32)
+    m = EmbeddingMatrix(str(tmp_path), "float32")
+    m.put(np.arange(2000), vecs[:2000])
+    codes = QuantizedCodes(str(tmp_path), kind, m)  # encodes the existing rows
+    assert codes.max_id == 1999
+    m.put(np.arange(2000, 3000), vecs[2000:])
+    codes.put(np.arange(2000, 3000), vecs[2000:])
+
+    hits = 0
+    for q in queries:
+        truth = _brute(vecs, q, 10)
+        ids, _ = m.search(q.tolist(), 10, codes.candidates(q.tolist(), 100))
+        hits += len(set(ids.tolist()) & set(truth.tolist()))
+    assert hits / (10 * len(queries)) >= (0.95 if kind == "int8" else 0.85)
+
+    m.live[:] = False
+    assert len(codes.candidates(queries[0].tolist(), 10)) == 0
+    reopened = QuantizedCodes(str(tmp_path), kind, m)
+    assert reopened.max_id == 2999 and reopened.capacity == codes.capacity
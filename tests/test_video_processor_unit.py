@@ -9,10 +9,10 @@ def test_video_processor_flow(mocker, fake_gemini, tmpdir):
             pass
         def upsert_video(self, source, video_uid, duration_sec):
             return VideoRecord(id=1, source=source, video_uid=video_uid, duration_sec=duration_sec)
-        def add_highlights(self, video_id, highlights):
+        def add_highlights(self, video_id, highlights, replace=False):
             return [1]
     
-    mocker.patch("app.main.Repository", return_value=FakeRepo())
+    mocker.patch("app.main.open_repository", return_value=FakeRepo())
     
     vp = VideoProcessor()
 
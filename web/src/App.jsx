@@ -1,24 +1,38 @@
-import React, { useState } from "react";
-import { ask } from "./api";
+import React, { useRef, useState } from "react";
+import { askStream } from "./api";
+
+const STAGES = { cached: "cached", keyword: "keyword matches, refining…", hybrid: "semantic matches, composing answer…" };
 
 export default function App() {
   const [q, setQ] = useState("");
   const [answer, setAnswer] = useState("");
   const [matches, setMatches] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [stage, setStage] = useState("");
   const [err, setErr] = useState("");
+  const inflight = useRef(null);
 
   const onSubmit = async (e) => {
     e.preventDefault();
-    setErr(""); setLoading(true);
+    inflight.current?.abort();
+    const ctl = inflight.current = new AbortController();
+    setErr(""); setLoading(true); setAnswer(""); setMatches([]); setStage("");
     try {
-      const res = await ask(q);
+      // Matches render as soon as the first (keyword or cached) ones arrive
+      const res = await askStream(q, {
+        signal: ctl.signal,
+        onMatches: (ev) => { setMatches(ev.matches || []); setStage(ev.stage); },
+      });
       setAnswer(res.answer);
       setMatches(res.matches || []);
+      setStage("");
     } catch (e) {
+      if (e.name === "AbortError") return;
       setErr(e.message || "Error");
-      setAnswer(""); setMatches([]);
-    } finally { setLoading(false); }
+      setAnswer(""); setMatches([]); setStage("");
+    } finally {
+      if (inflight.current === ctl) setLoading(false);
+    }
   };
 
   return (
@@ -47,7 +61,7 @@ export default function App() {
 
       {matches.length > 0 && (
         <>
-          <h3>Matched Highlights</h3>
+          <h3>Matched Highlights {loading && stage && <small style={{color: "#888"}}>({STAGES[stage] || stage})</small>}</h3>
           <ul>
             {matches.map(m => (
               <li key={m.id} style={{marginBottom: 8}}>
@@ -12,3 +12,40 @@ export async function ask(question) {
   }
   return r.json();
 }
+
+// POST /chat/stream: server-sent events over fetch (EventSource can only GET).
+// onMatches({stage, matches}) runs each time results improve (cached | keyword | hybrid);
+// resolves with the final {answer, matches}.
+export async function askStream(question, { onMatches, signal } = {}) {
+  const r = await fetch(`${API_BASE}/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+    body: JSON.stringify({ question }),
+    signal,
+  });
+  if (!r.ok) {
+    const t = await r.text();
+    throw new Error(`API error: ${r.status} ${t}`);
+  }
+  const reader = r.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) throw new Error("Stream ended without an answer");
+    buf += value;
+    let end;
+    while ((end = buf.indexOf("\n\n")) >= 0) {
+      const frame = buf.slice(0, end);
+      buf = buf.slice(end + 2);
+      let event = "message", data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      const payload = JSON.parse(data);
+      if (event === "matches") onMatches?.(payload);
+      else if (event === "answer") { reader.cancel(); return payload; }
+      else if (event === "error") throw new Error(payload.detail || "Stream error");
+    }
+  }
+}